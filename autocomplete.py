@@ -1,12 +1,38 @@
 import os
 import string
-import gzip
-import pickle
-from dataclasses import dataclass
-from typing import List, Tuple, Dict
+import heapq
+import logging
+import mmap
+import threading
+import time
+from array import array
+from functools import partial
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Tuple, Dict, Optional, Union
 
-CACHE_FILE = "autocomplete_cache.pkl.gz"  # Compressed cache filename
+from index_file import IndexFile, write_index, is_index_file
+from ingest import DIGEST_SIZE, FileChunk, IngestOptions, chunk_lines, file_digest, find_text_files, plan_chunks
+
+CACHE_FILE = "autocomplete_index.bin"  # Memory-mapped index filename
+LEGACY_CACHE_FILE = "autocomplete_cache.pkl.gz"  # gzip+pickle cache of earlier versions, see initialize.py
 _PUNCT_TABLE = str.maketrans('', '', string.punctuation)  # Translation table to remove punctuation
+POSTING_TYPECODE = "I"  # Posting lists hold unsigned 32-bit sentence ids
+POSITION_TYPECODE = "Q"  # Positional postings pack (sentence id << 32) | (offset << 2) | flags
+WORD_START, WORD_END = 1, 2  # Positional posting flags: the key begins / ends its word
+POSITION_PROBE_COST = 3  # Lining up one key occurrence costs about as much as this many substring scans
+SHARDS_PER_WORKER = 4  # Parallel builds split files into this many shards per worker
+MAX_COMPLETIONS = 5  # Number of completions returned per query
+MAX_KEYS_LOST_PER_EDIT = 3  # A single edit touches at most 3 trigrams (or 2 short words)
+COMPACT_DEAD_FRACTION = 0.25  # Compact once this share of sentences, or of lines, belongs to retired files
+RESULT_CACHE_SIZE = 10000  # Query results kept by get_best_k_completions()
+MAX_REUSED_CANDIDATES = 50000  # Larger candidate sets are not kept for reuse by longer prefixes
+MAX_CACHED_IDS = 4000000  # Survivor ids kept by the result cache over all entries, 4 bytes each
+DEADLINE_CHECK_EVERY = 32  # Fuzzy checks between looks at the clock when a query has a time budget
+_EMPTY_POSTINGS = array(POSTING_TYPECODE)
+_log = logging.getLogger("autocomplete")
 
 _SUB_PENALTIES = [5, 4, 3, 2, 1]  # Penalties for substitutions
 _INSDEL_PENALTIES = [10, 8, 6, 4, 2]  # Penalties for insertions or deletions
@@ -15,12 +41,51 @@ _INSDEL_PENALTIES = [10, 8, 6, 4, 2]  # Penalties for insertions or deletions
 @dataclass
 class AutoCompleteData:
     """Data class for storing an autocomplete suggestion result."""
+    __slots__ = ("completed_sentence", "source_text", "offset", "score")  # No per-result __dict__
     completed_sentence: str  # The full sentence completion
     source_text: str  # Source file path from which the sentence was loaded
     offset: int  # Line number in the source file
     score: int  # Score representing the quality of the match
 
 
+@dataclass
+class SourceFile:
+    """Manifest entry of an indexed file and the sentence ids it produced."""
+    size: int  # File size in bytes when indexed
+    mtime_ns: int  # Modification time when indexed
+    digest: bytes  # BLAKE2b hash of the content when indexed
+    first_id: int  # Index of the file's first line in the occurrence table
+    count: int  # Number of lines, which have consecutive occurrence indexes
+
+
+@dataclass
+class QueryStats:
+    """Measurements of one get_best_k_completions() call."""
+    prefix: str  # Normalized prefix
+    cache: str = "off"  # "hit", "reused" (started from a shorter prefix), "miss" or "off"
+    fallback: bool = False  # The anchor had no postings, so candidates came from its neighbours
+    candidates: int = 0  # Candidate sentences after the count filter
+    exact_hits: int = 0  # Candidates containing the prefix exactly
+    fuzzy_checks: int = 0  # Candidates run through the single edit matcher
+    partial: bool = False  # The time budget ran out before every candidate was checked
+    results: int = 0
+    candidates_s: float = 0.0  # Time spent selecting candidates
+    verify_s: float = 0.0  # Time spent verifying and ranking them
+    total_s: float = 0.0
+
+
+@dataclass
+class BuildStats:
+    """Measurements of one build_from_folder() call."""
+    root_folder: str
+    files: int
+    sentences: int
+    keys: int
+    index_s: float  # Time spent reading files and building posting lists
+    deletion_index_s: float  # Time spent building the deletion and part indexes
+    total_s: float
+
+
 def normalize_text(s: str) -> str:
     """
     Normalize input text by removing punctuation, converting to lowercase,
@@ -29,6 +94,13 @@ def normalize_text(s: str) -> str:
     return " ".join(s.translate(_PUNCT_TABLE).lower().split())
 
 
+def min_penalty(prefix_len: int) -> int:
+    """
+    Return the smallest penalty any single edit of a prefix of this length can get.
+    """
+    return min(penalty_for("substitution", prefix_len), penalty_for("deletion", prefix_len))
+
+
 def penalty_for(kind: str, pos: int) -> int:
     """
     Return penalty score based on edit type and position.
@@ -82,152 +154,2113 @@ def single_edit_match_info(prefix: str, candidate: str):
     return None
 
 
+def match_score(prefix_norm: str, sentence_norm: str):
+    """
+    Score how well 'sentence_norm' completes 'prefix_norm'.
+
+    Returns:
+        2 * len(prefix) for an exact substring match,
+        the same base minus the edit penalty for a single edit match,
+        None if no match.
+    """
+    if prefix_norm in sentence_norm:
+        return 2 * len(prefix_norm)
+    return fuzzy_match_score(prefix_norm, sentence_norm)
+
+
+def fuzzy_match_score(prefix_norm: str, sentence_norm: str):
+    """
+    Score the best single edit occurrence of 'prefix_norm' in 'sentence_norm'.
+    Callers check for an exact substring match first.
+    """
+    info = best_single_edit_match(prefix_norm, sentence_norm)
+    if info is None:
+        return None
+    kind, pos = info
+    return 2 * len(prefix_norm) - penalty_for(kind, pos)
+
+
+def _common_prefix_length(a: str, b: str, b_start: int, lo: int, hi: int) -> int:
+    """
+    Return the length of the common prefix of 'a' and b[b_start:], searching
+    between 'lo' (known to match) and 'hi'. Uses binary search over slice
+    comparisons so the character loop runs in C.
+    """
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[b_start + lo:b_start + mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _edit_windows(prefix: str, text: str):
+    """
+    Yield (substitution, insertion, deletion) window starts for every place a
+    single edit occurrence of 'prefix' may begin in 'text'. One edit cannot
+    touch both halves of the prefix, so each such window contains its left
+    half at the start or its right half at the end.
+    """
+    lp = len(prefix)
+    left, right = prefix[:lp // 2], prefix[lp // 2:]
+
+    s = text.find(left)
+    while s != -1:
+        yield s, s, s
+        s = text.find(left, s + 1)
+
+    r = text.find(right)
+    while r != -1:
+        end = r + len(right)
+        yield end - lp, end - lp - 1, end - lp + 1
+        r = text.find(right, r + 1)
+
+
+def best_single_edit_match(prefix: str, text: str):
+    """
+    Find the single edit occurrence of 'prefix' in 'text' with the lowest penalty.
+
+    Windows are located by exact search for either half of the prefix, and
+    each window is classified like single_edit_match_info would: the
+    position is one past the first mismatching character.
+
+    Returns:
+        (kind, position) of the best match, or None if no window is one edit away.
+    """
+    lp, n = len(prefix), len(text)
+    best, best_penalty = None, None
+    lowest_penalty = min(_SUB_PENALTIES[-1], _INSDEL_PENALTIES[-1])
+
+    for sub_start, ins_start, del_start in _edit_windows(prefix, text):
+        found = []
+
+        if 0 <= sub_start and sub_start + lp <= n:
+            f = _common_prefix_length(prefix, text, sub_start, 0, lp)
+            if f < lp and prefix[f + 1:] == text[sub_start + f + 1:sub_start + lp]:
+                found.append(("substitution", f + 1))
+
+        if 0 <= ins_start and ins_start + lp + 1 <= n:
+            f = _common_prefix_length(prefix, text, ins_start, 0, lp)
+            if f < lp and prefix[f:] == text[ins_start + f + 1:ins_start + lp + 1]:
+                found.append(("insertion", f + 1))
+
+        if lp > 1 and 0 <= del_start and del_start + lp - 1 <= n:
+            f = _common_prefix_length(prefix, text, del_start, 0, lp - 1)
+            if prefix[f + 1:] == text[del_start + f:del_start + lp - 1]:
+                found.append(("deletion", f + 1))
+
+        for kind, pos in found:
+            penalty = penalty_for(kind, pos)
+            if best_penalty is None or penalty < best_penalty:
+                best, best_penalty = (kind, pos), penalty
+                if penalty <= lowest_penalty:
+                    return best
+
+    return best
+
+
+def anchor_key(words: List[str]) -> str:
+    """
+    Return the key every candidate must contain: the first word when it is
+    short, otherwise its first 3 characters.
+    """
+    first_word = words[0]
+    return first_word if len(first_word) in (1, 2) else first_word[:3]
+
+
+def query_keys(words: List[str]) -> List[str]:
+    """
+    Return the distinct index keys every exact occurrence of 'words' contains:
+    all trigrams of words with 3+ characters, and short words that have a
+    neighbour on both sides. Short words at either end may be cut off inside
+    a longer word of the sentence, so they are not reliable keys.
+    """
+    keys = {}
+    last = len(words) - 1
+    for i, w in enumerate(words):
+        if len(w) in (1, 2):
+            if 0 < i < last:
+                keys[w] = None
+        else:
+            for j in range(len(w) - 2):
+                keys[w[j:j + 3]] = None
+    return list(keys)
+
+
+def _run_end(s: str, i: int) -> int:
+    """
+    Return the index of the last character of the run of equal characters containing s[i].
+    """
+    while i + 1 < len(s) and s[i + 1] == s[i]:
+        i += 1
+    return i
+
+
+def key_score_caps(prefix_norm: str) -> List[Tuple[str, int]]:
+    """
+    Return (key, cap) for the query keys whose absence from a sentence caps
+    its single edit score below the best one reachable.
+
+    A single edit occurrence of the prefix keeps every key its edit does not
+    touch, so a sentence missing a key can only match with an edit inside
+    that key's first occurrence (or, for a short word, next to it). Edits
+    there are reported at a position no later than the key's end, moved
+    past any run of repeated characters the matcher slides the edit over,
+    and penalties fall with the position, so the key's end bounds the
+    score. Only keys ending within the first few characters give a cap below
+    2 * len(prefix) - min_penalty(len(prefix)).
+    """
+    words = prefix_norm.split()
+    best = 2 * len(prefix_norm) - min_penalty(len(prefix_norm))
+    caps = {}
+    start, last = 0, len(words) - 1
+    for i, w in enumerate(words):
+        if len(w) in (1, 2):
+            spans = [(w, _run_end(prefix_norm, start + len(w)) + 1)] if 0 < i < last else []
+        else:
+            spans = [(w[j:j + 3], _run_end(prefix_norm, start + j + 2) + 1) for j in range(len(w) - 2)]
+        for key, pos in spans:
+            if key in caps:
+                continue
+            penalty = min(penalty_for("substitution", pos), penalty_for("deletion", pos),
+                          penalty_for("insertion", pos + 1))
+            caps[key] = 2 * len(prefix_norm) - penalty
+        start += len(w) + 1
+    return [(key, cap) for key, cap in caps.items() if cap < best]
+
+
+def _contains(postings, idx: int) -> bool:
+    """
+    Binary-search a sorted posting list for 'idx'.
+    """
+    i = bisect_left(postings, idx)
+    return i < len(postings) and postings[i] == idx
+
+
+def count_filter(lists, threshold: int, required=None, deadline: Optional[float] = None) -> Optional[List[int]]:
+    """
+    Return the sorted ids found in at least 'threshold' of 'lists' and, when
+    given, in 'required' as well, or None if time.perf_counter() 'deadline'
+    passes first.
+
+    Lists are visited rarest first. An id missing from all of the
+    len(lists) - threshold + 1 shortest lists can no longer reach the
+    threshold, so only those are scanned; every surviving id is then probed
+    in the remaining lists by binary search, stopping as soon as the outcome
+    is decided.
+    """
+    if threshold <= 0:
+        return list(required) if required is not None else []
+
+    lists = sorted(lists, key=len)
+    n_scan = len(lists) - threshold + 1
+    scanned, probed = lists[:n_scan], lists[n_scan:]
+
+    if required is not None and len(required) <= sum(len(p) for p in scanned):
+        # The anchor is rarer than the union we would scan: start from it instead
+        counts = {idx: 0 for idx in required}
+        probed = lists
+    else:
+        counts = {}
+        for postings in scanned:
+            if past_deadline(deadline, 0):
+                return None
+            for idx in postings:
+                counts[idx] = counts.get(idx, 0) + 1
+        if required is not None:
+            counts = {idx: c for idx, c in counts.items() if _contains(required, idx)}
+
+    result = []
+    for n, (idx, count) in enumerate(counts.items()):
+        if past_deadline(deadline, n):
+            return None
+        remaining = len(probed)
+        for postings in probed:
+            if count >= threshold or count + remaining < threshold:
+                break
+            if _contains(postings, idx):
+                count += 1
+            remaining -= 1
+        if count >= threshold:
+            result.append(idx)
+
+    result.sort()
+    return result
+
+
+def past_deadline(deadline: Optional[float], step: int) -> bool:
+    """
+    Check, on every DEADLINE_CHECK_EVERY-th step of a loop, whether
+    time.perf_counter() has reached 'deadline' (never when it is None).
+    """
+    return deadline is not None and not step % DEADLINE_CHECK_EVERY and time.perf_counter() >= deadline
+
+
+def deletions(key: str) -> List[str]:
+    """
+    Return the distinct strings obtained by deleting one character of 'key'.
+    """
+    return list(dict.fromkeys(key[:i] + key[i + 1:] for i in range(len(key))))
+
+
+def build_deletion_index(keys) -> Dict[str, List[str]]:
+    """
+    Map every single-character deletion of every index key to the keys it
+    came from (a SymSpell-style deletion neighbourhood). Two keys within one
+    edit of each other always share an entry here or appear in each other's
+    deletions, so neighbours are found by lookups rather than by scanning.
+    """
+    deletion_index: Dict[str, List[str]] = {}
+    for key in keys:
+        for d in deletions(key):
+            deletion_index.setdefault(d, []).append(key)
+    return deletion_index
+
+
+def key_parts(key: str) -> List[str]:
+    """
+    Return the entries of 'key' in the part index: the characters it
+    contains, its first 1 and 2 characters after a space and its last 1 and
+    2 characters before one, e.g. "abc" gives "a", "b", "c", " a", " ab",
+    "bc " and "c ". Shorter keys are their own longest start and end.
+    """
+    parts = list(dict.fromkeys(key))
+    for n in range(1, min(len(key), 2) + 1):
+        parts += [" " + key[:n], key[-n:] + " "]
+    return parts
+
+
+def build_part_index(keys) -> Dict[str, List[str]]:
+    """
+    Map the characters, starts and ends of every index key to the keys they
+    came from (see key_parts()), so the fallback looks up keys holding a
+    2-character remainder of a typo, or what is left on either side of a
+    word break, instead of scanning the key vocabulary.
+    """
+    part_index: Dict[str, List[str]] = {}
+    for key in keys:
+        for part in key_parts(key):
+            part_index.setdefault(part, []).append(key)
+    return part_index
+
+
+def add_posting(index: Dict[str, List[int]], key: str, idx: int):
+    """
+    Append sentence id 'idx' to the posting list of 'key'.
+    Ids arrive in increasing order during a build, so a repeated key in the
+    same sentence only needs to be compared against the last entry.
+    """
+    postings = index.get(key)
+    if postings is None:
+        index[key] = [idx]
+    elif postings[-1] != idx:
+        postings.append(idx)
+
+
+def freeze_index(index: Dict[str, List[int]]) -> Dict[str, array]:
+    """
+    Convert posting lists into sorted, de-duplicated 'array' objects.
+    Arrays store raw 32-bit integers instead of one pointer plus one int
+    object per occurrence, which is where most of the index memory went.
+    """
+    frozen = {}
+    for key, ids in index.items():
+        if not isinstance(ids, (array, memoryview)):
+            ids = array(POSTING_TYPECODE, sorted(set(ids)))
+        frozen[key] = ids
+    return frozen
+
+
+class _RankedHit:
+    """
+    Heap entry ordered worst first, so the weakest of the top k sits at heap[0].
+    """
+    __slots__ = ("rank", "sentence", "idx", "score")
+
+    def __init__(self, score: int, sentence: str, idx: int):
+        self.rank = (-score, sentence.lower(), idx)
+        self.sentence = sentence
+        self.idx = idx
+        self.score = score
+
+    def __lt__(self, other):
+        return self.rank > other.rank
+
+
+class TopK:
+    """
+    Bounded collector for the k best hits, ranked by (-score, sentence.lower(),
+    sentence id) with at most one hit per completed sentence.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[_RankedHit] = []
+        self._sentences = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    def worst_score(self) -> int:
+        return self._heap[0].score
+
+    def may_enter(self, score: int, sentence: str, idx: int) -> bool:
+        """
+        Check whether a hit with this score, or any lower one, could still be kept.
+        """
+        return len(self._heap) < self.k or (-score, sentence.lower(), idx) < self._heap[0].rank
+
+    def push(self, score: int, sentence: str, idx: int):
+        """
+        Offer a hit. Duplicate sentences always share a score, so the copy
+        already held (or evicted) is never worse than a later one.
+        """
+        if sentence in self._sentences:
+            return
+        hit = _RankedHit(score, sentence, idx)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, hit)
+        elif hit.rank < self._heap[0].rank:
+            evicted = heapq.heapreplace(self._heap, hit)
+            self._sentences.discard(evicted.sentence)
+        else:
+            return
+        self._sentences.add(sentence)
+
+    def ranked(self) -> List[Tuple[str, int, int]]:
+        """
+        Return (sentence, id, score) for every kept hit, best first.
+        """
+        return [(h.sentence, h.idx, h.score) for h in sorted(self._heap, key=lambda h: h.rank)]
+
+
+class PartialCompletions(list):
+    """
+    Completions of a query whose time budget ran out: the best found by the
+    deadline, which a full search might improve on.
+    """
+    partial = True
+
+
+class TextStore:
+    """
+    Sequence of strings stored back to back in one UTF-8 buffer, with an
+    offsets array marking where each string starts and ends. This avoids one
+    str object per sentence and lets substring checks run on the buffer.
+    """
+
+    def __init__(self, data=None, offsets=None, base: int = 0):
+        self.data = data if data is not None else bytearray()
+        self.offsets = offsets if offsets is not None else array("Q", [0])
+        self.base = base  # Position of the first string in 'data' (non-zero when memory-mapped)
+
+    @classmethod
+    def from_strings(cls, strings):
+        store = cls()
+        for s in strings:
+            store.append(s)
+        return store
+
+    @classmethod
+    def mapped(cls, index: IndexFile, name: str) -> "TextStore":
+        """
+        Open the store saved as sections 'name' and 'name' + "off" in place.
+        """
+        return cls(index.mmap, index.array(name + "off", "Q"), index.sections[name][0])
+
+    def buffer(self) -> memoryview:
+        """
+        Return the raw bytes of all strings, e.g. for saving.
+        """
+        return memoryview(self.data)[self.base:self.base + self.offsets[-1]]
+
+    def copy(self) -> "TextStore":
+        """
+        Return an in-memory, appendable copy.
+        """
+        return TextStore(bytearray(self.buffer()), array("Q", self.offsets))
+
+    def append(self, s: str):
+        self.data += s.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def extend(self, other: "TextStore"):
+        """
+        Append every string of 'other'.
+        """
+        base = len(self.data)
+        self.data += other.data
+        self.offsets.extend(base + offset for offset in other.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        return self.raw(idx).decode("utf-8")
+
+    def raw(self, idx: int) -> bytes:
+        """
+        Return string 'idx' still UTF-8 encoded.
+        """
+        return self.data[self.base + self.offsets[idx]:self.base + self.offsets[idx + 1]]
+
+    def contains(self, idx: int, needle: bytes) -> bool:
+        """
+        Check whether string 'idx' contains the UTF-8 encoded 'needle' without decoding it.
+        """
+        return self.data.find(needle, self.base + self.offsets[idx], self.base + self.offsets[idx + 1]) != -1
+
+
+class SentenceTable(Sequence):
+    """
+    The (line, source path, line number) rows of every sentence, stored as
+    columns: the lines in a TextStore, a file id and a line number array per
+    sentence, and each source path once in a path table. Rows are built on
+    access. The same layout is saved to and memory-mapped from index files.
+    """
+
+    def __init__(self, text: TextStore = None, paths: TextStore = None, file_ids=None, line_nos=None):
+        self.text = text if text is not None else TextStore()
+        self.paths = paths if paths is not None else TextStore()
+        self.file_ids = file_ids if file_ids is not None else array("I")
+        self.line_nos = line_nos if line_nos is not None else array("I")
+        self._path_cache: Dict[int, str] = {}
+        self._path_ids: Optional[Dict[str, int]] = None  # Built when the first row is appended
+
+    @classmethod
+    def from_rows(cls, rows) -> "SentenceTable":
+        table = cls()
+        for line, path, line_no in rows:
+            table.append(line, path, line_no)
+        return table
+
+    @classmethod
+    def mapped(cls, index: IndexFile) -> "SentenceTable":
+        """
+        Open the table saved in an index file in place.
+        """
+        return cls(TextStore.mapped(index, "text"), TextStore.mapped(index, "paths"),
+                   index.array("fileid", "I"), index.array("lineno", "I"))
+
+    def copy(self) -> "SentenceTable":
+        """
+        Return an in-memory, appendable copy.
+        """
+        return SentenceTable(self.text.copy(), self.paths.copy(), array("I", self.file_ids), array("I", self.line_nos))
+
+    def _file_id(self, path: str) -> int:
+        if self._path_ids is None:
+            self._path_ids = {self.paths[i]: i for i in range(len(self.paths))}
+        file_id = self._path_ids.get(path)
+        if file_id is None:
+            file_id = self._path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        return file_id
+
+    def append(self, line: str, path: str, line_no: int):
+        self.text.append(line)
+        self.file_ids.append(self._file_id(path))
+        self.line_nos.append(line_no)
+
+    def extend(self, other: "SentenceTable"):
+        """
+        Append every row of 'other', mapping its file ids onto this path table.
+        """
+        file_ids = [self._file_id(other.paths[i]) for i in range(len(other.paths))]
+        self.text.extend(other.text)
+        self.file_ids.extend(file_ids[file_id] for file_id in other.file_ids)
+        self.line_nos.extend(other.line_nos)
+
+    def select(self, ids) -> "SentenceTable":
+        """
+        Return a new table with the rows 'ids', in that order. Paths no row
+        refers to any more are dropped.
+        """
+        table = SentenceTable()
+        file_ids: Dict[int, int] = {}
+        for idx in ids:
+            table.text.data += self.text.raw(idx)
+            table.text.offsets.append(len(table.text.data))
+            file_id = file_ids.get(self.file_ids[idx])
+            if file_id is None:
+                file_id = file_ids[self.file_ids[idx]] = table._file_id(self.path(self.file_ids[idx]))
+            table.file_ids.append(file_id)
+            table.line_nos.append(self.line_nos[idx])
+        return table
+
+    def set_source(self, idx: int, path: str, line_no: int):
+        """
+        Point sentence 'idx' at another file and line it occurs on.
+        """
+        self.file_ids[idx] = self._file_id(path)
+        self.line_nos[idx] = line_no
+
+    def line(self, idx: int) -> str:
+        """
+        Return the text of sentence 'idx' without building its row.
+        """
+        return self.text[idx]
+
+    def path(self, file_id: int) -> str:
+        path = self._path_cache.get(file_id)
+        if path is None:
+            path = self._path_cache[file_id] = self.paths[file_id]
+        return path
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __getitem__(self, idx: int) -> Tuple[str, str, int]:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("sentence index out of range")
+        return self.text[idx], self.path(self.file_ids[idx]), self.line_nos[idx]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+class LineIds:
+    """
+    Finds the id of a line among the distinct lines of a TextStore. Lines are
+    looked up by hash() and confirmed against the store, so they are not held
+    a second time as dict keys. Ids are store positions plus 'base'.
+    """
+
+    def __init__(self, text: TextStore, base: int = 0):
+        self.text = text
+        self.base = base
+        self._by_hash: Dict[int, int] = {}
+        self._collisions: Dict[str, int] = {}  # Lines whose hash was taken by another line
+        for pos in range(len(text)):
+            self.add(text[pos], base + pos)
+
+    def get(self, line: str) -> Optional[int]:
+        idx = self._by_hash.get(hash(line))
+        if idx is None:
+            return None
+        if self.text[idx - self.base] == line:
+            return idx
+        return self._collisions.get(line)
+
+    def add(self, line: str, idx: int):
+        h = hash(line)
+        if h in self._by_hash:
+            self._collisions[line] = idx
+        else:
+            self._by_hash[h] = idx
+
+
+class MappedIndex(Mapping):
+    """
+    Read-only word index over a memory-mapped index: keys sorted by their
+    UTF-8 bytes, and one concatenated posting array sliced by offsets.
+    Lookups binary-search the keys, so nothing is loaded up front.
+    """
+
+    def __init__(self, keys: TextStore, posting_offsets, postings):
+        self.keys = keys
+        self.posting_offsets = posting_offsets
+        self.postings = postings
+
+    def _find(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        lo, hi = 0, len(self.keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.keys.raw(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.keys) and self.keys.raw(lo) == encoded:
+            return lo
+        return -1
+
+    def __getitem__(self, key: str):
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.postings[self.posting_offsets[i]:self.posting_offsets[i + 1]]
+
+    def __contains__(self, key) -> bool:
+        return self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self):
+        for i in range(len(self.keys)):
+            yield self.keys[i]
+
+    def items(self):
+        # Walk keys and postings side by side instead of searching for every key
+        offsets = self.posting_offsets
+        for i in range(len(self.keys)):
+            yield self.keys[i], self.postings[offsets[i]:offsets[i + 1]]
+
+
+class IndexShard:
+    """
+    Sentences, normalized text and posting lists built from a group of files,
+    numbered from 'first_id'. Each distinct line is stored and indexed once;
+    the occurrence table lists the sentence id and line number of every line
+    read, file after file.
+    """
+
+    def __init__(self, first_id: int = 0, positional: bool = False):
+        self.first_id = first_id
+        self.sentences = SentenceTable()  # Distinct lines, with the file and line they first occur on
+        self.normalized = TextStore()
+        self.index: Dict[str, List[int]] = {}
+        self.positions: Optional[Dict[str, array]] = {} if positional else None
+        self.occurrences = array("I")  # Sentence id of every line read
+        self.occurrence_lines = array("I")  # Line number of every line read
+        self.files: Dict[str, SourceFile] = {}  # Occurrence ranges, numbered from 0
+        self.continued = set()  # Files whose first chunk was read by an earlier shard
+        self.line_ids: Optional[LineIds] = LineIds(self.sentences.text, first_id)
+
+    def add_chunk(self, chunk: FileChunk, errors: str = "replace"):
+        """
+        Index every non-empty line of a file, or of a byte range of one (see
+        ingest.plan_chunks()). A chunk that fails to read keeps the lines
+        loaded before the error. Later chunks of a file extend its record.
+        """
+        fullpath = chunk.path
+        first = len(self.occurrences)
+        stat = None
+        try:
+            if not chunk.start:
+                # Stat only once the file could be read, so a file that cannot is skipped unrecorded
+                digest = chunk.digest or file_digest(fullpath)
+                stat = os.stat(fullpath)
+            for i, line_stripped in chunk_lines(chunk, errors):
+                idx = self.line_ids.get(line_stripped)
+                self.occurrence_lines.append(i)
+                if idx is not None:
+                    self.occurrences.append(idx)
+                    continue
+                idx = self.first_id + len(self.sentences)
+                self.occurrences.append(idx)
+                self.sentences.append(line_stripped, fullpath, i)
+                self.line_ids.add(line_stripped, idx)
+
+                norm = normalize_text(line_stripped)
+                self.normalized.append(norm)
+                for key in sentence_keys(norm):
+                    add_posting(self.index, key, idx)
+                if self.positions is not None:
+                    for key, offset, flags in positional_keys(norm):
+                        positions = self.positions.get(key)
+                        if positions is None:
+                            positions = self.positions[key] = array(POSITION_TYPECODE)
+                        positions.append(idx << 32 | offset << 2 | flags)
+
+        except Exception as e:
+            print(f"Warning: skipped {fullpath}: {e}")
+
+        count = len(self.occurrences) - first
+        if stat is not None:
+            self.files[fullpath] = SourceFile(stat.st_size, stat.st_mtime_ns, digest, first, count)
+        elif chunk.start:
+            record = self.files.get(fullpath)
+            if record is None:
+                self.files[fullpath] = SourceFile(0, 0, b"", first, count)
+                self.continued.add(fullpath)
+            else:
+                record.count += count
+
+
+def sentence_keys(norm: str):
+    """
+    Yield the index keys of a normalized sentence, in order and possibly repeated.
+    """
+    for w in norm.split():
+        if len(w) in (1, 2):
+            # Store short words (length 2 or 1) as is
+            yield w
+        else:
+            # Index only substrings of length 3
+            for j in range(len(w) - 2):
+                yield w[j:j + 3]
+
+
+def positional_keys(norm: str):
+    """
+    Yield (key, character offset, flags) for every key occurrence of a
+    normalized sentence, where flags tell whether the key begins and/or ends
+    its word. Short words are whole words, so they carry both flags.
+    """
+    start = 0
+    for w in norm.split():
+        if len(w) in (1, 2):
+            yield w, start, WORD_START | WORD_END
+        else:
+            last = len(w) - 3
+            for j in range(last + 1):
+                yield w[j:j + 3], start + j, (WORD_START if j == 0 else 0) | (WORD_END if j == last else 0)
+        start += len(w) + 1
+
+
+def exact_probes(prefix_norm: str) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Return (key, offset, required flags) such that a sentence contains
+    'prefix_norm' exactly where it has every key at its offset from a common
+    start, with the flags. Trigrams are chosen to cover every character of a
+    word; the first word may begin, and the last may end, inside a sentence
+    word, every other word boundary is pinned by a flag.
+
+    Returns None when the first or last word is a short word, which is not
+    indexed where it may be cut off.
+    """
+    words = prefix_norm.split()
+    if len(words[0]) < 3 or len(words[-1]) < 3:
+        return None
+    probes = []
+    start, last = 0, len(words) - 1
+    for i, w in enumerate(words):
+        if len(w) in (1, 2):
+            probes.append((w, start, WORD_START | WORD_END))
+        else:
+            end = len(w) - 3
+            for j in sorted(set(range(0, end, 3)) | {end}):
+                flags = (WORD_START if j == 0 and i > 0 else 0) | (WORD_END if j == end and i < last else 0)
+                probes.append((w[j:j + 3], start + j, flags))
+        start += len(w) + 1
+    return probes
+
+
+def split_by_size(chunks: List[FileChunk], parts: int) -> List[List[FileChunk]]:
+    """
+    Split 'chunks' into at most 'parts' contiguous groups of similar total weight.
+    """
+    target = max(sum(chunk.weight for chunk in chunks) / parts, 1)
+
+    groups, current, current_size = [], [], 0
+    for chunk in chunks:
+        current.append(chunk)
+        current_size += chunk.weight
+        if current_size >= target and len(groups) < parts - 1:
+            groups.append(current)
+            current, current_size = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def index_files(chunks: List[FileChunk], first_id: int = 0, positional: bool = False,
+                errors: str = "replace") -> IndexShard:
+    """
+    Index 'chunks' in order into a new shard. Runs in worker processes for parallel builds.
+    """
+    shard = IndexShard(first_id, positional)
+    for chunk in chunks:
+        shard.add_chunk(chunk, errors)
+    shard.line_ids = None  # hash() differs between processes, and the table is not needed after the build
+    return shard
+
+
+@dataclass
+class CachedQuery:
+    """Results of one query, and what a longer prefix can reuse from it."""
+    results: List[AutoCompleteData]
+    anchor: str  # Anchor key of the prefix
+    survivors: Optional[array]  # Sorted ids of candidates that may still match, None if not reusable
+    inexact: array  # Sorted ids of the survivors that do not contain the prefix exactly
+    expires: Optional[float]  # time.monotonic() after which the entry is stale
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of query results keyed on the normalized prefix.
+
+    Entries are dropped when the index changes generation, and optionally
+    after 'ttl' seconds. Least recently used entries are also evicted to keep
+    the survivor ids held by all entries under 'max_ids'. A miss can still start from the entry of the
+    longest cached prefix of the query with the same anchor, the way
+    CompletionSession refines a prefix being typed.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: Optional[float] = None,
+                 max_ids: int = MAX_CACHED_IDS):
+        self.max_entries = max_entries
+        self.max_ids = max_ids
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, CachedQuery]" = OrderedDict()
+        self.ids = 0  # Survivor and inexact ids held by all entries
+        self.generation = 0
+        self.hits = self.misses = self.reused = 0
+        self._lock = threading.Lock()  # Queries may run on several threads, e.g. in the server
+
+    @staticmethod
+    def _size(entry: CachedQuery) -> int:
+        return len(entry.survivors) + len(entry.inexact) if entry.survivors is not None else 0
+
+    def _valid(self, entry: Optional[CachedQuery], generation: int) -> bool:
+        if entry is None or generation != self.generation:
+            return False
+        return entry.expires is None or entry.expires > time.monotonic()
+
+    def get(self, prefix_norm: str, generation: int) -> Optional[CachedQuery]:
+        """
+        Return the entry for 'prefix_norm' and mark it recently used, counting a hit or a miss.
+        """
+        with self._lock:
+            entry = self.entries.get(prefix_norm)
+            if not self._valid(entry, generation):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(prefix_norm)
+            self.hits += 1
+            return entry
+
+    def longest_prefix(self, prefix_norm: str, anchor: str, generation: int) -> Optional[CachedQuery]:
+        """
+        Return the reusable entry of the longest cached proper prefix of 'prefix_norm' with the same anchor.
+        """
+        with self._lock:
+            for end in range(len(prefix_norm) - 1, 0, -1):
+                entry = self.entries.get(prefix_norm[:end])
+                if entry is not None and entry.anchor == anchor and entry.survivors is not None \
+                        and self._valid(entry, generation):
+                    self.reused += 1
+                    return entry
+            return None
+
+    def put(self, prefix_norm: str, entry: CachedQuery, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.ids = 0
+                self.generation = generation
+            if self.ttl is not None:
+                entry.expires = time.monotonic() + self.ttl
+            replaced = self.entries.pop(prefix_norm, None)
+            if replaced is not None:
+                self.ids -= self._size(replaced)
+            self.entries[prefix_norm] = entry
+            self.ids += self._size(entry)
+            while self.entries and (len(self.entries) > self.max_entries or self.ids > self.max_ids):
+                self.ids -= self._size(self.entries.popitem(last=False)[1])
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "ids": self.ids, "hits": self.hits, "misses": self.misses,
+                "reused": self.reused}
+
+
 class AutoCompleteSystem:
     def __init__(self):
         """
         Initialize the autocomplete system with empty sentence and index storage.
         """
-        self.sentences: List[Tuple[str, str, int]] = []
-        self.word_index: Dict[str, List[int]] = {}
+        self.sentences = SentenceTable()  # (line, source path, line number) of every distinct line, by sentence id
+        self.normalized = TextStore()  # normalize_text() of every sentence, by sentence id
+        # Sentence id and line number of every indexed line, file after file (see SourceFile).
+        # None after loading an index without duplicate lines: one line per sentence, in id order.
+        self.occurrences: Optional[array] = array("I")
+        self.occurrence_lines: Optional[array] = array("I")
+        self._live_counts: Optional[array] = None  # Lines per sentence in live files, built on first retire
+        self._line_ids: Optional[LineIds] = None  # Sentence ids by line, while files are added
+        self._orphans = set()  # Live sentences whose reported source file was retired
+        self._sources = None  # (generation, occurrences grouped by sentence), built by sources()
+        self.word_index: Dict[str, array] = {}
+        self.positional_index: Optional[Dict[str, array]] = None  # Key occurrences, see build_from_folder()
+        self._deletion_index = None  # Built from word_index on first use
+        self._part_index = None  # Likewise, see build_part_index()
+        self._deletion_lock = threading.Lock()  # Held while building them, which load_in_background() may do too
+        self._index_file: Optional[IndexFile] = None  # The mapped index file, when loaded from one
+        self._loaded = threading.Event()  # Cleared while load_in_background() runs; queries wait for it
+        self._loaded.set()
+        self._load_error: Optional[BaseException] = None
+        self.root_folder = None  # Folder the index was built from
+        self.files: Dict[str, SourceFile] = {}  # Manifest of indexed files by path
+        self.dead = set()  # Ids of sentences from files changed or removed since indexing
+        self.generation = 0  # Bumped on every change to the index, invalidating cached results
+        self.result_cache = ResultCache()  # Set to None to disable result caching
+        self.ingest = IngestOptions()  # Which files are indexed and how they are decoded
+        self.shared_keys: Optional[set] = None  # Keys of all shards when this is one shard of an index (sharding.py)
+        # Called with a QueryStats or BuildStats for every query and build when set
+        self.metrics: Optional[Callable[[Union[QueryStats, BuildStats]], None]] = None
+        self.slow_query_seconds: Optional[float] = None  # Queries slower than this are logged as warnings
 
-    def build_from_folder(self, root_folder: str):
+    def build_from_folder(self, root_folder: str, workers: int = 1, positional: bool = False,
+                          paths: List[str] = None):
         """
-        Build the index from all supported text files under 'root_folder'.
+        Build the index from all supported text files under 'root_folder':
+        .txt files, also gzip, bzip2 or xz compressed, decoded as set by
+        self.ingest (see ingest.py). Given 'paths', only those files are
+        indexed, in that order, e.g. one shard of the folder (see sharding.py).
+        A line repeated on many lines or files is stored, indexed and verified
+        once, as one sentence with a list of its occurrences; completions
+        report its first occurrence and sources() lists the others.
+        With workers > 1 the files are split into contiguous shards that are
+        indexed in separate processes and merged in walk order, which gives
+        exactly the same sentence ids as a serial build. Files larger than
+        self.ingest.chunk_bytes are split into byte ranges for this.
+
+        With 'positional', every key occurrence is also indexed with its
+        offset, so exact hits are found by lining up postings instead of a
+        substring scan of each candidate. This holds one 8-byte posting per
+        key occurrence on top of the 4-byte one per sentence and key, several
+        times the size of the word index (see benchmarks/positional.py).
         """
         print("Scanning files and loading sentences...")
+        start = time.perf_counter()
+        self.root_folder = root_folder
+        if positional and self.positional_index is None:
+            self.positional_index = {} if not self.sentences else self._positions_of_loaded()
+        if paths is None:
+            paths = find_text_files(root_folder, self.ingest)
+        self._add_files(paths, workers)
+        indexed = time.perf_counter()
+        if self._deletion_index is None:
+            self.deletion_index = build_deletion_index(self.word_index)
+        if self._part_index is None:
+            self._part_index = build_part_index(self.word_index)
+        print(f"Loaded {len(self.sentences)} sentences from {len(self.occurrences)} lines, "
+              f"indexed {len(self.word_index)} prefixes.")
+        if self._instrumented():
+            end = time.perf_counter()
+            self._report(BuildStats(root_folder, len(paths), len(self.sentences), len(self.word_index),
+                                    indexed - start, end - indexed, end - start))
+
+    def refresh(self, root_folder: str = None, workers: int = 1) -> bool:
+        """
+        Bring the index up to date with the files under 'root_folder', by
+        default the folder it was built from. Files whose size and mtime match
+        the manifest are not read; files that changed, or were removed, have
+        their sentence ids tombstoned, and new or changed files are indexed
+        under fresh ids. Ids are compacted once too many are tombstoned.
+
+        Returns:
+            True if the index changed and should be saved again.
+        """
+        root_folder = root_folder or self.root_folder
+        if root_folder is None or (self.sentences and not self.files):
+            # Nothing to compare against, e.g. a cache from before the manifest
+            return False
+
+        changed, touched = [], False
+        paths = find_text_files(root_folder, self.ingest)
+        for path in paths:
+            record = self.files.get(path)
+            if record is None:
+                changed.append(path)
+                continue
+            try:
+                stat = os.stat(path)
+                if (stat.st_size, stat.st_mtime_ns) == (record.size, record.mtime_ns):
+                    continue
+                if stat.st_size == record.size and file_digest(path) == record.digest:
+                    record.mtime_ns = stat.st_mtime_ns
+                    touched = True
+                    continue
+            except OSError:
+                pass
+            changed.append(path)
+        present = set(paths)
+        removed = [path for path in self.files if path not in present]
+        if not changed and not removed:
+            return touched
+
+        print(f"Refreshing index: {len(changed)} new or changed, {len(removed)} removed files...")
+        self.root_folder = root_folder
+        self._ensure_mutable()
+        for path in removed:
+            self._retire(path)
+        self._add_files(changed, workers)
+        if (len(self.dead) > COMPACT_DEAD_FRACTION * len(self.sentences)
+                or self._retired_lines() > COMPACT_DEAD_FRACTION * len(self.occurrences)):
+            self.compact()
+        lines = len(self.occurrences) - self._retired_lines()
+        print(f"Loaded {len(self.sentences) - len(self.dead)} sentences from {lines} lines, "
+              f"indexed {len(self.word_index)} prefixes.")
+        return True
+
+    def _add_files(self, paths: List[str], workers: int = 1):
+        """
+        Index 'paths' under sentence ids following the ones already loaded.
+        """
+        self._ensure_mutable()
+        new_keys: List[str] = []
+        positional = self.positional_index is not None
+        chunks = plan_chunks(paths, self.ingest, split=workers > 1)
+        try:
+            if workers > 1 and len(chunks) > 1:
+                from concurrent.futures import ProcessPoolExecutor  # Only parallel builds pay for importing it
+                groups = split_by_size(chunks, workers * SHARDS_PER_WORKER)
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    index = partial(index_files, positional=positional, errors=self.ingest.errors)
+                    for shard in pool.map(index, groups):
+                        self._merge_shard(shard, new_keys)
+            else:
+                self._merge_shard(index_files(chunks, len(self.sentences), positional, self.ingest.errors), new_keys)
+        finally:
+            self._line_ids = None
+        if self._orphans:
+            self._repoint_sources()
+
+        self.generation += 1
+        if self._deletion_index is not None:
+            # Keep an already built deletion index in step; otherwise it is built on first use
+            for key in new_keys:
+                for d in deletions(key):
+                    self._deletion_index.setdefault(d, []).append(key)
+        if self._part_index is not None:
+            for key in new_keys:
+                for part in key_parts(key):
+                    self._part_index.setdefault(part, []).append(key)
+
+    def _merge_shard(self, shard: "IndexShard", new_keys: List[str]):
+        """
+        Append a shard's sentences, postings and occurrences. Lines already
+        loaded keep their sentence id (and are revived if tombstoned); new
+        ones are numbered after the sentences already loaded, in shard order,
+        so appending keeps every posting list sorted. Keys seen for the first
+        time are added to 'new_keys'.
+        """
+        base, first_occurrence = len(self.sentences), len(self.occurrences)
+        continued = {path for path in shard.continued if path in self.files}
+        for path in shard.files:
+            if path not in continued:
+                # Re-indexing a file replaces its earlier lines
+                self._retire(path)
+        for path, record in shard.files.items():
+            if path in continued:
+                # The rest of a file split into byte ranges, right after the previous shard's part
+                self.files[path].count += record.count
+            else:
+                record.first_id += first_occurrence
+                self.files[path] = record
+
+        ids = None  # Sentence id of each shard sentence, unless they just follow the loaded ones
+        if base:
+            if self._line_ids is None:
+                self._line_ids = LineIds(self.sentences.text)
+            lines = [shard.sentences.line(pos) for pos in range(len(shard.sentences))]
+            found = [self._line_ids.get(line) for line in lines]
+            if any(idx is not None for idx in found):
+                ids = self._merge_sentences(shard, lines, found)
+            else:
+                for pos, line in enumerate(lines):
+                    self._line_ids.add(line, base + pos)
+        if ids is None:
+            self.sentences.extend(shard.sentences)
+            self.normalized.extend(shard.normalized)
+            shift = base - shard.first_id
+            occurrences = [idx + shift for idx in shard.occurrences] if shift else shard.occurrences
+        else:
+            occurrences = [ids[idx - shard.first_id] for idx in shard.occurrences]
+        self.occurrences.extend(occurrences)
+        self.occurrence_lines.extend(shard.occurrence_lines)
+        if self._live_counts is not None:
+            self._live_counts.frombytes(bytes(4 * (len(self.sentences) - len(self._live_counts))))
+            for idx in occurrences:
+                self._live_counts[idx] += 1
 
-        for dirpath, _, filenames in os.walk(root_folder):
-            for fname in filenames:
-                if not fname.lower().endswith('.txt'):
+        for key, postings in shard.index.items():
+            if ids is None:
+                postings = array(POSTING_TYPECODE, [idx + shift for idx in postings] if shift else postings)
+            else:
+                postings = array(POSTING_TYPECODE, [ids[idx - shard.first_id] for idx in postings
+                                                    if ids[idx - shard.first_id] >= base])
+                if not postings:
                     continue
+            existing = self.word_index.get(key)
+            if existing is None:
+                self.word_index[key] = postings
+                new_keys.append(key)
+            else:
+                existing.extend(postings)
+        if self.positional_index is not None:
+            for key, positions in shard.positions.items():
+                if ids is None:
+                    if shift:
+                        positions = array(POSITION_TYPECODE, [p + (shift << 32) for p in positions])
+                else:
+                    positions = array(POSITION_TYPECODE, [ids[(p >> 32) - shard.first_id] << 32 | p & 0xFFFFFFFF
+                                                           for p in positions
+                                                           if ids[(p >> 32) - shard.first_id] >= base])
+                    if not positions:
+                        continue
+                existing = self.positional_index.get(key)
+                if existing is None:
+                    self.positional_index[key] = positions
+                else:
+                    existing.extend(positions)
 
-                fullpath = os.path.join(dirpath, fname)
-                try:
-                    with open(fullpath, 'r', encoding='utf-8') as f:
-                        for i, line in enumerate(f):
-                            line_stripped = line.strip()
-                            if not line_stripped:
-                                continue
-
-                            idx = len(self.sentences)
-                            self.sentences.append((line_stripped, fullpath, i))
-
-                            norm = normalize_text(line_stripped)
-                            words = norm.split()
-
-                            for w in words:
-                                if len(w) in (1,2):
-                                    # Store short words (length 2 or 1) as is
-                                    self.word_index.setdefault(w, []).append(idx)
-                                else:
-                                    # Index only substrings of length 3
-                                    length = 3
-                                    if len(w) >= length:
-                                        for j in range(len(w) - length + 1):
-                                            substring = w[j:j + length]
-                                            self.word_index.setdefault(substring, []).append(idx)
-
-                except Exception as e:
-                    print(f"Warning: skipped {fullpath}: {e}")
+    def _merge_sentences(self, shard: "IndexShard", lines: List[str], found: List[Optional[int]]) -> List[int]:
+        """
+        Append the shard sentences not 'found' among the loaded ones, and
+        revive tombstoned ones that were, pointing them at the shard's
+        occurrence. Returns the sentence id of each shard sentence.
+        """
+        ids = []
+        for pos, (line, idx) in enumerate(zip(lines, found)):
+            _, path, line_no = shard.sentences[pos]
+            if idx is None:
+                idx = len(self.sentences)
+                self.sentences.append(line, path, line_no)
+                self.normalized.data += shard.normalized.raw(pos)
+                self.normalized.offsets.append(len(self.normalized.data))
+                self._line_ids.add(line, idx)
+            elif idx in self.dead:
+                self.dead.discard(idx)
+                self.sentences.set_source(idx, path, line_no)
+            ids.append(idx)
+        return ids
 
-        print(f"Loaded {len(self.sentences)} sentences, indexed {len(self.word_index)} prefixes.")
+    def _positions_of_loaded(self) -> Dict[str, array]:
+        """
+        Build the positional index of the sentences already loaded.
+        """
+        positions: Dict[str, array] = {}
+        for idx in range(len(self.normalized)):
+            for key, offset, flags in positional_keys(self.normalized[idx]):
+                postings = positions.get(key)
+                if postings is None:
+                    postings = positions[key] = array(POSITION_TYPECODE)
+                postings.append(idx << 32 | offset << 2 | flags)
+        return positions
+
+    def _retire(self, path: str):
+        """
+        Drop 'path' from the manifest and tombstone the sentences no other
+        live file has.
+        """
+        if path not in self.files:
+            return
+        if self._live_counts is None:
+            self._live_counts = self._count_live()
+        record = self.files.pop(path)
+        counts, sentences = self._live_counts, self.sentences
+        for o in range(record.first_id, record.first_id + record.count):
+            idx = self.occurrences[o]
+            counts[idx] -= 1
+            if not counts[idx]:
+                self.dead.add(idx)
+            elif sentences.path(sentences.file_ids[idx]) == path:
+                self._orphans.add(idx)
+
+    def _count_live(self) -> array:
+        """
+        Count the lines of every sentence in files still in the manifest.
+        """
+        counts = array("I", bytes(4 * len(self.sentences)))
+        for record in self.files.values():
+            for o in range(record.first_id, record.first_id + record.count):
+                counts[self.occurrences[o]] += 1
+        return counts
+
+    def _repoint_sources(self):
+        """
+        Point live sentences whose source file was retired at their first
+        occurrence in a live file.
+        """
+        orphans = {idx for idx in self._orphans if idx not in self.dead}
+        self._orphans = set()
+        for path, record in sorted(self.files.items(), key=lambda item: item[1].first_id):
+            for o in range(record.first_id, record.first_id + record.count):
+                if not orphans:
+                    return
+                idx = self.occurrences[o]
+                if idx in orphans:
+                    orphans.discard(idx)
+                    self.sentences.set_source(idx, path, self.occurrence_lines[o])
+
+    def compact(self):
+        """
+        Remove tombstoned sentences and the lines of retired files, and
+        renumber the rest in their original order.
+        """
+        if not self.dead and not self._retired_lines():
+            return
+        self._ensure_mutable()
+        dead = sorted(self.dead)
+
+        def renumber(idx):
+            return idx - bisect_left(dead, idx)
+
+        occurrences, occurrence_lines = array("I"), array("I")
+        for record in sorted(self.files.values(), key=lambda r: r.first_id):
+            end = record.first_id + record.count
+            occurrences.extend(renumber(idx) for idx in self.occurrences[record.first_id:end])
+            occurrence_lines.extend(self.occurrence_lines[record.first_id:end])
+            record.first_id = len(occurrences) - record.count
+        self.occurrences, self.occurrence_lines = occurrences, occurrence_lines
+        self._live_counts = None
+        self.generation += 1
+        if not self.dead:
+            return
+
+        live = [idx for idx in range(len(self.sentences)) if idx not in self.dead]
+        self.sentences = self.sentences.select(live)
+        normalized = TextStore()
+        for idx in live:
+            normalized.data += self.normalized.raw(idx)
+            normalized.offsets.append(len(normalized.data))
+        self.normalized = normalized
+
+        word_index = {}
+        for key, postings in self.word_index.items():
+            ids = array(POSTING_TYPECODE, [renumber(idx) for idx in postings if idx not in self.dead])
+            if ids:
+                word_index[key] = ids
+        if len(word_index) != len(self.word_index):
+            self.deletion_index = None
+        self.word_index = word_index
+
+        if self.positional_index is not None:
+            positional_index = {}
+            for key, positions in self.positional_index.items():
+                kept = array(POSITION_TYPECODE, [renumber(p >> 32) << 32 | p & 0xFFFFFFFF
+                                                 for p in positions if p >> 32 not in self.dead])
+                if kept:
+                    positional_index[key] = kept
+            self.positional_index = positional_index
+        self.dead = set()
+
+    def _retired_lines(self) -> int:
+        """
+        Count the occurrences left behind by retired files.
+        """
+        lines = len(self.sentences) if self.occurrences is None else len(self.occurrences)
+        return lines - sum(record.count for record in self.files.values())
+
+    def _any_live(self, ids) -> bool:
+        """
+        Check whether a posting list holds any sentence that is not tombstoned.
+        """
+        if not ids:
+            return False
+        return not self.dead or any(idx not in self.dead for idx in ids)
+
+    def _live(self, ids: List[int]) -> List[int]:
+        """
+        Drop tombstoned sentences from a list of ids.
+        """
+        if not self.dead:
+            return ids
+        return [idx for idx in ids if idx not in self.dead]
+
+    @property
+    def deletion_index(self) -> Dict[str, List[str]]:
+        """
+        Deletion neighbourhood of the index keys, derived on first use after a cache load.
+        """
+        if self._deletion_index is None:
+            with self._deletion_lock:
+                if self._deletion_index is None:
+                    self._deletion_index = build_deletion_index(self.word_index)
+        return self._deletion_index
+
+    @deletion_index.setter
+    def deletion_index(self, value: Dict[str, List[str]]):
+        self._deletion_index = value
+        self._part_index = None  # Derived from the same keys, so rebuilt with them
+
+    @property
+    def part_index(self) -> Dict[str, List[str]]:
+        """
+        Characters, starts and ends of the index keys, derived on first use like deletion_index.
+        """
+        if self._part_index is None:
+            with self._deletion_lock:
+                if self._part_index is None:
+                    self._part_index = build_part_index(self.word_index)
+        return self._part_index
 
     def save_cache(self):
         """
-        Save sentences and index to a compressed cache file.
+        Save sentences and index to a memory-mappable index file.
         """
         print(f"Saving cache to {CACHE_FILE}...")
-        with gzip.open(CACHE_FILE, "wb") as f:
-            pickle.dump((self.sentences, self.word_index), f)
+        self._ensure_normalized()
+        write_index(CACHE_FILE, self._index_sections())
         print("Cache saved.")
 
-    def load_cache(self):
+    def _index_sections(self) -> Dict[str, bytes]:
         """
-        Load sentences and index from a compressed cache file.
+        Lay the sentences, normalized text and word index out as flat sections:
+        UTF-8 blobs with offset arrays, per-sentence file ids and line numbers,
+        keys sorted by their UTF-8 bytes, and one concatenated posting array.
         """
-        print(f"Loading cache from {CACHE_FILE}...")
-        with gzip.open(CACHE_FILE, "rb") as f:
-            self.sentences, self.word_index = pickle.load(f)
+        table = self.sentences
+        if not isinstance(table, SentenceTable):
+            table = SentenceTable.from_rows(table)
+
+        word_index = freeze_index(self.word_index)
+        keys = sorted(word_index, key=lambda k: k.encode("utf-8"))
+        key_store = TextStore.from_strings(keys)
+        posting_offsets, postings = array("Q", [0]), array(POSTING_TYPECODE)
+        for key in keys:
+            postings.extend(word_index[key])
+            posting_offsets.append(len(postings))
+
+        sections = {}
+        for name, store in (("text", table.text), ("paths", table.paths), ("norm", self.normalized),
+                            ("keys", key_store)):
+            sections[name] = store.buffer()
+            sections[name + "off"] = store.offsets
+        sections.update(fileid=table.file_ids, lineno=table.line_nos, postoff=posting_offsets, post=postings)
+
+        manifest = TextStore.from_strings(self.files)
+        records = self.files.values()
+        sections.update(files=manifest.buffer(), filesoff=manifest.offsets,
+                        fsize=array("Q", [r.size for r in records]),
+                        fmtime=array("q", [r.mtime_ns for r in records]),
+                        fdigest=b"".join(r.digest for r in records),
+                        ffirst=array("I", [r.first_id for r in records]),
+                        fcount=array("I", [r.count for r in records]),
+                        dead=array(POSTING_TYPECODE, sorted(self.dead)),
+                        root=(self.root_folder or "").encode("utf-8"))
+        if not self._one_line_per_sentence():
+            sections.update(occ=self.occurrences, occline=self.occurrence_lines)
+
+        if self.positional_index is not None:
+            # Positional postings of the same keys, in the same order
+            position_offsets, positions = array("Q", [0]), array(POSITION_TYPECODE)
+            for key in keys:
+                positions.extend(self.positional_index.get(key, ()))
+                position_offsets.append(len(positions))
+            sections.update(posoff=position_offsets, pos=positions)
+        return sections
+
+    def _one_line_per_sentence(self) -> bool:
+        """
+        Check whether the occurrence table just lists every sentence's own
+        line in id order, as files without duplicate lines give, so it need
+        not be saved.
+        """
+        if not self.occurrences:
+            return True
+        return (len(self.occurrences) == len(self.sentences)
+                and all(idx == o for o, idx in enumerate(self.occurrences))
+                and all(a == b for a, b in zip(self.occurrence_lines, self.sentences.line_nos)))
+
+    def _ensure_normalized(self):
+        """
+        Rebuild the normalized store if it does not cover every sentence,
+        e.g. for caches written before it existed.
+        """
+        if len(self.normalized) != len(self.sentences):
+            self.normalized = TextStore.from_strings(normalize_text(line) for line, _, _ in self.sentences)
+
+    def _ensure_mutable(self):
+        """
+        Copy a memory-mapped index into memory so more files can be added to it.
+        """
+        if not isinstance(self.sentences, SentenceTable):
+            self.sentences = SentenceTable.from_rows(self.sentences)
+        elif isinstance(self.sentences.text.data, mmap.mmap):
+            self.sentences = self.sentences.copy()
+        if isinstance(self.normalized.data, mmap.mmap):
+            self.normalized = self.normalized.copy()
+        if isinstance(self.word_index, MappedIndex):
+            self.word_index = {key: array(POSTING_TYPECODE, postings.tobytes())
+                               for key, postings in self.word_index.items()}
+        else:
+            self.word_index = freeze_index(self.word_index)
+        if isinstance(self.positional_index, MappedIndex):
+            self.positional_index = {key: array(POSITION_TYPECODE, positions.tobytes())
+                                     for key, positions in self.positional_index.items()}
+        if self.occurrences is None:
+            self.occurrences = array("I", range(len(self.sentences)))
+            self.occurrence_lines = array("I", self.sentences.line_nos)
+        elif not isinstance(self.occurrences, array):
+            self.occurrences = array("I", self.occurrences.tobytes())
+            self.occurrence_lines = array("I", self.occurrence_lines.tobytes())
+
+    def load_cache(self, path: str = None):
+        """
+        Load sentences and index from the cache file, or from 'path'. Index
+        files are memory-mapped rather than read, so loading only touches the
+        header; gzip+pickle caches from earlier versions are still read in full.
+        """
+        path = path or CACHE_FILE
+        print(f"Loading cache from {path}...")
+        if is_index_file(path):
+            index = IndexFile(path)
+            self.sentences = SentenceTable.mapped(index)
+            self.normalized = TextStore.mapped(index, "norm")
+            keys = TextStore.mapped(index, "keys")
+            self.word_index = MappedIndex(keys, index.array("postoff", "Q"), index.array("post", POSTING_TYPECODE))
+            self.positional_index = None
+            if "pos" in index.sections:
+                self.positional_index = MappedIndex(keys, index.array("posoff", "Q"),
+                                                    index.array("pos", POSITION_TYPECODE))
+            self.occurrences = self.occurrence_lines = None
+            if "occ" in index.sections:
+                self.occurrences, self.occurrence_lines = index.array("occ", "I"), index.array("occline", "I")
+            self.deletion_index = None
+            self._load_manifest(index)
+            self._index_file = index
+        else:
+            self._load_pickle_cache(path)
+            self._index_file = None
+        self._live_counts, self._orphans = None, set()
+        self.generation += 1
         print(f"Loaded {len(self.sentences)} sentences, indexed {len(self.word_index)} prefixes.")
 
+    def load_in_background(self, load: Callable[[], None]) -> threading.Thread:
+        """
+        Run 'load', e.g. load_cache(), on a daemon thread and return at once.
+        Queries wait until it has finished, and raise if it failed. The
+        thread then warms up what the first queries would otherwise pay for:
+        it asks for the key dictionary of a mapped index to be read in, and
+        builds the deletion and part indexes. Postings are paged in as queries
+        touch them.
+        """
+        self._loaded.clear()
+        self._load_error = None
+
+        def run():
+            try:
+                load()
+            except BaseException as e:
+                self._load_error = e
+                return
+            finally:
+                self._loaded.set()
+            if self._index_file is not None:
+                self._index_file.prefetch("keys", "keysoff", "postoff")
+            _ = self.deletion_index, self.part_index  # Built on first access
+
+        thread = threading.Thread(target=run, name="autocomplete-load", daemon=True)
+        thread.start()
+        return thread
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for load_in_background() to finish. Returns False if 'timeout'
+        seconds passed first, and raises RuntimeError if the load failed.
+        """
+        if not self._loaded.wait(timeout):
+            return False
+        if self._load_error is not None:
+            raise RuntimeError("loading the index failed") from self._load_error
+        return True
+
+    def _load_manifest(self, index: IndexFile):
+        """
+        Read the file manifest and tombstones saved by _index_sections().
+        """
+        if "files" not in index.sections:
+            # Index files written before the manifest existed cannot be refreshed
+            self.root_folder, self.files, self.dead = None, {}, set()
+            return
+        paths = TextStore.mapped(index, "files")
+        sizes, mtimes = index.array("fsize", "Q"), index.array("fmtime", "q")
+        digests = index.bytes("fdigest")
+        first_ids, counts = index.array("ffirst", "I"), index.array("fcount", "I")
+        self.files = {}
+        for i in range(len(paths)):
+            digest = digests[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE].tobytes()
+            self.files[paths[i]] = SourceFile(sizes[i], mtimes[i], digest, first_ids[i], counts[i])
+        self.dead = set(index.array("dead", POSTING_TYPECODE))
+        self.root_folder = index.bytes("root").tobytes().decode("utf-8") or None
+
+    def _load_pickle_cache(self, path: str):
+        """
+        Load a gzip-compressed pickle cache written before the index file format.
+        """
+        import gzip
+        import pickle
+        with gzip.open(path, "rb") as f:
+            cached = pickle.load(f)
+        sentences, word_index = cached[:2]
+        self.sentences = sentences if isinstance(sentences, SentenceTable) else SentenceTable.from_rows(sentences)
+        self.normalized = cached[2] if len(cached) > 2 else TextStore()
+        self._ensure_normalized()
+        # Caches written before posting lists were frozen still hold plain lists
+        self.word_index = freeze_index(word_index)
+        self.deletion_index = build_deletion_index(self.word_index)
+        self._part_index = build_part_index(self.word_index)
+        # No manifest was kept, so these caches cannot be refreshed
+        self.root_folder, self.files, self.dead = None, {}, set()
+        self.occurrences = self.occurrence_lines = None
+        self.positional_index = None
+
+    def _instrumented(self) -> bool:
+        return self.metrics is not None or self.slow_query_seconds is not None or _log.isEnabledFor(logging.DEBUG)
+
+    def _report(self, stats: Union[QueryStats, BuildStats]):
+        """
+        Pass 'stats' to the metrics callback and log it. Stats are logged at
+        DEBUG level, or as a warning for a query slower than slow_query_seconds,
+        with the fields as a dict in the record's 'stats' attribute.
+        """
+        if self.metrics is not None:
+            self.metrics(stats)
+        slow = isinstance(stats, QueryStats) and self.slow_query_seconds is not None \
+            and stats.total_s > self.slow_query_seconds
+        level = logging.WARNING if slow else logging.DEBUG
+        if _log.isEnabledFor(level):
+            _log.log(level, "%s%r", "slow query: " if slow else "", stats, extra={"stats": asdict(stats)})
+
+    def profile_query(self, prefix: str, sort: str = "cumulative", limit: int = 25) -> List[AutoCompleteData]:
+        """
+        Run one query under cProfile, bypassing the result cache, print the
+        'limit' most expensive functions sorted by 'sort', and return the results.
+        """
+        import cProfile
+        import pstats
+        cache, self.result_cache = self.result_cache, None
+        profiler = cProfile.Profile()
+        try:
+            results = profiler.runcall(self.get_best_k_completions, prefix)
+        finally:
+            self.result_cache = cache
+        pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+        return results
+
+    def _candidates(self, prefix_norm: str, within=None, stats: Optional[QueryStats] = None,
+                    deadline: Optional[float] = None):
+        """
+        Return the sorted ids of sentences that may match 'prefix_norm', timing
+        the selection into 'stats' when given, or None if 'deadline' passed
+        first. See _select_candidates().
+        """
+        if stats is None:
+            return self._select_candidates(prefix_norm, within, deadline=deadline)
+        start = time.perf_counter()
+        candidates = self._select_candidates(prefix_norm, within, stats, deadline)
+        stats.candidates_s = time.perf_counter() - start
+        if candidates is None:
+            stats.partial = True
+        else:
+            stats.candidates = len(candidates)
+        return candidates
+
+    def _select_candidates(self, prefix_norm: str, within=None, stats: Optional[QueryStats] = None,
+                           deadline: Optional[float] = None):
+        """
+        Return the sorted ids of sentences that may match 'prefix_norm'.
+        'within' restricts the result to a sorted list of ids already known to
+        contain the anchor, e.g. the survivors of a shorter prefix.
+
+        As before, sentences must contain the anchor key (the first word, or its
+        first 3 characters) unless the anchor has no postings at all, in any
+        shard when this is one shard of a larger index. On top of
+        that, every other key of the prefix is counted and a sentence needs at
+        least N - MAX_KEYS_LOST_PER_EDIT of them, which still admits one edit.
+        When the anchor is missing, candidates come from the keys within one
+        edit of each prefix key (see _neighbour_keys() and _word_break_ids())
+        instead of a scan over all sentences; a short anchor that only occurs
+        inside longer words is first looked for exactly (see _exact_fallback()).
+        Only this fallback can reach a large part of the corpus, so only it
+        stops at time.perf_counter() 'deadline', returning None.
+        """
+        words = prefix_norm.split()
+        anchor = anchor_key(words)
+        keys = query_keys(words)
+
+        required = self.word_index.get(anchor) if within is None else within
+        if within is not None or self._any_live(required):
+            lists = [self.word_index.get(k, _EMPTY_POSTINGS) for k in keys if k != anchor]
+            return self._live(count_filter(lists, len(lists) - MAX_KEYS_LOST_PER_EDIT, required))
+        if self.shared_keys is not None and anchor in self.shared_keys:
+            # Another shard holds the anchor, so the index as a whole does not fall back
+            return []
+
+        _log.debug("no postings for anchor %r of %r, looking up single edit neighbours", anchor, prefix_norm)
+        if stats is not None:
+            stats.fallback = True
+        if len(anchor) < 3:
+            exact = self._exact_fallback(prefix_norm, anchor, keys, deadline)
+            if exact is None:
+                return None
+            lines = set()
+            for idx in exact:
+                lines.add(self.sentences.line(idx))
+                if len(lines) == MAX_COMPLETIONS:
+                    # No edit match can enter the top k
+                    return exact
+        keys = keys or [anchor]
+        lists = [self.word_index.get(k, _EMPTY_POSTINGS) for k in keys]
+        threshold = len(lists) - MAX_KEYS_LOST_PER_EDIT
+        if threshold > 0:
+            candidates = count_filter(lists, threshold, deadline=deadline)
+            return None if candidates is None else self._live(candidates)
+
+        # Too few keys for counting: every key, the anchor too, is either
+        # present or was hit by the edit, in which case the sentence holds one
+        # of its neighbours. Keys whose neighbours hold the fewest postings go first
+        if anchor not in keys:
+            keys = keys + [anchor]
+        neighbours = []
+        for key in keys:
+            if len(key) > 1:
+                lists = []
+                for n, neighbour in enumerate(self._neighbour_keys(key)):
+                    if past_deadline(deadline, n):
+                        return None
+                    lists.append(self.word_index[neighbour])
+                neighbours.append((lists, key))
+        neighbours.sort(key=lambda n: sum(map(len, n[0])))
+        candidates = None
+        for lists, key in neighbours:
+            ids = set()
+            for postings in lists:
+                if past_deadline(deadline, 0):
+                    return None
+                ids.update(postings)
+            if len(key) == 3:
+                broken = self._word_break_ids(prefix_norm, key, deadline)
+                if broken is None:
+                    return None
+                ids.update(broken)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if candidates is None:
+            # Every key is a lone character, which one edit turns into any
+            # other, and fewer than MAX_COMPLETIONS sentences hold the prefix
+            # exactly: the rest all match with a substitution, so all compete
+            return self._live(list(range(len(self.sentences))))
+        return self._live(sorted(candidates))
+
+    def _exact_fallback(self, prefix_norm: str, anchor: str, keys: List[str],
+                        deadline: Optional[float] = None) -> Optional[List[int]]:
+        """
+        Return the sorted ids of the sentences holding 'prefix_norm' exactly,
+        or None if 'deadline' passes first. A short 'anchor' without postings
+        of its own may still end a longer word, and exact hits outrank every
+        edit match, so with enough of them the fallback need not look any
+        further. 'keys' are the other keys of the prefix.
+        """
+        lists = []
+        for key in keys:
+            postings = self.word_index.get(key)
+            if not postings:
+                return []
+            lists.append(postings)
+        if len(anchor) == 2:
+            holders = self.part_index.get(" " + anchor, []) + self.part_index.get(anchor + " ", [])
+        else:
+            holders = self.part_index.get(anchor, [])
+        ids = set()
+        for n, key in enumerate(holders):
+            if past_deadline(deadline, n):
+                return None
+            ids.update(self.word_index[key])
+        hits = count_filter(lists, len(lists), sorted(ids), deadline)
+        if hits is None:
+            return None
+        hits = self._live(hits)
+        if prefix_norm != anchor:
+            prefix_bytes = prefix_norm.encode("utf-8")
+            hits = [idx for idx in hits if self.normalized.contains(idx, prefix_bytes)]
+        return hits
+
+    def _neighbour_keys(self, key: str) -> List[str]:
+        """
+        Return the index keys a sentence may hold where one edit hit the key
+        'key' of 2 or 3 characters, without splitting it at a word break (see
+        _word_break_ids()): keys within one edit of it, plus trigrams that
+        contain one of its deletions (a deleted middle character leaves a
+        2-character remainder inside a longer word).
+        """
+        if len(key) == 2:
+            # Every edit of a 2-character key keeps one of its characters, which
+            # can sit anywhere in a key, even when the other became a word break
+            return list(dict.fromkeys(self.part_index.get(key[0], []) + self.part_index.get(key[1], [])))
+        neighbours = set(self.deletion_index.get(key, ()))
+        if key in self.word_index:
+            neighbours.add(key)
+        for d in deletions(key):
+            if d in self.word_index:
+                neighbours.add(d)
+            neighbours.update(self.deletion_index.get(d, ()))
+        return list(neighbours)
+
+    def _word_break_ids(self, prefix_norm: str, key: str, deadline: Optional[float] = None) -> Optional[set]:
+        """
+        Return the ids of sentences where one edit split the trigram 'key' of
+        'prefix_norm' at a word break, by turning one of its characters into a
+        space or inserting one inside it. The rest of the prefix is then
+        intact, so such a sentence holds the broken prefix, with a key ending
+        in the 1 or 2 characters before the break and one starting with those
+        after it. Only the side with fewer such keys is looked up (see
+        key_parts()), and its sentences checked for the broken prefix.
+        Returns None if 'deadline' passes first.
+        """
+        found = set()
+        start = prefix_norm.find(key)
+        while start != -1:
+            for i in range(len(key)):
+                pos = start + i
+                for broken in (prefix_norm[:pos] + " " + prefix_norm[pos + 1:],
+                               prefix_norm[:pos] + " " + prefix_norm[pos:] if i else None):
+                    if broken is None or "  " in broken:
+                        continue
+                    left, right = broken[:pos].rsplit(" ", 1)[-1][-2:], broken[pos + 1:].split(" ", 1)[0][:2]
+                    sides = [self.part_index.get(part, []) for part in (left and left + " ", right and " " + right)
+                             if part]
+                    encoded = broken.encode("utf-8")
+                    for k in min(sides, key=len):
+                        if past_deadline(deadline, 0):
+                            return None
+                        for idx in self.word_index[k]:
+                            if idx not in found and self.normalized.contains(idx, encoded):
+                                found.add(idx)
+            start = prefix_norm.find(key, start + 1)
+        return found
 
-    def get_best_k_completions(self, prefix: str) -> List[AutoCompleteData]:
+    def get_best_k_completions(self, prefix: str, budget: Optional[float] = None) -> List[AutoCompleteData]:
         """
         Return the top 5 best completions for the given prefix.
+
+        With a time 'budget' in seconds, candidates that can only match with
+        an edit stop being checked once it has run out, and the best
+        completions found by then are returned as PartialCompletions. Exact
+        matches outrank every edit and are always checked in full, so only
+        single edit matches can be missing, and only when fewer than 5 exact
+        ones were found. The exception is a typo in the first word that
+        leaves its anchor key without postings: looking up the neighbours of
+        the typo, and checking them for exact hits, stop at the budget too.
+        Partial results are not cached.
         """
         prefix_norm = normalize_text(prefix)
         if not prefix_norm:
             return []
+        self.wait_loaded()
+        deadline = time.perf_counter() + budget if budget is not None else None
+        stats = None
+        if self._instrumented():
+            stats = QueryStats(prefix_norm)
+            start = time.perf_counter()
+
+        cache = self.result_cache
+        if cache is None:
+            candidates = self._candidates(prefix_norm, stats=stats, deadline=deadline)
+            if candidates is None:
+                results = PartialCompletions()
+            else:
+                fallback = not self._any_live(self.word_index.get(anchor_key(prefix_norm.split())))
+                results = self._search(prefix_norm, candidates, stats=stats, deadline=deadline, fallback=fallback)[0]
+        else:
+            generation = self.generation
+            entry = cache.get(prefix_norm, generation)
+            if entry is None:
+                anchor = anchor_key(prefix_norm.split())
+                previous = cache.longest_prefix(prefix_norm, anchor, generation)
+                entry = self._query(prefix_norm, anchor, previous, stats, deadline)
+                if not isinstance(entry.results, PartialCompletions):
+                    cache.put(prefix_norm, entry, generation)
+                if stats is not None:
+                    stats.cache = "miss" if previous is None else "reused"
+            elif stats is not None:
+                stats.cache = "hit"
+            results = entry.results if isinstance(entry.results, PartialCompletions) else list(entry.results)
 
-        results = []
-        lp = len(prefix_norm)
+        if stats is not None:
+            stats.results = len(results)
+            stats.total_s = time.perf_counter() - start
+            self._report(stats)
+        return results
 
-        first_word = prefix_norm.split()[0]
-        candidate_idxs = set()
+    def get_best_k_completions_batch(self, prefixes) -> List[List[AutoCompleteData]]:
+        """
+        Return get_best_k_completions() of every prefix, in order.
 
-        # Handle very short words (length 1 or 2) with direct dictionary lookup
-        if len(first_word) in (1, 2):
-            indices = self.word_index.get(first_word, [])
-            if indices:
-                candidate_idxs.update(indices)
-            else:
-                # No direct matches for short word — fallback to scanning all sentences
-                print(f"No direct matches found for '{first_word}', checking all sentences for single edit matches...")
-                candidate_idxs = set(range(len(self.sentences)))
+        Each distinct normalized prefix is queried once. Prefixes are visited in
+        sorted order, which puts every prefix right after the shorter ones it
+        extends, so each query starts from the survivors of the longest
+        extended prefix with the same anchor, as CompletionSession does.
+        The result cache is neither used nor filled.
+        """
+        self.wait_loaded()
+        normalized = [normalize_text(p) for p in prefixes]
+        answers: Dict[str, List[AutoCompleteData]] = {"": []}
+        chain: List[Tuple[str, CachedQuery]] = []  # Nested prefixes of the current one
+        for prefix_norm in sorted(set(normalized)):
+            if not prefix_norm:
+                continue
+            while chain and not prefix_norm.startswith(chain[-1][0]):
+                chain.pop()
+            anchor = anchor_key(prefix_norm.split())
+            previous = next((entry for _, entry in reversed(chain)
+                             if entry.anchor == anchor and entry.survivors is not None), None)
+            entry = self._query(prefix_norm, anchor, previous)
+            chain.append((prefix_norm, entry))
+            answers[prefix_norm] = entry.results
+        return [list(answers[p]) for p in normalized]
+
+    def sources(self, completion: AutoCompleteData) -> List[Tuple[str, int]]:
+        """
+        Return (source path, line number) of every indexed line holding the
+        completed sentence, in index order. The completion reports the first.
+        """
+        self.wait_loaded()
+        source = [(completion.source_text, completion.offset)]
+        record = self.files.get(completion.source_text)
+        if not self.occurrences or record is None:
+            return source
+        end = record.first_id + record.count
+        o = bisect_left(self.occurrence_lines, completion.offset, record.first_id, end)
+        if o == end or self.occurrence_lines[o] != completion.offset:
+            return source
+        idx = self.occurrences[o]
+
+        if self._sources is None or self._sources[0] != self.generation:
+            self._sources = (self.generation, *self._occurrences_by_sentence())
+        _, starts, order, records = self._sources
+        found = []
+        for o in order[starts[idx]:starts[idx + 1]]:
+            i = bisect_right(records, (o, float("inf"))) - 1
+            if i >= 0 and o < records[i][0] + records[i][1]:
+                found.append((records[i][2], self.occurrence_lines[o]))
+        return found
 
+    def _occurrences_by_sentence(self):
+        """
+        Group the occurrence table by sentence id. Returns the start of each
+        sentence's group, the occurrence indexes grouped in index order, and
+        (first occurrence, count, path) of every file sorted by first occurrence.
+        """
+        starts = array("I", bytes(4 * (len(self.sentences) + 1)))
+        for idx in self.occurrences:
+            starts[idx + 1] += 1
+        for idx in range(len(self.sentences)):
+            starts[idx + 1] += starts[idx]
+        order, filled = array("I", bytes(4 * len(self.occurrences))), array("I", starts)
+        for o, idx in enumerate(self.occurrences):
+            order[filled[idx]] = o
+            filled[idx] += 1
+        records = sorted((record.first_id, record.count, path) for path, record in self.files.items())
+        return starts, order, records
+
+    def _query(self, prefix_norm: str, anchor: str, previous: Optional[CachedQuery] = None,
+               stats: Optional[QueryStats] = None, deadline: Optional[float] = None) -> CachedQuery:
+        """
+        Run a query, starting from the survivors of 'previous' when it is a
+        shorter prefix with the same anchor key. A sentence that cannot match
+        a prefix cannot match any extension of it, and one that does not
+        contain it exactly will not contain the extension exactly either.
+        A search cut short at 'deadline' still leaves valid survivors; one cut
+        short while selecting candidates leaves none.
+        """
+        if previous is not None:
+            candidates = self._candidates(prefix_norm, within=previous.survivors, stats=stats, deadline=deadline)
+            inexact = previous.inexact
         else:
-            if len(first_word) >= 3:
-                substring = first_word[:3]
-                indices = self.word_index.get(substring, [])
-                candidate_idxs.update(indices)
+            candidates = self._candidates(prefix_norm, stats=stats, deadline=deadline)
+            inexact = _EMPTY_POSTINGS
+        if candidates is None:
+            return CachedQuery(PartialCompletions(), anchor, None, _EMPTY_POSTINGS, None)
 
-            # If still no direct matches — fallback to scanning all sentences
-            if not candidate_idxs:
-                print(f"No direct matches found for '{first_word}', checking all sentences for single edit matches...")
-                candidate_idxs = set(range(len(self.sentences)))
+        anchored = self._any_live(self.word_index.get(anchor))
+        results, fuzzy_idxs, rejected = self._search(prefix_norm, candidates, inexact, stats, deadline, not anchored)
+
+        survivors, inexact = None, _EMPTY_POSTINGS
+        if len(candidates) <= MAX_REUSED_CANDIDATES and anchored:
+            # Neighbour lookups are not narrowed incrementally. Both lists stay
+            # sorted, as the fuzzy ids are in candidate order
+            survivors = array(POSTING_TYPECODE, [idx for idx in candidates if idx not in rejected])
+            inexact = array(POSTING_TYPECODE, [idx for idx in fuzzy_idxs if idx not in rejected])
+        return CachedQuery(results, anchor, survivors, inexact, None)
+
+    def _search(self, prefix_norm: str, candidates, inexact=_EMPTY_POSTINGS, stats: Optional[QueryStats] = None,
+                deadline: Optional[float] = None, fallback: bool = False):
+        """
+        Verify 'candidates' against 'prefix_norm' and pick the top completions.
+        Ids in the sorted array 'inexact' are known not to contain the prefix
+        exactly. Counts and timings are added to 'stats' when given. Exact
+        hits are always all found, unless the candidates are a 'fallback' for
+        a missing anchor; single edit matching stops at time.perf_counter()
+        'deadline', and the completions found by then are returned as
+        PartialCompletions.
+
+        Returns:
+            (completions, ids that only matched or may match with an edit,
+             ids that cannot match)
+        """
+        start = time.perf_counter() if stats is not None else 0.0
+        prefix_bytes = prefix_norm.encode("utf-8")
+        exact_score = 2 * len(prefix_norm)
+        top = TopK(MAX_COMPLETIONS)
+
+        # Exact hits outrank every single edit match, so check them all first
+        # and only run the fuzzy matcher if they did not fill the top k
+        partial = False
+        reached = len(candidates)
+        exact = self._exact_hits(prefix_norm, candidates) if self.positional_index is not None else None
+        if exact is not None:
+            fuzzy_idxs = [idx for idx in candidates if idx not in exact]
+            for idx in exact:
+                top.push(exact_score, self.sentences.line(idx), idx)
+        else:
+            fuzzy_idxs = []
+            for n, idx in enumerate(candidates):
+                if fallback and past_deadline(deadline, n):
+                    partial, reached = True, n
+                    break
+                if not _contains(inexact, idx) and self.normalized.contains(idx, prefix_bytes):
+                    top.push(exact_score, self.sentences.line(idx), idx)
+                else:
+                    fuzzy_idxs.append(idx)
 
-        candidate_idxs = list(candidate_idxs)
+        # Visit the rest highest possible score first, and skip them once
+        # even that score could not displace the worst hit kept
+        rejected = set()
+        checked = 0
+        bounded = [] if partial else self._bounded(prefix_norm, fuzzy_idxs, top, deadline)
+        if bounded is None:
+            partial, bounded = True, []
+        lines = self.sentences.text
+        for bound, idx in bounded:
+            line = None
+            if top.full():
+                worst = top.worst_score()
+                if worst > bound:
+                    break
+                if worst == bound:
+                    line = lines[idx]
+                    if not top.may_enter(bound, line, idx):
+                        continue
+            if past_deadline(deadline, checked):
+                partial = True
+                break
+            checked += 1
+            score = fuzzy_match_score(prefix_norm, self.normalized[idx])
+            if score is None:
+                rejected.add(idx)
+            else:
+                top.push(score, line or lines[idx], idx)
 
-        for idx in candidate_idxs:
+        final_results = PartialCompletions() if partial else []
+        for _, idx, score in top.ranked():
             sentence, src, offset = self.sentences[idx]
-            sentence_norm = normalize_text(sentence)
+            final_results.append(AutoCompleteData(sentence, src, offset, score))
+        if stats is not None:
+            stats.exact_hits = reached - len(fuzzy_idxs)
+            stats.fuzzy_checks = checked
+            stats.partial = partial
+            stats.verify_s = time.perf_counter() - start
+        return final_results, fuzzy_idxs, rejected
+
+    def _exact_hits(self, prefix_norm: str, candidates: List[int]) -> Optional[set]:
+        """
+        Return the ids among 'candidates' of sentences containing 'prefix_norm'
+        exactly, found by lining up positional postings (see exact_probes()),
+        or None when the prefix cannot be checked that way or a substring scan
+        of the candidates is cheaper. Occurrences of the rarest probe key are
+        each confirmed by binary search in the other keys' postings.
+        """
+        probes = exact_probes(prefix_norm)
+        if probes is None:
+            return None
+        lists = []
+        for key, offset, flags in probes:
+            positions = self.positional_index.get(key)
+            if positions is None:
+                return set()
+            lists.append((positions, offset, flags))
+        lists.sort(key=lambda probe: len(probe[0]))
+        (driver, driver_offset, driver_flags), others = lists[0], lists[1:]
+        if len(driver) * POSITION_PROBE_COST > len(candidates):
+            return None
 
-            if prefix_norm in sentence_norm:
-                score = 2 * lp
-                results.append(AutoCompleteData(sentence, src, offset, score))
+        hits = set()
+        for p in driver:
+            if p & driver_flags != driver_flags:
                 continue
+            sid = p >> 32
+            start = (p >> 2 & 0x3FFFFFFF) - driver_offset
+            if sid in hits or start < 0:
+                continue
+            for positions, offset, flags in others:
+                target = sid << 32 | (start + offset) << 2
+                i = bisect_left(positions, target)
+                if i == len(positions) or positions[i] >> 2 != target >> 2 or positions[i] & flags != flags:
+                    break
+            else:
+                hits.add(sid)
+        return hits.intersection(candidates)
 
-            found = False
-            for L in {lp, lp + 1, lp - 1}:
-                if L <= 0 or L > len(sentence_norm):
-                    continue
+    def _bounded(self, prefix_norm: str, fuzzy_idxs: List[int], top: TopK, deadline: Optional[float] = None):
+        """
+        Return (upper bound on the score, id) for 'fuzzy_idxs', highest bound
+        first and in id order within a bound, given the hits already in 'top'.
+        Bounds come from the keys a candidate is missing, see key_score_caps();
+        they are only worked out when some candidates could be skipped.
+        Returns None if 'deadline' passes while they are.
+        """
+        best = 2 * len(prefix_norm) - min_penalty(len(prefix_norm))
+        if top.full() and top.worst_score() > best:
+            return []
+        caps = []
+        if len(top) + len(fuzzy_idxs) > top.k:
+            caps = [(self.word_index.get(key, _EMPTY_POSTINGS), cap) for key, cap in key_score_caps(prefix_norm)]
+        if not caps:
+            return [(best, idx) for idx in fuzzy_idxs]
 
-                for start in range(len(sentence_norm) - L + 1):
-                    sub = sentence_norm[start:start + L]
-                    info = single_edit_match_info(prefix_norm, sub)
+        bounded = []
+        for n, idx in enumerate(fuzzy_idxs):
+            if past_deadline(deadline, n):
+                return None
+            bound = best
+            for postings, cap in caps:
+                if cap < bound and not _contains(postings, idx):
+                    bound = cap
+            bounded.append((bound, idx))
+        bounded.sort(key=lambda b: -b[0])
+        return bounded
 
-                    if info and info[0] != "exact":
-                        kind, pos = info
-                        base_score = 2 * lp
-                        score = base_score - penalty_for(kind, pos)
-                        results.append(AutoCompleteData(sentence, src, offset, score))
-                        found = True
-                        break
 
-                if found:
-                    break
+class CompletionSession:
+    """
+    Completion state for one user typing a growing prefix.
 
-        results.sort(key=lambda x: (-x.score, x.completed_sentence.lower()))
+    A sentence that cannot match a prefix cannot match any extension of it,
+    and one that does not contain it exactly will not contain the extension
+    exactly either. The session keeps the candidates that survived the last
+    query, and which of them only matched with an edit, and verifies only
+    those for the next keystroke. Anything other than an extension with the
+    same anchor key, or a change to the index in between, falls back to a
+    full query.
+    """
 
-        seen = set()
-        final_results = []
-        for r in results:
-            key = r.completed_sentence
-            if key not in seen:
-                final_results.append(r)
-                seen.add(key)
-            if len(final_results) >= 5:
-                break
+    def __init__(self, acs: AutoCompleteSystem):
+        self.acs = acs
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the previous prefix, e.g. after the user clears the buffer.
+        """
+        self._prefix_norm = ""
+        self._previous = None  # CachedQuery of the last prefix
+        self._generation = None  # Index generation its ids belong to
+
+    def complete(self, prefix: str) -> List[AutoCompleteData]:
+        """
+        Return the top completions for 'prefix', reusing the previous query's
+        survivors when 'prefix' extends it.
+        """
+        prefix_norm = normalize_text(prefix)
+        if not prefix_norm:
+            self.reset()
+            return []
+
+        self.acs.wait_loaded()
+        anchor = anchor_key(prefix_norm.split())
+        generation = self.acs.generation
+        previous = self._previous
+        if (previous is None or previous.survivors is None or anchor != previous.anchor
+                or not prefix_norm.startswith(self._prefix_norm) or generation != self._generation):
+            # Refreshing or compacting the index renumbers sentence ids
+            previous = None
 
-        return final_results
+        self._previous = self.acs._query(prefix_norm, anchor, previous)
+        self._prefix_norm = prefix_norm
+        self._generation = generation
+        return self._previous.results
 
@@ -0,0 +1,70 @@
+"""
+Throughput of get_best_k_completions_batch() against one uncached
+get_best_k_completions() call per prefix, on a log-like prefix mix:
+every keystroke of typed queries, a share of them with a typo, and
+popular queries repeated.
+
+Usage: python -m benchmarks.batch_throughput [--files N] [--lines M] [--queries Q]
+"""
+import argparse
+import contextlib
+import io
+import random
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+
+
+def logged_prefixes(acs, rng, queries, typo_rate=0.3, repeat_rate=0.3):
+    log, typed = [], []
+    while len(typed) < queries:
+        if typed and rng.random() < repeat_rate:
+            typed.append(rng.choice(typed[:50]))  # A few popular queries
+            continue
+        text = acs.normalized[rng.randrange(len(acs.sentences))]
+        start = rng.randrange(max(1, len(text) - 3))
+        query = text[start:start + rng.randint(3, 20)]
+        if rng.random() < typo_rate and len(query) > 3:
+            i = rng.randrange(1, len(query))
+            query = query[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + query[i + 1:]
+        typed.append(query)
+    for query in typed:
+        log.extend(query[:n] for n in range(1, len(query) + 1))
+    rng.shuffle(log)
+    return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs.build_from_folder(folder)
+        acs.result_cache = None
+        prefixes = logged_prefixes(acs, random.Random(args.seed), args.queries)
+        print(f"{len(acs.sentences)} sentences, {len(prefixes)} logged prefixes "
+              f"({len(set(prefixes))} distinct)")
+
+        start = time.perf_counter()
+        single = [acs.get_best_k_completions(p) for p in prefixes]
+        single_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = acs.get_best_k_completions_batch(prefixes)
+        batch_time = time.perf_counter() - start
+
+        print(f"one by one: {len(prefixes) / single_time:8.0f} prefixes/s")
+        print(f"batch:      {len(prefixes) / batch_time:8.0f} prefixes/s   "
+              f"speedup {single_time / batch_time:.1f}x   identical={batch == single}")
+
+
+if __name__ == "__main__":
+    main()
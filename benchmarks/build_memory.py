@@ -0,0 +1,65 @@
+"""
+Compare the peak memory and time of building the index in memory
+(build_from_folder + save_cache) against the spilling build of
+external_build.py at a few memory budgets.
+
+Usage: python -m benchmarks.build_memory [--files N] [--lines M] [--budgets MB [MB ...]]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import autocomplete
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+from external_build import build_index_file
+
+
+def measure(build):
+    """
+    Return (seconds, peak bytes allocated) while running 'build'.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--budgets", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        n_lines = generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        autocomplete.CACHE_FILE = os.path.join(folder, "memory.bin")
+        print(f"{n_lines} lines in {args.files} files (timings include tracemalloc overhead)")
+
+        def in_memory():
+            acs = AutoCompleteSystem()
+            acs.build_from_folder(corpus)
+            acs.save_cache()
+
+        results = [("in memory", *measure(in_memory))]
+        for budget in args.budgets:
+            path = os.path.join(folder, f"external_{budget}.bin")
+            results.append((f"budget {budget:g} MB",
+                            *measure(lambda: build_index_file(corpus, path, int(budget * 2**20)))))
+
+        for name, elapsed, peak in results:
+            print(f"{name:>16}: {elapsed:7.2f} s   peak {peak / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Cold index build time for increasing worker counts, checked against the
+serial build for identical output.
+
+Usage: python -m benchmarks.build_scaling [--files N] [--lines M] [--max-workers W]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+
+
+def timed_build(folder, workers):
+    acs = AutoCompleteSystem()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        acs.build_from_folder(folder, workers=workers)
+    return acs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        serial, serial_time = timed_build(folder, 1)
+        print(f"{len(serial.sentences)} sentences, {os.cpu_count()} CPUs")
+        print(f"workers  1: {serial_time:7.2f} s")
+
+        workers = 2
+        while workers <= args.max_workers:
+            acs, elapsed = timed_build(folder, workers)
+            identical = acs.sentences == serial.sentences and acs.word_index == serial.word_index
+            print(f"workers {workers:2d}: {elapsed:7.2f} s   speedup {serial_time / elapsed:4.1f}x   "
+                  f"identical={identical}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cold start of the CLI: wall time from starting a process to showing the
+prompt and to printing the answer to a first query, as main.py runs it. The
+earlier gzip+pickle cache and the memory-mapped index file are each loaded
+up front and in the background (initialize_autocomplete_system(background=True)).
+
+The first query is an exact prefix, or a typo that falls back to the
+deletion index, which a background load builds after mapping the index. It
+is sent as soon as the prompt shows, or 'think' milliseconds later to stand
+in for the user typing, which a background load overlaps with.
+
+Usage: python -m benchmarks.coldstart [--files N] [--lines M] [--runs R] [--think-ms T]
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import os
+import pickle
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import autocomplete
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+from benchmarks.suite import make_queries
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child, in the folder holding the cache: start up like main.py, then answer one query
+_CHILD = """
+import sys
+from autocomplete import AutoCompleteSystem
+from initialize import initialize_autocomplete_system
+acs = AutoCompleteSystem()
+initialize_autocomplete_system(acs, background=sys.argv[1] == "background")
+print("PROMPT", flush=True)
+print("ANSWER", len(acs.get_best_k_completions(input())), flush=True)
+"""
+
+
+def read_until(stream, marker: str) -> str:
+    for line in stream:
+        # A background load prints from another thread, possibly on the same line
+        if marker in line:
+            return line
+    raise RuntimeError(f"child exited before printing {marker}")
+
+
+def measure(folder, mode, prefix, think, runs):
+    """
+    Return the median seconds from process start to the prompt and to the
+    answer to 'prefix', not counting 'think'.
+    """
+    env = dict(os.environ, PYTHONPATH=REPO)
+    rows = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        child = subprocess.Popen([sys.executable, "-c", _CHILD, mode], cwd=folder, env=env, text=True,
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        read_until(child.stdout, "PROMPT")
+        prompt = time.perf_counter() - start
+        time.sleep(think)
+        child.stdin.write(prefix + "\n")
+        child.stdin.flush()
+        read_until(child.stdout, "ANSWER")
+        rows.append((prompt, time.perf_counter() - start - think))
+        child.communicate()
+    prompt, answer = (statistics.median(col) for col in zip(*rows))
+    return prompt, answer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--think-ms", type=float, default=0, help="delay between the prompt and the query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        mapped, pickled = os.path.join(folder, "mapped"), os.path.join(folder, "pickled")
+        os.makedirs(mapped)
+        os.makedirs(pickled)
+        acs = AutoCompleteSystem()
+        autocomplete.CACHE_FILE = os.path.join(mapped, os.path.basename(autocomplete.CACHE_FILE))
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs.build_from_folder(corpus)
+            acs.save_cache()
+        with gzip.open(os.path.join(pickled, os.path.basename(autocomplete.CACHE_FILE)), "wb") as f:
+            pickle.dump((acs.sentences, acs.word_index, acs.normalized), f)
+
+        queries = make_queries(acs, random.Random(args.seed), 1)
+        exact, fallback = queries["exact"][0], queries["fallback"][0]
+        print(f"{len(acs.sentences)} sentences, {len(acs.word_index)} keys, queries {exact!r} and {fallback!r}, "
+              f"think {args.think_ms:g} ms")
+        print(f"{'cache':<13}{'load':<12}{'prompt ms':>10}{'exact ms':>10}{'fallback ms':>13}")
+        for label, path in (("gzip+pickle", pickled), ("index file", mapped)):
+            for mode in ("eager", "background"):
+                prompt, answer = measure(path, mode, exact, args.think_ms / 1000, args.runs)
+                fallback_answer = measure(path, mode, fallback, args.think_ms / 1000, args.runs)[1]
+                print(f"{label:<13}{mode:<12}{prompt * 1000:>10.1f}{answer * 1000:>10.1f}"
+                      f"{fallback_answer * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import random
+import string
+from typing import List
+
+_LETTERS = string.ascii_lowercase
+
+
+def make_vocabulary(rng: random.Random, size: int) -> List[str]:
+    """
+    Create 'size' distinct pseudo-words with lengths between 1 and 12 letters.
+    """
+    words = set()
+    while len(words) < size:
+        length = min(12, max(1, int(rng.gauss(5, 2.5))))
+        words.add("".join(rng.choice(_LETTERS) for _ in range(length)))
+    return sorted(words)
+
+
+def make_line(rng: random.Random, vocab: List[str], weights: List[float]) -> str:
+    n_words = rng.randint(3, 14)
+    words = rng.choices(vocab, weights=weights, k=n_words)
+    line = " ".join(words).capitalize()
+    if rng.random() < 0.3:
+        line += rng.choice(".,!?;")
+    return line
+
+
+def generate_corpus(root_folder: str, n_files: int = 20, n_lines: int = 500,
+                    vocab_size: int = 5000, seed: int = 0, duplicates: float = 0.0,
+                    boilerplate_lines: int = 200) -> int:
+    """
+    Write a deterministic synthetic corpus of 'n_files' x 'n_lines' text files.
+    Words are drawn with Zipf-like weights so common words have long posting lists.
+    A 'duplicates' share of the lines is drawn from 'boilerplate_lines' fixed
+    lines repeated across the files.
+    Returns the number of lines written.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(rng, vocab_size)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    boilerplate = [make_line(rng, vocab, weights) for _ in range(boilerplate_lines)] if duplicates else []
+
+    os.makedirs(root_folder, exist_ok=True)
+    total = 0
+    for file_no in range(n_files):
+        path = os.path.join(root_folder, f"doc_{file_no:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(n_lines):
+                if boilerplate and rng.random() < duplicates:
+                    line = rng.choice(boilerplate)
+                else:
+                    line = make_line(rng, vocab, weights)
+                f.write(line + "\n")
+                total += 1
+    return total
@@ -0,0 +1,63 @@
+"""
+Latency and degradation of get_best_k_completions(budget=...) for a range
+of budgets: per budget, the latency percentiles over the query mix of
+benchmarks/suite.py, the share of queries answered partially, and the share
+of answers that still equal the unbudgeted ones. Read the budget that keeps
+the partial rate acceptable against the p99 it buys.
+
+Candidate selection and exact matching are not cut short, so p99 can stay
+above a small budget.
+
+Usage: python -m benchmarks.deadline [--files N] [--lines M] [--queries Q] [--budgets-ms B [B ...]]
+"""
+import argparse
+import contextlib
+import io
+import random
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem, PartialCompletions
+from benchmarks.corpus import generate_corpus
+from benchmarks.suite import QUERY_CLASSES, make_queries, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=50, help="queries per class")
+    parser.add_argument("--budgets-ms", type=float, nargs="+", default=[50, 20, 10, 5, 2, 1])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs.build_from_folder(folder)
+    acs.result_cache = None
+    queries = make_queries(acs, random.Random(args.seed), args.queries)
+    every = [prefix for name in QUERY_CLASSES for prefix in queries[name]]
+
+    print(f"{len(acs.sentences)} sentences, {len(every)} queries")
+    print(f"{'budget ms':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'partial':>9}{'unchanged':>11}")
+    expected = None
+    for budget_ms in [None] + args.budgets_ms:
+        budget = budget_ms / 1000 if budget_ms is not None else None
+        answers, latencies = [], []
+        for prefix in every:
+            start = time.perf_counter()
+            answers.append(acs.get_best_k_completions(prefix, budget))
+            latencies.append((time.perf_counter() - start) * 1000)
+        expected = expected or answers
+        latencies.sort()
+        partial = sum(isinstance(a, PartialCompletions) for a in answers) / len(answers)
+        unchanged = sum(a == e for a, e in zip(answers, expected)) / len(answers)
+        label = f"{budget_ms:g}" if budget_ms is not None else "none"
+        print(f"{label:>10}{percentile(latencies, 0.5):>9.2f}{percentile(latencies, 0.9):>9.2f}"
+              f"{percentile(latencies, 0.99):>9.2f}{latencies[-1]:>9.2f}{partial:>9.1%}{unchanged:>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Index size, build time and query work as the share of repeated lines in the
+corpus grows. Each distinct line is stored and indexed once, so the numbers
+should follow the distinct sentences rather than the lines read.
+
+Usage: python -m benchmarks.dedup [--files N] [--lines M] [--duplicates F [F ...]] [--queries Q]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import autocomplete
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+from benchmarks.suite import QUERY_CLASSES, make_queries, time_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--duplicates", type=float, nargs="+", default=[0, 0.25, 0.5, 0.75],
+                        help="shares of lines drawn from a fixed pool of boilerplate lines")
+    parser.add_argument("--queries", type=int, default=50, help="queries per class")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'duplicates':>10}{'lines':>9}{'sentences':>11}{'postings':>10}{'file MiB':>10}{'build s':>9}"
+          f"{'fuzzy/query':>13}{'p50 ms':>9}{'p99 ms':>9}")
+    for share in args.duplicates:
+        with tempfile.TemporaryDirectory() as folder:
+            corpus = os.path.join(folder, "corpus")
+            generate_corpus(corpus, args.files, args.lines, seed=args.seed, duplicates=share)
+            acs = AutoCompleteSystem()
+            acs.result_cache = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                acs.build_from_folder(corpus)
+                built = time.perf_counter() - start
+                autocomplete.CACHE_FILE = os.path.join(folder, "index.bin")
+                acs.save_cache()
+            file_size = os.path.getsize(autocomplete.CACHE_FILE)
+
+        queries = make_queries(acs, random.Random(args.seed), args.queries)
+        checks = []
+        acs.metrics = lambda stats: checks.append(stats.fuzzy_checks)
+        latencies = [time_queries(acs, queries[name], 1) for name in QUERY_CLASSES]
+        p50 = sorted(q["p50_ms"] for q in latencies)[len(latencies) // 2]
+        p99 = max(q["p99_ms"] for q in latencies)
+        postings = sum(len(ids) for ids in acs.word_index.values())
+        print(f"{share:>10.2f}{len(acs.occurrences):>9}{len(acs.sentences):>11}{postings:>10}"
+              f"{file_size / 2**20:>10.1f}{built:>9.2f}{sum(checks) / len(checks):>13.1f}{p50:>9.3f}{p99:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
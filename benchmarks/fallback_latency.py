@@ -0,0 +1,95 @@
+"""
+Measure queries whose anchor key has no postings (a typo in the first three
+letters). They used to verify every sentence in the corpus; they are now
+answered from the deletion-neighbourhood and part indexes. Queries start
+with a word of 4+ letters, of exactly 3 (the whole anchor trigram is
+missing), or of 2 (a short word only found inside longer ones, if at all).
+
+Usage: python -m benchmarks.fallback_latency [--files N] [--lines M]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem, normalize_text, match_score
+from benchmarks.corpus import generate_corpus
+
+
+def full_scan(acs, prefix):
+    """
+    The previous fallback: verify every sentence in the corpus.
+    """
+    prefix_norm = normalize_text(prefix)
+    return [idx for idx, (line, _, _) in enumerate(acs.sentences)
+            if match_score(prefix_norm, normalize_text(line)) is not None]
+
+
+QUERY_CLASSES = {"long word": (4, 2), "3 letters": (3, 1), "2 letters": (2, 1)}  # First word length, words kept
+
+
+def fallback_queries(acs, rng, count, length=4, n_words=2):
+    """
+    Take prefixes of 'n_words' words from the corpus, starting with a word of
+    'length' letters (or more, for 4), and change one of their first letters
+    until the anchor key is missing from the index.
+    """
+    queries = []
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(1000 * count):
+        if len(queries) == count:
+            break
+        words = normalize_text(acs.sentences[rng.randrange(len(acs.sentences))][0]).split()
+        prefix = " ".join(words[:n_words])
+        if len(words[0]) != length and (length < 4 or len(words[0]) < 4):
+            continue
+        pos = rng.randrange(min(length, 3))
+        typo = prefix[:pos] + rng.choice(letters) + prefix[pos + 1:]
+        if typo[:min(length, 3)] not in acs.word_index:
+            queries.append(typo)
+    return queries
+
+
+def timed(fn, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<14} median {statistics.median(latencies) * 1000:8.2f} ms   "
+          f"max {max(latencies) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(folder)
+
+    acs.result_cache = None
+    print(f"{len(acs.sentences)} sentences")
+    rng = random.Random(args.seed)
+    for name, (length, n_words) in QUERY_CLASSES.items():
+        queries = fallback_queries(acs, rng, args.queries, length, n_words)
+        if not queries:
+            print(f"{name}: no anchor of this length is missing from the index")
+            continue
+        print(f"{name}: {len(queries)} fallback queries, e.g. {queries[0]!r}")
+        report("  full scan", timed(lambda q: full_scan(acs, q), queries))
+        report("  fallback", timed(acs.get_best_k_completions, queries))
+
+
+if __name__ == "__main__":
+    main()
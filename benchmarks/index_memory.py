@@ -0,0 +1,74 @@
+"""
+Compare the memory used by the frozen array-backed word index against the
+original dict-of-lists layout (one list entry per trigram occurrence).
+
+Usage: python -m benchmarks.index_memory [--files N] [--lines M]
+"""
+import argparse
+import gc
+import tempfile
+import tracemalloc
+
+from autocomplete import AutoCompleteSystem, normalize_text, freeze_index
+from benchmarks.corpus import generate_corpus
+
+
+def legacy_word_index(sentences):
+    """
+    Rebuild the index the way it was stored before freezing: a plain list per
+    key with one entry for every occurrence.
+    """
+    index = {}
+    for idx, (line, _, _) in enumerate(sentences):
+        for w in normalize_text(line).split():
+            if len(w) in (1, 2):
+                index.setdefault(w, []).append(idx)
+            else:
+                for j in range(len(w) - 2):
+                    index.setdefault(w[j:j + 3], []).append(idx)
+    return index
+
+
+def measure(build):
+    """
+    Return (object, bytes allocated) for the structure produced by 'build'.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(folder)
+
+    legacy, legacy_bytes = measure(lambda: legacy_word_index(acs.sentences))
+    # Key strings are shared with the legacy dict, so only the dict and arrays are counted here
+    frozen, frozen_bytes = measure(lambda: freeze_index(legacy))
+
+    legacy_postings = sum(len(v) for v in legacy.values())
+    frozen_postings = sum(len(v) for v in frozen.values())
+
+    print(f"sentences:        {len(acs.sentences)}")
+    print(f"keys:             {len(frozen)}")
+    print(f"postings:         {legacy_postings} (dict-of-lists) -> {frozen_postings} (frozen)")
+    print(f"dict-of-lists:    {legacy_bytes / 1e6:.2f} MB")
+    print(f"frozen arrays:    {frozen_bytes / 1e6:.2f} MB")
+    print(f"reduction:        {legacy_bytes / max(frozen_bytes, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
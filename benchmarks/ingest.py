@@ -0,0 +1,80 @@
+"""
+Build time when the corpus is a few large files, or compressed.
+
+A parallel build can only spread whole files over its workers unless large
+files are split into byte ranges (IngestOptions.chunk_bytes), so this compares
+a serial build, a parallel build over whole files and a parallel build over
+chunks, all checked against the serial output. It then times serial builds of
+the same corpus stored as .txt.gz, .txt.bz2 and .txt.xz files.
+
+Usage: python -m benchmarks.ingest [--files N] [--lines M] [--workers W] [--chunk-kb K]
+"""
+import argparse
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+from ingest import IngestOptions
+
+
+def timed_build(folder, workers=1, chunk_bytes=None):
+    acs = AutoCompleteSystem()
+    if chunk_bytes:
+        acs.ingest = IngestOptions(chunk_bytes=chunk_bytes)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        acs.build_from_folder(folder, workers=workers)
+    return acs, time.perf_counter() - start
+
+
+def compress_corpus(source, target, opener, suffix):
+    os.makedirs(target)
+    for name in os.listdir(source):
+        with open(os.path.join(source, name), "rb") as f, opener(os.path.join(target, name + suffix), "wb") as g:
+            shutil.copyfileobj(f, g)
+    return sum(os.path.getsize(os.path.join(target, name)) for name in os.listdir(target))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-kb", type=int, default=256, help="byte range size for the chunked build")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        size = sum(os.path.getsize(os.path.join(corpus, name)) for name in os.listdir(corpus))
+        serial, serial_time = timed_build(corpus)
+        print(f"{args.files} files, {size / 2**20:.1f} MiB, {len(serial.sentences)} sentences, "
+              f"{args.workers} workers")
+        print(f"{'build':<22}{'seconds':>9}{'speedup':>9}  identical")
+        print(f"{'serial':<22}{serial_time:>9.2f}{1:>9.1f}")
+        for name, chunk_bytes in (("parallel, whole files", size + 1), ("parallel, chunked", args.chunk_kb << 10)):
+            acs, elapsed = timed_build(corpus, args.workers, chunk_bytes)
+            identical = acs.sentences == serial.sentences and acs.files == serial.files
+            print(f"{name:<22}{elapsed:>9.2f}{serial_time / elapsed:>9.1f}  {identical}")
+
+        expected = sorted(serial.sentences.text)
+        print(f"{'compression':<22}{'seconds':>9}{'MiB':>9}  identical")
+        for opener, suffix in ((gzip.open, ".gz"), (bz2.open, ".bz2"), (lzma.open, ".xz")):
+            packed = os.path.join(folder, suffix[1:])
+            packed_size = compress_corpus(corpus, packed, opener, suffix)
+            acs, elapsed = timed_build(packed)
+            identical = sorted(acs.sentences.text) == expected
+            print(f"{'.txt' + suffix:<22}{elapsed:>9.2f}{packed_size / 2**20:>9.1f}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load generator for server.py: keep-alive clients send prefixes sampled
+from the indexed folder and report QPS and latency percentiles.
+
+Start the server first, e.g.
+    python server.py corpus_folder --port 8000
+then
+    python -m benchmarks.loadgen corpus_folder [--port 8000] [--clients C] [--requests N]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote
+
+from ingest import file_lines, find_text_files
+
+
+def sample_prefixes(folder, count, rng, typo_rate):
+    """
+    Cut random prefixes out of lines under 'folder'; a share of them get one typo.
+    """
+    lines = []
+    for path in find_text_files(folder):
+        lines.extend(line for _, line in file_lines(path, errors="ignore") if len(line) > 3)
+    prefixes = []
+    for _ in range(count):
+        line = rng.choice(lines)
+        start = rng.randrange(len(line) - 3)
+        prefix = line[start:start + rng.randint(3, 20)]
+        if rng.random() < typo_rate:
+            i = rng.randrange(len(prefix))
+            prefix = prefix[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + prefix[i + 1:]
+        prefixes.append(prefix)
+    return prefixes
+
+
+async def client(host, port, prefixes, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for prefix in prefixes:
+            start = time.perf_counter()
+            writer.write(f"GET /complete?q={quote(prefix)} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            json.loads(await reader.readexactly(length))
+            if b" 200 " not in status:
+                raise RuntimeError(f"server answered {status!r} for {prefix!r}")
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run(host, port, prefixes, clients):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, prefixes[i::clients], latencies) for i in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="folder the server indexed, used to sample prefixes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--typo-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    prefixes = sample_prefixes(args.folder, args.requests, random.Random(args.seed), args.typo_rate)
+    latencies, elapsed = asyncio.run(run(args.host, args.port, prefixes, args.clients))
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f} s: "
+          f"{len(latencies) / elapsed:.0f} QPS")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms   max {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
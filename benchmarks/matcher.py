@@ -0,0 +1,74 @@
+"""
+Micro-benchmark the single edit substring matcher against the previous
+sliding window, which called single_edit_match_info on every substring of
+three window lengths.
+
+Usage: python -m benchmarks.matcher [--pairs N]
+"""
+import argparse
+import random
+import time
+
+from autocomplete import best_single_edit_match, single_edit_match_info, normalize_text
+from benchmarks.corpus import make_vocabulary
+
+
+def sliding_window(prefix, text):
+    """
+    The previous matcher: first single edit window found, trying lengths lp, lp+1, lp-1.
+    """
+    lp = len(prefix)
+    for L in {lp, lp + 1, lp - 1}:
+        if L <= 0 or L > len(text):
+            continue
+        for start in range(len(text) - L + 1):
+            info = single_edit_match_info(prefix, text[start:start + L])
+            if info and info[0] != "exact":
+                return info
+    return None
+
+
+def make_pairs(rng, count, sentence_words):
+    """
+    Build (prefix, sentence) pairs: half carry a one-edit copy of a sentence
+    substring, half are unrelated.
+    """
+    vocab = make_vocabulary(rng, 2000)
+    pairs = []
+    for i in range(count):
+        text = normalize_text(" ".join(rng.choice(vocab) for _ in range(sentence_words)))
+        if i % 2:
+            start = rng.randrange(len(text) - 10)
+            prefix = text[start:start + rng.randint(4, 20)]
+            pos = rng.randrange(len(prefix))
+            prefix = prefix[:pos] + "q" + prefix[pos + 1:]
+        else:
+            prefix = normalize_text(" ".join(rng.choice(vocab) for _ in range(2)))
+        pairs.append((prefix, text))
+    return pairs
+
+
+def run(fn, pairs):
+    start = time.perf_counter()
+    for prefix, text in pairs:
+        fn(prefix, text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for words in (8, 30, 100):
+        pairs = make_pairs(rng, args.pairs, words)
+        old = run(sliding_window, pairs)
+        new = run(best_single_edit_match, pairs)
+        print(f"{words:>4} words/sentence: sliding window {old * 1e6 / len(pairs):8.1f} us/pair   "
+              f"anchored matcher {new * 1e6 / len(pairs):8.1f} us/pair   ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Memory versus latency of the optional positional index
+(build_from_folder(positional=True)).
+
+Reports the size of the positional postings against the word index and the
+index file with and without them, the time spent finding exact hits among
+the candidates (substring scans versus lined-up positional postings), and
+end-to-end latency for the query classes of benchmarks/suite.py.
+
+Usage: python -m benchmarks.positional [--files N] [--lines M] [--queries Q]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import autocomplete
+from autocomplete import AutoCompleteSystem, normalize_text
+from benchmarks.corpus import generate_corpus
+from benchmarks.index_memory import measure
+from benchmarks.suite import QUERY_CLASSES, make_queries, time_queries
+
+
+def exact_phase(acs, queries):
+    """
+    Return (seconds, prefixes answered from positional postings) spent
+    finding exact hits among the candidates of 'queries'.
+    """
+    elapsed, positional = 0.0, 0
+    for prefix in queries:
+        prefix_norm = normalize_text(prefix)
+        candidates = acs._candidates(prefix_norm)
+        prefix_bytes = prefix_norm.encode("utf-8")
+        start = time.perf_counter()
+        hits = acs._exact_hits(prefix_norm, candidates) if acs.positional_index is not None else None
+        if hits is None:
+            hits = [idx for idx in candidates if acs.normalized.contains(idx, prefix_bytes)]
+        else:
+            positional += 1
+        elapsed += time.perf_counter() - start
+    return elapsed, positional
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100, help="queries per class")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        systems = {}
+        for positional in (False, True):
+            acs = AutoCompleteSystem()
+            acs.result_cache = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                acs.build_from_folder(corpus, positional=positional)
+                autocomplete.CACHE_FILE = os.path.join(folder, f"index_{positional}.bin")
+                acs.save_cache()
+            systems[positional] = (acs, os.path.getsize(autocomplete.CACHE_FILE))
+
+    plain, plain_file = systems[False]
+    positional, positional_file = systems[True]
+    _, word_bytes = measure(lambda: {k: v[:] for k, v in plain.word_index.items()})
+    _, position_bytes = measure(lambda: {k: v[:] for k, v in positional.positional_index.items()})
+    print(f"{len(plain.sentences)} sentences")
+    print(f"word index:        {word_bytes / 2**20:7.1f} MiB   positional postings {position_bytes / 2**20:7.1f} MiB")
+    print(f"index file:        {plain_file / 2**20:7.1f} MiB   with positions      {positional_file / 2**20:7.1f} MiB")
+
+    queries = make_queries(plain, random.Random(args.seed), args.queries)
+    print(f"{'class':<14}{'exact hits scan':>16}{'positional':>12}{'used':>6}{'p50 ms':>10}{'p50 pos':>10}"
+          f"{'p99 ms':>10}{'p99 pos':>10}")
+    for name in QUERY_CLASSES:
+        scan, _ = exact_phase(plain, queries[name])
+        lined_up, used = exact_phase(positional, queries[name])
+        before = time_queries(plain, queries[name], 3)
+        after = time_queries(positional, queries[name], 3)
+        print(f"{name:<14}{scan * 1000:>13.1f} ms{lined_up * 1000:>9.1f} ms{used:>6}"
+              f"{before['p50_ms']:>10.3f}{after['p50_ms']:>10.3f}{before['p99_ms']:>10.3f}{after['p99_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
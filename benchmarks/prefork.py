@@ -0,0 +1,109 @@
+"""
+QPS and per-worker memory of server.py for increasing worker process counts.
+
+RSS counts shared pages in every worker that touches them; PSS divides them
+among the processes sharing them, so PSS per worker shows what each extra
+worker really costs.
+
+Usage: python -m benchmarks.prefork [--files N] [--lines M] [--max-processes P] [--requests R]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import autocomplete
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+from benchmarks.loadgen import sample_prefixes, run, percentile
+
+SERVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_listening(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=1):
+            return
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def memory_kib(pid):
+    """
+    Return (RSS, PSS) of a process in KiB from /proc.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def worker_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        # The server looks for the index in its working directory
+        autocomplete.CACHE_FILE = os.path.join(folder, os.path.basename(autocomplete.CACHE_FILE))
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs = AutoCompleteSystem()
+            acs.build_from_folder(corpus)
+            acs.save_cache()
+        print(f"{len(acs.sentences)} sentences, index file {os.path.getsize(autocomplete.CACHE_FILE) / 2**20:.1f} MiB, "
+              f"{os.cpu_count()} CPUs")
+        prefixes = sample_prefixes(corpus, args.requests, random.Random(args.seed), typo_rate=0.3)
+
+        processes = 1
+        while processes <= max(args.max_processes, 2):
+            port = free_port()
+            server = subprocess.Popen([sys.executable, SERVER, "--port", str(port), "--processes", str(processes)],
+                                      cwd=folder, stdout=subprocess.DEVNULL)
+            try:
+                wait_until_listening(port)
+                latencies, elapsed = asyncio.run(run("127.0.0.1", port, prefixes, args.clients))
+                workers = worker_pids(server.pid) if processes > 1 else [server.pid]
+                memory = [memory_kib(pid) for pid in workers]
+            finally:
+                server.terminate()
+                server.wait()
+            latencies.sort()
+            rss = sum(m[0] for m in memory) / len(memory) / 1024
+            pss = sum(m[1] for m in memory) / len(memory) / 1024
+            print(f"processes {processes:2d}: {len(latencies) / elapsed:7.0f} QPS   "
+                  f"p50 {percentile(latencies, 0.5) * 1000:7.2f} ms   p99 {percentile(latencies, 0.99) * 1000:7.2f} ms   "
+                  f"per worker RSS {rss:6.1f} MiB  PSS {pss:6.1f} MiB")
+            processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Time to bring a cached index up to date after editing a few files,
+compared with rebuilding it from scratch.
+
+Usage: python -m benchmarks.refresh [--files N] [--lines M] [--changed K ...]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import autocomplete
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--changed", type=int, nargs="+", default=[0, 1, 10, 50])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        autocomplete.CACHE_FILE = os.path.join(folder, "index.bin")
+
+        acs = AutoCompleteSystem()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs.build_from_folder(corpus)
+        print(f"{len(acs.sentences)} sentences, full build {time.perf_counter() - start:.2f} s")
+
+        files = sorted(os.listdir(corpus))
+        for n_changed in args.changed:
+            with contextlib.redirect_stdout(io.StringIO()):
+                acs.save_cache()
+            for name in files[:n_changed]:
+                with open(os.path.join(corpus, name), "a") as f:
+                    f.write(f"appended after {n_changed} edits\n")
+
+            acs = AutoCompleteSystem()
+            with contextlib.redirect_stdout(io.StringIO()):
+                acs.load_cache()
+                start = time.perf_counter()
+                acs.refresh()
+            print(f"{n_changed:4d} changed files: refresh {time.perf_counter() - start:6.3f} s, "
+                  f"{len(acs.dead)} tombstoned ids")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the memory of the columnar SentenceTable against the earlier list of
+(line, path, line number) tuples, scaled to a million sentences, and the
+size of a slotted AutoCompleteData against a plain dataclass instance.
+
+Usage: python -m benchmarks.sentence_memory [--files N] [--lines M]
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+from dataclasses import dataclass
+
+from autocomplete import AutoCompleteSystem, AutoCompleteData
+from benchmarks.index_memory import measure
+from benchmarks.corpus import generate_corpus
+
+
+@dataclass
+class DictAutoCompleteData:
+    """AutoCompleteData as it was before it got __slots__."""
+    completed_sentence: str
+    source_text: str
+    offset: int
+    score: int
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs.build_from_folder(folder)
+
+        table = acs.sentences
+        acs = None
+        # Rows share one path string per file, as the old build did
+        rows, tuple_bytes = measure(lambda: list(table))
+        _, table_bytes = measure(table.copy)
+
+    scale = 1e6 / len(rows)
+    print(f"sentences:        {len(rows)} in {len(table.paths)} files")
+    print(f"list of tuples:   {tuple_bytes * scale / 2**20:8.1f} MiB per million sentences")
+    print(f"SentenceTable:    {table_bytes * scale / 2**20:8.1f} MiB per million sentences")
+    print(f"reduction:        {tuple_bytes / max(table_bytes, 1):.1f}x")
+
+    n = 100000
+    _, dict_bytes = measure(lambda: [DictAutoCompleteData("s", "p", i, i) for i in range(n)])
+    _, slot_bytes = measure(lambda: [AutoCompleteData("s", "p", i, i) for i in range(n)])
+    print(f"result objects:   {dict_bytes / n:.0f} bytes with __dict__, {slot_bytes / n:.0f} bytes with __slots__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-keystroke latency while typing a prefix one character at a time, with
+full queries versus an incremental CompletionSession.
+
+Usage: python -m benchmarks.session_latency [--files N] [--lines M]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem, CompletionSession, normalize_text
+from benchmarks.corpus import generate_corpus
+
+
+def typed_prefixes(acs, rng, count, length):
+    """
+    Pick 'count' prefixes of 'length' characters from corpus sentences,
+    half of them with a typo in the second word.
+    """
+    prefixes = []
+    while len(prefixes) < count:
+        text = normalize_text(acs.sentences[rng.randrange(len(acs.sentences))][0])
+        if len(text) < length:
+            continue
+        prefix = text[:length]
+        if len(prefixes) % 2:
+            pos = prefix.find(" ") + 2
+            prefix = prefix[:pos] + "z" + prefix[pos + 1:]
+        prefixes.append(prefix)
+    return prefixes
+
+
+def keystroke_latencies(complete_for, prefixes, length):
+    """
+    Return the median latency for each keystroke position.
+    """
+    per_position = [[] for _ in range(length)]
+    for prefix in prefixes:
+        complete = complete_for()
+        for n in range(1, length + 1):
+            start = time.perf_counter()
+            complete(prefix[:n])
+            per_position[n - 1].append(time.perf_counter() - start)
+    return [statistics.median(latencies) for latencies in per_position]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--prefixes", type=int, default=20)
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(folder)
+
+    prefixes = typed_prefixes(acs, random.Random(args.seed), args.prefixes, args.length)
+    full = keystroke_latencies(lambda: acs.get_best_k_completions, prefixes, args.length)
+    incremental = keystroke_latencies(lambda: CompletionSession(acs).complete, prefixes, args.length)
+
+    print("keystroke   full query   session   (median ms)")
+    for n, (f, i) in enumerate(zip(full, incremental), 1):
+        print(f"{n:>9}   {f * 1000:10.3f}   {i * 1000:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Query latency of a sharded index (sharding.py) against one index over the
+same folder, for increasing shard counts, in child processes queried
+through pipes and behind local HTTP shard servers. Every sharded answer is
+checked against the unsharded one.
+
+Each query searches all shards in parallel, so a query gets faster only with
+a core per shard; on fewer cores the fan-out and merge are pure overhead.
+
+Usage: python -m benchmarks.sharding [--files N] [--lines M] [--max-shards S] [--queries Q]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+from benchmarks.suite import QUERY_CLASSES, make_queries, percentile
+from sharding import build_sharded
+
+
+def build_single(folder):
+    acs = AutoCompleteSystem()
+    acs.build_from_folder(folder)
+    return acs
+
+
+def timed_build(build):
+    start = time.perf_counter()
+    built = build()
+    return built, time.perf_counter() - start
+
+
+def first_pass(acs, prefixes):
+    """
+    Return the answers to 'prefixes' and their latencies in milliseconds,
+    sorted. Each prefix is asked once, as the result caches would answer a
+    repeat.
+    """
+    answers, latencies = [], []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        answers.append(acs.get_best_k_completions(prefix))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return answers, sorted(latencies)
+
+
+def report(mode, shards, built, latencies, identical):
+    print(f"{mode:<9}{shards:>7}{built:>9.2f}{percentile(latencies, 0.5):>9.3f}{percentile(latencies, 0.9):>9.3f}"
+          f"{percentile(latencies, 0.99):>9.3f}  {identical}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queries", type=int, default=50, help="queries per class")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.files, args.lines, seed=args.seed, duplicates=0.2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            single, built = timed_build(lambda: build_single(folder))
+        queries = make_queries(single, random.Random(args.seed), args.queries)
+        every = [prefix for name in QUERY_CLASSES for prefix in queries[name]]
+        expected, latencies = first_pass(single, every)
+        print(f"{len(single.sentences)} sentences, {len(every)} queries, {os.cpu_count()} CPUs")
+        print(f"{'mode':<9}{'shards':>7}{'build s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}  identical")
+        report("single", 1, built, latencies, True)
+
+        for mode in ("process", "socket"):
+            shards = 2
+            while shards <= max(args.max_shards, 2):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sharded, built = timed_build(lambda: build_sharded(folder, shards, mode))
+                with sharded:
+                    answers, latencies = first_pass(sharded, every)
+                report(mode, len(sharded.shards), built, latencies, answers == expected)
+                shards *= 2
+
+
+if __name__ == "__main__":
+    main()
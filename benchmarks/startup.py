@@ -0,0 +1,77 @@
+"""
+Startup time and resident memory of a fresh process loading the index,
+for the memory-mapped index file and the earlier gzip+pickle cache.
+
+Usage: python -m benchmarks.startup [--files N] [--lines M] [--runs R]
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import autocomplete
+from autocomplete import AutoCompleteSystem
+from benchmarks.corpus import generate_corpus
+
+# Run in the child: load the cache, answer one query, report wall time and peak RSS
+_CHILD = """
+import contextlib, io, resource, sys, time
+start = time.perf_counter()
+import autocomplete
+autocomplete.CACHE_FILE = sys.argv[1]
+acs = autocomplete.AutoCompleteSystem()
+with contextlib.redirect_stdout(io.StringIO()):
+    acs.load_cache()
+loaded = time.perf_counter()
+acs.get_best_k_completions(sys.argv[2])
+done = time.perf_counter()
+print(loaded - start, done - loaded, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(cache_file, prefix, runs):
+    rows = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _CHILD, cache_file, prefix], check=True,
+                             capture_output=True, text=True, cwd=os.getcwd()).stdout
+        rows.append([float(x) for x in out.split()])
+    load, query, rss = (statistics.median(col) for col in zip(*rows))
+    return load, query, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, args.files, args.lines, seed=args.seed)
+        acs = AutoCompleteSystem()
+        autocomplete.CACHE_FILE = os.path.join(folder, "index.bin")
+        with contextlib.redirect_stdout(io.StringIO()):
+            acs.build_from_folder(corpus)
+            acs.save_cache()
+        pickle_file = os.path.join(folder, "cache.pkl.gz")
+        with gzip.open(pickle_file, "wb") as f:
+            pickle.dump((acs.sentences, acs.word_index, acs.normalized), f)
+
+        prefix = acs.normalized[len(acs.sentences) // 2][:12]
+        print(f"{len(acs.sentences)} sentences, {len(acs.word_index)} keys, query {prefix!r}")
+        for label, path in (("gzip+pickle", pickle_file), ("index file", autocomplete.CACHE_FILE)):
+            load, query, rss = measure(path, prefix, args.runs)
+            print(f"{label:12s} {os.path.getsize(path) / 2**20:7.1f} MiB on disk   load {load * 1000:8.1f} ms   "
+                  f"first query {query * 1000:7.1f} ms   peak RSS {rss / 1024:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
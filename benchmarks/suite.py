@@ -0,0 +1,237 @@
+"""
+Benchmark suite: build an index over a deterministic synthetic corpus, then
+run fixed query mixes against it and save the results as JSON so runs can
+be compared across commits.
+
+Reports build, save and load time, index file size, resident memory, and
+latency percentiles for each query class:
+    exact         prefixes cut from corpus sentences
+    substitution  one character replaced, at every position in turn
+    insertion     one character inserted, at every position in turn
+    deletion      one character removed, at every position in turn
+    short_word    prefixes starting with a word of 1 or 2 letters
+    fallback      a typo in the first 3 letters, so the anchor key has no postings
+
+Usage: python -m benchmarks.suite [--files N] [--lines M] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import autocomplete
+from autocomplete import AutoCompleteSystem, normalize_text
+from benchmarks.corpus import generate_corpus
+
+QUERY_CLASSES = ["exact", "substitution", "insertion", "deletion", "short_word", "fallback"]
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# Run in the child: load the index file and report load time and resident memory
+_CHILD = """
+import contextlib, io, resource, sys, time
+start = time.perf_counter()
+import autocomplete
+autocomplete.CACHE_FILE = sys.argv[1]
+acs = autocomplete.AutoCompleteSystem()
+with contextlib.redirect_stdout(io.StringIO()):
+    acs.load_cache()
+loaded = time.perf_counter()
+print(loaded - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def max_rss() -> int:
+    """
+    Peak resident memory of this process in bytes.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def exact_prefix(acs, rng, min_length=4):
+    """
+    Cut a prefix of 1 to 4 words, the last possibly incomplete, from a random
+    sentence, starting at a random word.
+    """
+    while True:
+        words = normalize_text(acs.sentences[rng.randrange(len(acs.sentences))][0]).split()
+        start = rng.randrange(len(words))
+        prefix = " ".join(words[start:start + rng.randint(1, 4)])
+        prefix = prefix[:rng.randint(min(len(prefix), min_length), len(prefix))]
+        if len(prefix) >= min_length:
+            return prefix
+
+
+def make_queries(acs, rng, count):
+    """
+    Build 'count' queries of every class. Edits walk through the positions
+    of their prefixes in turn so every position is covered.
+    """
+    queries = {name: [] for name in QUERY_CLASSES}
+    for n in range(count):
+        queries["exact"].append(exact_prefix(acs, rng))
+
+        prefix = exact_prefix(acs, rng)
+        pos = n % len(prefix)
+        letter = rng.choice(_LETTERS.replace(prefix[pos], "") if prefix[pos] != " " else _LETTERS)
+        queries["substitution"].append(prefix[:pos] + letter + prefix[pos + 1:])
+
+        prefix = exact_prefix(acs, rng)
+        pos = n % (len(prefix) + 1)
+        queries["insertion"].append(prefix[:pos] + rng.choice(_LETTERS) + prefix[pos:])
+
+        prefix = exact_prefix(acs, rng, min_length=5)
+        pos = n % len(prefix)
+        queries["deletion"].append(prefix[:pos] + prefix[pos + 1:])
+
+    while len(queries["short_word"]) < count:
+        prefix = exact_prefix(acs, rng)
+        if len(prefix.split()[0]) <= 2 and " " in prefix:
+            queries["short_word"].append(prefix)
+
+    while len(queries["fallback"]) < count:
+        prefix = exact_prefix(acs, rng, min_length=6)
+        if len(prefix.split()[0]) < 4:
+            continue
+        pos = rng.randrange(3)
+        typo = prefix[:pos] + rng.choice(_LETTERS) + prefix[pos + 1:]
+        if not acs._any_live(acs.word_index.get(typo[:3])):
+            queries["fallback"].append(typo)
+    return queries
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def time_queries(acs, queries, repeat):
+    """
+    Return latency statistics in milliseconds for one query class, each
+    query taking the best of 'repeat' runs.
+    """
+    latencies, answered = [], 0
+    for prefix in queries:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = acs.get_best_k_completions(prefix)
+            best = min(best, time.perf_counter() - start)
+        latencies.append(best * 1000)
+        answered += bool(results)
+    latencies.sort()
+    return {"queries": len(latencies), "answered": answered,
+            "mean_ms": sum(latencies) / len(latencies),
+            "p50_ms": percentile(latencies, 0.5), "p90_ms": percentile(latencies, 0.9),
+            "p99_ms": percentile(latencies, 0.99), "max_ms": latencies[-1]}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(files, lines, vocab, queries_per_class, repeat, seed):
+    """
+    Run the whole suite and return its results as a JSON-serializable dict.
+    """
+    results = {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+               "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "params": {"files": files, "lines": lines, "vocab": vocab, "queries": queries_per_class,
+                          "repeat": repeat, "seed": seed}}
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = os.path.join(folder, "corpus")
+        generate_corpus(corpus, files, lines, vocab_size=vocab, seed=seed)
+        autocomplete.CACHE_FILE = os.path.join(folder, "index.bin")
+
+        acs = AutoCompleteSystem()
+        acs.result_cache = None  # Measure the lookups themselves, not cache hits
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            acs.build_from_folder(corpus)
+            built = time.perf_counter()
+            acs.save_cache()
+            saved = time.perf_counter()
+        results["build"] = {"sentences": len(acs.sentences), "keys": len(acs.word_index),
+                            "build_s": built - start, "save_s": saved - built,
+                            "index_file_bytes": os.path.getsize(autocomplete.CACHE_FILE),
+                            "max_rss_bytes": max_rss()}
+
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", _CHILD, autocomplete.CACHE_FILE], check=True,
+                             capture_output=True, text=True, cwd=package_dir).stdout
+        load_s, load_rss = out.split()
+        rss_scale = 1 if sys.platform == "darwin" else 1024
+        results["load"] = {"load_s": float(load_s), "max_rss_bytes": int(load_rss) * rss_scale}
+
+    query_mix = make_queries(acs, random.Random(seed), queries_per_class)
+    for prefix in (q for name in QUERY_CLASSES for q in query_mix[name]):
+        acs.get_best_k_completions(prefix)  # Warm up
+    results["queries"] = {name: time_queries(acs, query_mix[name], repeat) for name in QUERY_CLASSES}
+    return results
+
+
+def print_results(results, baseline=None):
+    """
+    Print a summary, with the ratio to 'baseline' (an earlier results dict) where given.
+    """
+    def ratio(section, key, name=None):
+        if baseline is None:
+            return ""
+        old = baseline.get(section, {})
+        old = old.get(name, {}) if name else old
+        if not old.get(key):
+            return ""
+        new = results[section][name][key] if name else results[section][key]
+        return f"  ({new / old[key]:.2f}x)"
+
+    build, load = results["build"], results["load"]
+    print(f"commit {results['commit']}, {build['sentences']} sentences, {build['keys']} keys")
+    print(f"build {build['build_s']:.2f} s{ratio('build', 'build_s')}   "
+          f"save {build['save_s']:.2f} s{ratio('build', 'save_s')}   "
+          f"index file {build['index_file_bytes'] / 2**20:.1f} MiB{ratio('build', 'index_file_bytes')}")
+    print(f"load {load['load_s'] * 1000:.1f} ms{ratio('load', 'load_s')}   "
+          f"RSS after load {load['max_rss_bytes'] / 2**20:.1f} MiB{ratio('load', 'max_rss_bytes')}   "
+          f"peak RSS while building {build['max_rss_bytes'] / 2**20:.1f} MiB")
+    print(f"{'class':<14}{'answered':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, q in results["queries"].items():
+        print(f"{name:<14}{q['answered']:>6}/{q['queries']:<3}{q['p50_ms']:>10.3f}{q['p90_ms']:>10.3f}"
+              f"{q['p99_ms']:>10.3f}{q['max_ms']:>10.3f}{ratio('queries', 'p50_ms', name)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=50, help="queries per class")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run_suite(args.files, args.lines, args.vocab, args.queries, args.repeat, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import os
+import heapq
+import struct
+import tempfile
+from array import array
+from typing import Dict, List
+
+from autocomplete import POSTING_TYPECODE, SourceFile, TextStore, normalize_text, sentence_keys
+from index_file import IndexWriter
+from ingest import IngestOptions, file_digest, file_lines, find_text_files
+
+DEFAULT_MEMORY_BUDGET = 256 * 2**20  # Bytes of postings held in memory before a run is spilled
+MERGE_FAN_IN = 64  # Most runs merged at once; more runs are merged in several passes
+RUN_CHUNK_IDS = 4096  # Ids per run record, which bounds what each open run holds while merging
+KEY_COST = 200  # Approximate bytes of one in-memory posting list besides its ids: key, array and dict slot
+_RECORD = struct.Struct("<HI")  # Run record header: key length in bytes, number of ids
+_BUFFER = 1 << 16  # Buffer size for streamed output files
+_RUN_READ_BUFFER = 1 << 14  # Buffer size of each run open for merging
+_MERGE_COST = 2 * _RUN_READ_BUFFER + 4 * RUN_CHUNK_IDS  # Approximate bytes per run open for merging
+
+
+class _ArrayWriter:
+    """Numbers appended to a file through a small in-memory buffer."""
+
+    def __init__(self, path: str, typecode: str, first=None):
+        self.path = path
+        self.file = open(path, "wb")
+        self.buffer = array(typecode, [] if first is None else [first])
+
+    def append(self, value: int):
+        self.buffer.append(value)
+        if len(self.buffer) * self.buffer.itemsize >= _BUFFER:
+            self.flush()
+
+    def flush(self):
+        self.buffer.tofile(self.file)
+        del self.buffer[:]
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class _TextWriter:
+    """Strings appended to a file as UTF-8, with their end offsets in a second file (see TextStore)."""
+
+    def __init__(self, folder: str, name: str):
+        self.path = os.path.join(folder, name)
+        self.file = open(self.path, "wb", buffering=_BUFFER)
+        self.offsets = _ArrayWriter(self.path + ".off", "Q", first=0)
+        self.size = 0
+
+    def append(self, s: str):
+        encoded = s.encode("utf-8")
+        self.file.write(encoded)
+        self.size += len(encoded)
+        self.offsets.append(self.size)
+
+    def close(self):
+        self.file.close()
+        self.offsets.close()
+
+
+def _file_chunks(path: str):
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(_BUFFER), b"")
+
+
+def write_run(path: str, postings):
+    """
+    Write (key, ids) pairs, sorted by key, as a run file. Long id lists are
+    split into records of at most RUN_CHUNK_IDS ids.
+    """
+    with open(path, "wb", buffering=_BUFFER) as f:
+        for key, ids in postings:
+            encoded = key.encode("utf-8")
+            for start in range(0, len(ids), RUN_CHUNK_IDS):
+                chunk = ids[start:start + RUN_CHUNK_IDS]
+                f.write(_RECORD.pack(len(encoded), len(chunk)))
+                f.write(encoded)
+                chunk.tofile(f)
+
+
+def read_run(path: str):
+    """
+    Yield the (key, ids) records of a run file in order.
+    """
+    with open(path, "rb", buffering=_RUN_READ_BUFFER) as f:
+        while True:
+            header = f.read(_RECORD.size)
+            if not header:
+                return
+            key_length, count = _RECORD.unpack(header)
+            key = f.read(key_length).decode("utf-8")
+            ids = array(POSTING_TYPECODE)
+            ids.frombytes(f.read(count * ids.itemsize))
+            yield key, ids
+
+
+def merge_runs(paths: List[str]):
+    """
+    Merge run files into one stream of (key, ids) records sorted by key.
+    Runs hold increasing sentence ids, so records of the same key come out
+    in run order and their ids stay sorted when concatenated.
+    """
+    # Python orders strings by code point, which is also the order of their UTF-8 bytes
+    return heapq.merge(*(read_run(path) for path in paths), key=lambda record: record[0])
+
+
+class SpillingIndexBuilder:
+    """
+    Builds an index file for a corpus that may not fit in memory.
+
+    Sentences are streamed from each file straight to temporary files. Only
+    posting lists are kept in memory, and once they reach the memory budget
+    they are written out as a run sorted by key. At the end the runs are
+    k-way merged into the key and posting sections of the index file, with
+    no more runs open at a time than the budget allows. Memory use is bounded by the
+    budget plus small per-file tables (paths and the manifest), however many
+    sentences the corpus has.
+    """
+
+    def __init__(self, index_path: str, memory_budget: int = DEFAULT_MEMORY_BUDGET, tmp_dir: str = None,
+                 options: IngestOptions = None):
+        self.index_path = index_path
+        self.memory_budget = memory_budget
+        self.options = options or IngestOptions()
+        self._tmp = tempfile.TemporaryDirectory(dir=tmp_dir or os.path.dirname(os.path.abspath(index_path)))
+        self.folder = self._tmp.name
+
+        self.text = _TextWriter(self.folder, "text")
+        self.normalized = _TextWriter(self.folder, "norm")
+        self.file_ids = _ArrayWriter(os.path.join(self.folder, "fileid"), "I")
+        self.line_nos = _ArrayWriter(os.path.join(self.folder, "lineno"), "I")
+        self.paths: List[str] = []  # Path of each file id
+        self.files: Dict[str, SourceFile] = {}  # Manifest, as AutoCompleteSystem.files
+        self.n_sentences = 0
+
+        self.postings: Dict[str, array] = {}
+        self.n_postings = 0
+        self.runs: List[str] = []
+        self._run_count = 0
+
+    def add_file(self, fullpath: str):
+        """
+        Index every non-empty line of a file, like IndexShard.add_file(), but
+        as a sentence of its own even if it repeats an earlier line: merging
+        repeats would take a table of every distinct line seen.
+        """
+        first = self.n_sentences
+        file_id = None
+        stat = None
+        try:
+            # Stat only once the file could be read, so a file that cannot is skipped unrecorded
+            digest = file_digest(fullpath)
+            stat = os.stat(fullpath)
+            for i, line_stripped in file_lines(fullpath, self.options.errors):
+                if file_id is None:
+                    file_id = len(self.paths)
+                    self.paths.append(fullpath)
+                idx = self.n_sentences
+                self.n_sentences += 1
+                self.text.append(line_stripped)
+                self.file_ids.append(file_id)
+                self.line_nos.append(i)
+
+                norm = normalize_text(line_stripped)
+                self.normalized.append(norm)
+                for key in sentence_keys(norm):
+                    postings = self.postings.get(key)
+                    if postings is None:
+                        postings = self.postings[key] = array(POSTING_TYPECODE)
+                    elif postings[-1] == idx:
+                        continue
+                    postings.append(idx)
+                    self.n_postings += 1
+
+                if len(self.postings) * KEY_COST + self.n_postings * 4 > self.memory_budget:
+                    self._spill()
+
+        except Exception as e:
+            print(f"Warning: skipped {fullpath}: {e}")
+
+        if stat is not None:
+            self.files[fullpath] = SourceFile(stat.st_size, stat.st_mtime_ns, digest, first, self.n_sentences - first)
+
+    def _new_run_path(self) -> str:
+        path = os.path.join(self.folder, f"run_{self._run_count:06d}")
+        self._run_count += 1
+        self.runs.append(path)
+        return path
+
+    def _spill(self):
+        """
+        Write the in-memory posting lists out as a sorted run and drop them.
+        """
+        write_run(self._new_run_path(), ((key, self.postings[key]) for key in sorted(self.postings)))
+        self.postings = {}
+        self.n_postings = 0
+
+    def _merge_down(self):
+        """
+        Merge runs in groups until few enough are left to merge them all within the memory budget.
+        """
+        fan_in = max(2, min(MERGE_FAN_IN, self.memory_budget // _MERGE_COST))
+        while len(self.runs) > fan_in:
+            runs, self.runs = self.runs, []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                write_run(self._new_run_path(), merge_runs(group))
+                for path in group:
+                    os.remove(path)
+
+    def finish(self, root_folder: str = None):
+        """
+        Merge the runs and write the index file in the layout of AutoCompleteSystem.save_cache().
+        """
+        if self.postings or not self.runs:
+            self._spill()
+        print(f"Merging {len(self.runs)} sorted runs...")
+        self._merge_down()
+        for writer in (self.text, self.normalized, self.file_ids, self.line_nos):
+            writer.close()
+
+        keys = _TextWriter(self.folder, "keys")
+        posting_offsets = _ArrayWriter(os.path.join(self.folder, "postoff"), "Q", first=0)
+        post_path = os.path.join(self.folder, "post")
+        n_keys, n_postings, current = 0, 0, None
+        with open(post_path, "wb", buffering=_BUFFER) as post:
+            for key, ids in merge_runs(self.runs):
+                if key != current:
+                    if current is not None:
+                        posting_offsets.append(n_postings)
+                    keys.append(key)
+                    current = key
+                    n_keys += 1
+                ids.tofile(post)
+                n_postings += len(ids)
+        if current is not None:
+            posting_offsets.append(n_postings)
+        keys.close()
+        posting_offsets.close()
+
+        paths = TextStore.from_strings(self.paths)
+        manifest = TextStore.from_strings(self.files)
+        records = self.files.values()
+        streamed = {"text": self.text.path, "textoff": self.text.offsets.path,
+                    "norm": self.normalized.path, "normoff": self.normalized.offsets.path,
+                    "keys": keys.path, "keysoff": keys.offsets.path,
+                    "fileid": self.file_ids.path, "lineno": self.line_nos.path,
+                    "postoff": posting_offsets.path, "post": post_path}
+        in_memory = {"paths": paths.buffer(), "pathsoff": paths.offsets,
+                     "files": manifest.buffer(), "filesoff": manifest.offsets,
+                     "fsize": array("Q", [r.size for r in records]),
+                     "fmtime": array("q", [r.mtime_ns for r in records]),
+                     "fdigest": b"".join(r.digest for r in records),
+                     "ffirst": array("I", [r.first_id for r in records]),
+                     "fcount": array("I", [r.count for r in records]),
+                     "dead": array(POSTING_TYPECODE),
+                     "root": (root_folder or "").encode("utf-8")}
+
+        # Same section order as save_cache(), so both builds give identical files
+        names = ["text", "textoff", "paths", "pathsoff", "norm", "normoff", "keys", "keysoff", "fileid", "lineno",
+                 "postoff", "post", "files", "filesoff", "fsize", "fmtime", "fdigest", "ffirst", "fcount", "dead", "root"]
+        writer = IndexWriter(self.index_path, names)
+        for name in names:
+            writer.write_section(name, _file_chunks(streamed[name]) if name in streamed else [in_memory[name]])
+        writer.close()
+        print(f"Loaded {self.n_sentences} sentences, indexed {n_keys} prefixes.")
+
+    def cleanup(self):
+        """
+        Remove the temporary files.
+        """
+        for writer in (self.text, self.normalized):
+            writer.file.close()
+            writer.offsets.file.close()
+        for writer in (self.file_ids, self.line_nos):
+            writer.file.close()
+        self._tmp.cleanup()
+
+
+def build_index_file(root_folder: str, index_path: str, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                     tmp_dir: str = None, options: IngestOptions = None):
+    """
+    Build the index of all text files under 'root_folder', read as set by
+    'options' (see ingest.py), straight into the index file 'index_path',
+    holding at most about 'memory_budget' bytes of postings in memory.
+    Temporary runs go to 'tmp_dir', by default next to the index file.
+    Load the result with AutoCompleteSystem.load_cache().
+    """
+    print("Scanning files and loading sentences...")
+    builder = SpillingIndexBuilder(index_path, memory_budget, tmp_dir, options)
+    try:
+        for path in find_text_files(root_folder, options):
+            builder.add_file(path)
+        builder.finish(root_folder)
+    finally:
+        builder.cleanup()
@@ -0,0 +1,127 @@
+import mmap
+import os
+import struct
+import sys
+from typing import Dict
+
+MAGIC = b"ACINDEX\0"  # First 8 bytes of every index file
+FORMAT_VERSION = 1  # Bump whenever existing sections change; readers check for optional ones
+_HEADER = struct.Struct("<8sIBxxxI")  # magic, version, little-endian flag, section count
+_SECTION = struct.Struct("<8sQQ")  # name, offset, length
+_ALIGN = 8  # Sections start on 8-byte boundaries so they can be cast in place
+
+
+class IndexFormatError(Exception):
+    """Raised when a file is not an index this version can read."""
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+class IndexWriter:
+    """
+    Write an index file one section at a time, from chunks, so sections
+    never have to be held in memory whole. The section names are given up
+    front to reserve the section table. The file is written next to the
+    target and renamed over it on close(), so processes that still map the
+    old file keep a consistent view.
+    """
+
+    def __init__(self, path: str, names):
+        self.path = path
+        self.names = list(names)
+        self.entries: Dict[str, tuple] = {}
+        self.file = open(path + ".tmp", "wb")
+        self.file.write(b"\0" * _aligned(_HEADER.size + _SECTION.size * len(self.names)))
+
+    def write_section(self, name: str, chunks):
+        """
+        Write section 'name' from an iterable of bytes-like chunks.
+        """
+        self.file.write(b"\0" * (_aligned(self.file.tell()) - self.file.tell()))
+        offset = self.file.tell()
+        for chunk in chunks:
+            self.file.write(memoryview(chunk).cast("B"))
+        self.entries[name] = (offset, self.file.tell() - offset)
+
+    def close(self):
+        missing = [name for name in self.names if name not in self.entries]
+        if missing:
+            raise ValueError(f"sections not written: {', '.join(missing)}")
+        self.file.write(b"\0" * (_aligned(self.file.tell()) - self.file.tell()))
+        self.file.seek(0)
+        self.file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "little", len(self.names)))
+        for name in self.names:
+            self.file.write(_SECTION.pack(name.encode("ascii"), *self.entries[name]))
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+def write_index(path: str, sections: Dict[str, bytes]):
+    """
+    Write named binary sections to 'path'.
+    """
+    writer = IndexWriter(path, sections)
+    for name, data in sections.items():
+        writer.write_section(name, [data])
+    writer.close()
+
+
+def is_index_file(path: str) -> bool:
+    """
+    Check whether 'path' starts with the index magic bytes.
+    """
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class IndexFile:
+    """
+    Read-only, memory-mapped view of a file written by write_index().
+    Sections are returned as memoryviews over the mapping, so nothing is
+    copied or decoded until it is used, and processes mapping the same file
+    share its pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, little_endian, count = _HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise IndexFormatError(f"{path} is not an autocomplete index")
+        if version != FORMAT_VERSION:
+            raise IndexFormatError(f"{path} has index format {version}, expected {FORMAT_VERSION}")
+        if bool(little_endian) != (sys.byteorder == "little"):
+            raise IndexFormatError(f"{path} was written on a machine with a different byte order")
+
+        self.sections = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(self.mmap, _HEADER.size + i * _SECTION.size)
+            self.sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+    def bytes(self, name: str) -> memoryview:
+        offset, length = self.sections[name]
+        return memoryview(self.mmap)[offset:offset + length]
+
+    def array(self, name: str, typecode: str) -> memoryview:
+        """
+        Return a section as a typed memoryview, e.g. 'I' for 32-bit ids.
+        """
+        return self.bytes(name).cast(typecode)
+
+    def prefetch(self, *names: str):
+        """
+        Ask the OS to start reading sections into the page cache, where it
+        supports that, so later lookups in them do not wait for the disk.
+        """
+        advice = getattr(mmap, "MADV_WILLNEED", None)
+        if advice is None:
+            return
+        for name in names:
+            offset, length = self.sections[name]
+            start = offset - offset % mmap.PAGESIZE
+            if length:
+                self.mmap.madvise(advice, start, offset + length - start)
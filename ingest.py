@@ -0,0 +1,198 @@
+"""
+Reading the source files of an index: which files are indexed, how their
+bytes are decoded into lines, and how large files are split into byte
+ranges that worker processes read in parallel.
+"""
+import hashlib
+import importlib
+import io
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+DIGEST_SIZE = 16  # Bytes of the BLAKE2b content hash kept per source file
+TEXT_SUFFIX = ".txt"
+# Compressed text files, by suffix after .txt: the module whose open() reads them, imported on first use
+OPENERS = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma"}
+CHUNK_BYTES = 64 * 2**20  # Parallel builds split uncompressed files larger than this into byte ranges
+COMPRESSION_RATIO = 4  # Rough text bytes per compressed byte, to balance shards by the work they hold
+_BUFFER = 1 << 16
+
+
+@dataclass
+class IngestOptions:
+    """How source files are found and decoded."""
+    errors: str = "replace"  # codecs error handler for invalid UTF-8; with "strict" the rest of the file is skipped
+    chunk_bytes: int = CHUNK_BYTES  # Byte range size large files are split into for parallel builds
+    compressed: bool = True  # Also index .txt.gz, .txt.bz2 and .txt.xz files
+
+
+@dataclass
+class FileChunk:
+    """A source file, or a byte range of one that starts and ends at line boundaries."""
+    path: str
+    start: int = 0  # Offset of the first byte
+    end: Optional[int] = None  # Offset after the last byte; None reads to the end of the file
+    first_line: int = 0  # Line number of the line at 'start'
+    weight: int = 0  # Approximate text bytes, to balance shards
+    digest: Optional[bytes] = None  # file_digest() of the whole file, when already known
+
+
+def _opener(path: str):
+    module = OPENERS.get(os.path.splitext(path)[1].lower())
+    return importlib.import_module(module).open if module else None
+
+
+def is_text_file(name: str, options: IngestOptions = None) -> bool:
+    """
+    Check whether a file name is one of the indexed kinds: .txt, or with
+    compressed files enabled .txt.gz, .txt.bz2 or .txt.xz.
+    """
+    options = options or IngestOptions()
+    stem, suffix = os.path.splitext(name.lower())
+    if suffix == TEXT_SUFFIX:
+        return True
+    return options.compressed and suffix in OPENERS and stem.endswith(TEXT_SUFFIX)
+
+
+def find_text_files(root_folder: str, options: IngestOptions = None) -> List[str]:
+    """
+    Return the paths of all indexed files under 'root_folder' in os.walk order.
+    """
+    paths = []
+    for dirpath, _, filenames in os.walk(root_folder):
+        for fname in filenames:
+            if is_text_file(fname, options):
+                paths.append(os.path.join(dirpath, fname))
+    return paths
+
+
+def file_digest(path: str) -> bytes:
+    """
+    Hash the content of 'path' to tell real edits from touched files.
+    """
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_BUFFER), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def _line_breaks(data: bytes, after_cr: bool) -> int:
+    """
+    Count the line breaks in 'data' the way universal newlines read them:
+    "\\n", "\\r\\n" and a lone "\\r". 'after_cr' tells whether the bytes before
+    ended with "\\r", which makes a leading "\\n" part of that break.
+    """
+    breaks = data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n")
+    if after_cr and data[:1] == b"\n":
+        breaks -= 1
+    return breaks
+
+
+def split_file(path: str, chunk_bytes: int) -> List[FileChunk]:
+    """
+    Split a file into chunks of about 'chunk_bytes' that end right after a
+    "\\n", with the line number each one starts at. The file is read once,
+    which also gives its digest.
+    """
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    chunks = [FileChunk(path)]
+    target, offset, lines, after_cr = chunk_bytes, 0, 0, False
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BUFFER), b""):
+            h.update(block)
+            end = offset + len(block)
+            while target < end:
+                cut = block.find(b"\n", max(target - offset, 0))
+                if cut < 0:
+                    break
+                cut += 1
+                chunks[-1].end = offset + cut
+                chunks.append(FileChunk(path, offset + cut, first_line=lines + _line_breaks(block[:cut], after_cr)))
+                target = offset + cut + chunk_bytes
+            lines += _line_breaks(block, after_cr)
+            after_cr = block.endswith(b"\r")
+            offset = end
+    if chunks[-1].start == offset and len(chunks) > 1:
+        chunks.pop()
+        chunks[-1].end = None
+    for chunk in chunks:
+        chunk.weight = (offset if chunk.end is None else chunk.end) - chunk.start
+    chunks[0].digest = h.digest()
+    return chunks
+
+
+def plan_chunks(paths: List[str], options: IngestOptions = None, split: bool = False) -> List[FileChunk]:
+    """
+    Turn 'paths' into the chunks to read, in order. With 'split', uncompressed
+    files larger than options.chunk_bytes are split into byte ranges;
+    compressed files cannot be entered midway and are always read whole.
+    """
+    options = options or IngestOptions()
+    chunks = []
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        compressed = os.path.splitext(path)[1].lower() in OPENERS
+        if split and not compressed and size > options.chunk_bytes:
+            chunks.extend(split_file(path, options.chunk_bytes))
+        else:
+            chunks.append(FileChunk(path, weight=size * COMPRESSION_RATIO if compressed else size))
+    return chunks
+
+
+class _RangeReader(io.RawIOBase):
+    """Raw reader of 'length' bytes of a file opened in binary mode, from its current position."""
+
+    def __init__(self, f, length: int):
+        self.f = f
+        self.remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self.f.readinto(memoryview(buffer)[:min(len(buffer), self.remaining)])
+        self.remaining -= n
+        return n
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+
+def open_chunk(chunk: FileChunk, errors: str = "replace"):
+    """
+    Open a chunk as UTF-8 text with universal newlines, decompressing
+    .gz, .bz2 and .xz files on the fly.
+    """
+    opener = _opener(chunk.path)
+    if opener is not None:
+        return opener(chunk.path, "rt", encoding="utf-8", errors=errors)
+    if chunk.start == 0 and chunk.end is None:
+        return open(chunk.path, "r", encoding="utf-8", errors=errors)
+    f = open(chunk.path, "rb")
+    f.seek(chunk.start)
+    length = (os.fstat(f.fileno()).st_size if chunk.end is None else chunk.end) - chunk.start
+    return io.TextIOWrapper(io.BufferedReader(_RangeReader(f, length)), encoding="utf-8", errors=errors)
+
+
+def chunk_lines(chunk: FileChunk, errors: str = "replace"):
+    """
+    Yield (line number, stripped line) for every non-empty line of a chunk.
+    """
+    with open_chunk(chunk, errors) as f:
+        for i, line in enumerate(f, chunk.first_line):
+            line_stripped = line.strip()
+            if line_stripped:
+                yield i, line_stripped
+
+
+def file_lines(fullpath: str, errors: str = "replace"):
+    """
+    Yield (line number, stripped line) for every non-empty line of a text file.
+    """
+    return chunk_lines(FileChunk(fullpath), errors)
@@ -1,21 +1,76 @@
 import os
 import sys
-from autocomplete import CACHE_FILE
+import argparse
+from autocomplete import CACHE_FILE, LEGACY_CACHE_FILE
+from ingest import CHUNK_BYTES, IngestOptions
 
-def initialize_autocomplete_system(acs):
+
+def parse_args(argv, strict=True):
+    """
+    Parse the command line: the folder to index and build options.
+    With strict=False unknown arguments are ignored.
+    """
+    parser = argparse.ArgumentParser(description="Sentence autocomplete")
+    parser.add_argument("root_folder", nargs="?", help="folder of .txt files to index, also .txt.gz/.bz2/.xz")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes used to build the index (default: 1)")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="build the index file on disk in bounded memory, holding at most about "
+                             "MB megabytes of postings (ignores --workers and --positional)")
+    parser.add_argument("--positional", action="store_true",
+                        help="also index where each key occurs, so exact matches skip substring scans; "
+                             "roughly doubles the index file")
+    parser.add_argument("--decode-errors", default="replace", choices=["strict", "replace", "ignore"],
+                        help="how to read bytes that are not valid UTF-8; 'strict' skips the rest of the file "
+                             "(default: replace)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES // 2**20, metavar="MB",
+                        help="with --workers, split files larger than this into parts read in parallel "
+                             f"(default: {CHUNK_BYTES // 2**20})")
+    return parser.parse_args(argv) if strict else parser.parse_known_args(argv)[0]
+
+
+def initialize_autocomplete_system(acs, argv=(), background=False):
     """
     Initialize the autocomplete system instance.
-    If cache exists, load it.
-    Otherwise, build index from folder provided as command line argument, then save cache.
+    If cache exists, load it and re-index only the files that changed since it
+    was saved (in the folder given in argv, or the one it was built from).
+    A gzip+pickle cache of an earlier version is converted to an index file first.
+    Otherwise, build index from folder given in argv, then save cache.
     Args:
         acs: instance of AutoCompleteSystem
+        argv: command line arguments, e.g. sys.argv[1:]; none by default
+        background: load and refresh an existing cache on a background thread
+            and return at once, see AutoCompleteSystem.load_in_background().
+            A new index is still built before returning.
     """
+    if not os.path.exists(CACHE_FILE) and os.path.exists(LEGACY_CACHE_FILE):
+        print(f"Converting {LEGACY_CACHE_FILE} to {CACHE_FILE}...")
+        acs.load_cache(LEGACY_CACHE_FILE)
+        acs.save_cache()
     if not os.path.exists(CACHE_FILE):
-        if len(sys.argv) < 2:
-            print("Usage: python main.py <root_folder_to_index>")
+        args = parse_args(argv)
+        if args.root_folder is None:
+            print("Usage: python main.py <root_folder_to_index> [--workers N] [--memory-budget MB] [--positional] "
+                  "[--decode-errors strict|replace|ignore] [--chunk-mb MB]")
             sys.exit(1)
-        folder = sys.argv[1]
-        acs.build_from_folder(folder)
-        acs.save_cache()
+        acs.ingest = IngestOptions(errors=args.decode_errors, chunk_bytes=args.chunk_mb * 2**20)
+        if args.memory_budget:
+            from external_build import build_index_file
+            build_index_file(args.root_folder, CACHE_FILE, args.memory_budget * 2**20, options=acs.ingest)
+            acs.load_cache()
+        else:
+            acs.build_from_folder(args.root_folder, workers=args.workers, positional=args.positional)
+            acs.save_cache()
     else:
-        acs.load_cache()
+        args = parse_args(argv, strict=False)
+        acs.ingest = IngestOptions(errors=args.decode_errors, chunk_bytes=args.chunk_mb * 2**20)
+
+        def load():
+            acs.load_cache()
+            if acs.refresh(args.root_folder, workers=args.workers):
+                acs.save_cache()
+
+        if background:
+            acs.load_in_background(load)
+        else:
+            load()
@@ -1,10 +1,28 @@
 import unittest
 import tempfile
 import os
+import sys
+import time
+import socket
+import subprocess
+import urllib.request
 import shutil
+import gzip
+import json
+import pickle
+import random
+import asyncio
+import tracemalloc
+from dataclasses import asdict
 from unittest.mock import patch
-from autocomplete import AutoCompleteSystem
+import autocomplete
+from autocomplete import AutoCompleteSystem, CompletionSession, PartialCompletions
+import external_build
+from external_build import build_index_file
 from initialize import initialize_autocomplete_system
+from server import CompletionServer
+from sharding import build_sharded, split_folder
+from ingest import find_text_files
 
 
 class TestCacheIntegrity(unittest.TestCase):
@@ -50,6 +68,101 @@ class TestCacheIntegrity(unittest.TestCase):
         new_results = new_acs.get_best_k_completions("test")
         self.assertEqual(len(original_results), len(new_results))
 
+    def test_index_file_mapped(self):
+        """Test the cache is memory-mapped and answers like the built index"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("Test sentence here\n")
+            f.write("Another test line\n")
+        with open(os.path.join(self.test_dir, "other.txt"), 'w') as f:
+            f.write("Testing once more\n")
+
+        self.acs.build_from_folder(self.test_dir)
+        self.acs.save_cache()
+        new_acs = AutoCompleteSystem()
+        new_acs.load_cache()
+
+        self.assertEqual(list(new_acs.sentences), self.acs.sentences)
+        self.assertEqual(new_acs.sentences[-1], self.acs.sentences[-1])
+        self.assertEqual(sorted(new_acs.word_index), sorted(self.acs.word_index))
+        self.assertEqual(list(new_acs.word_index["tes"]), list(self.acs.word_index["tes"]))
+        self.assertNotIn("zzz", new_acs.word_index)
+        for prefix in ("test", "anoter", "sentence her"):
+            self.assertEqual(new_acs.get_best_k_completions(prefix), self.acs.get_best_k_completions(prefix))
+
+        # Files can still be indexed on top of a loaded cache; unchanged lines keep their sentences
+        new_acs.build_from_folder(self.test_dir)
+        self.assertEqual(new_acs.sentences, self.acs.sentences)
+        self.assertEqual(len(new_acs.occurrences), 2 * len(self.acs.sentences))
+        self.assertFalse(new_acs.dead)
+
+    def test_index_file_without_manifest(self):
+        """Test an index file saved before the manifest sections still loads"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("Test sentence here\n")
+        self.acs.build_from_folder(self.test_dir)
+        manifest = ("files", "filesoff", "fsize", "fmtime", "fdigest", "ffirst", "fcount", "dead", "root")
+        sections = {name: data for name, data in self.acs._index_sections().items() if name not in manifest}
+        autocomplete.write_index(self.cache_file, sections)
+
+        new_acs = AutoCompleteSystem()
+        new_acs.load_cache()
+        self.assertEqual(list(new_acs.sentences), self.acs.sentences)
+        self.assertEqual(new_acs.files, {})
+        self.assertIsNone(new_acs.root_folder)
+        self.assertFalse(new_acs.refresh(self.test_dir))
+        self.assertEqual(new_acs.get_best_k_completions("sentence"), self.acs.get_best_k_completions("sentence"))
+
+    def test_positional_index_cached(self):
+        """Test positional postings survive a reload, refresh and compaction"""
+        paths = [os.path.join(self.test_dir, name) for name in ("a.txt", "b.txt")]
+        with open(paths[0], 'w') as f:
+            f.write("Test sentence here\n")
+            f.write("Another test line\n")
+        with open(paths[1], 'w') as f:
+            f.write("Testing sentences once more\n")
+
+        self.acs.build_from_folder(self.test_dir, positional=True)
+        self.acs.save_cache()
+        new_acs = AutoCompleteSystem()
+        new_acs.load_cache()
+        self.assertEqual(sorted(new_acs.positional_index), sorted(self.acs.positional_index))
+        self.assertEqual(list(new_acs.positional_index["sen"]), list(self.acs.positional_index["sen"]))
+
+        with open(paths[0], 'w') as f:
+            f.write("Edited sentence here\n")
+        with patch('autocomplete.COMPACT_DEAD_FRACTION', 1.0):
+            self.assertTrue(new_acs.refresh())
+        fresh = AutoCompleteSystem()
+        fresh.build_from_folder(self.test_dir, positional=True)
+        with patch('autocomplete.POSITION_PROBE_COST', 0):
+            for acs in (new_acs, fresh):
+                self.assertEqual(acs._exact_hits("sentence here", range(len(acs.sentences))) - acs.dead,
+                                 {acs.sentences.index(("Edited sentence here", paths[0], 0))})
+            new_acs.compact()
+            for prefix in ("sentence", "edited sen", "testing sentences once"):
+                self.assertEqual(new_acs.get_best_k_completions(prefix), fresh.get_best_k_completions(prefix))
+
+    def test_normalized_store_cached(self):
+        """Test normalized sentences are persisted and rebuilt for old caches"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("Hello, World!\n")
+            f.write("Café   au lait\n")
+
+        self.acs.build_from_folder(self.test_dir)
+        self.acs.save_cache()
+
+        new_acs = AutoCompleteSystem()
+        new_acs.load_cache()
+        self.assertEqual([new_acs.normalized[i] for i in range(2)], ["hello world", "café au lait"])
+
+        # Caches from before the normalized store only hold (sentences, word_index)
+        with gzip.open(self.cache_file, "wb") as f:
+            pickle.dump((self.acs.sentences, dict(self.acs.word_index)), f)
+        old_acs = AutoCompleteSystem()
+        old_acs.load_cache()
+        self.assertEqual(old_acs.normalized[1], "café au lait")
+        self.assertEqual(len(old_acs.get_best_k_completions("cafe")), 1)
+
 
 class TestInitializationFlow(unittest.TestCase):
     """Test initialization logic"""
@@ -79,8 +192,7 @@ class TestInitializationFlow(unittest.TestCase):
 
         acs = AutoCompleteSystem()
 
-        with patch('sys.argv', ['main.py', self.test_dir]):
-            initialize_autocomplete_system(acs)
+        initialize_autocomplete_system(acs, [self.test_dir])
 
         # Should build system and create cache
         self.assertGreater(len(acs.sentences), 0)
@@ -102,6 +214,154 @@ class TestInitializationFlow(unittest.TestCase):
         self.assertEqual(len(acs2.sentences), 1)
         self.assertEqual(acs2.sentences[0][0], "Test")
 
+    def test_init_converts_legacy_cache(self):
+        """Test a gzip+pickle cache under the old file name is converted to an index file"""
+        built = AutoCompleteSystem()
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("Legacy cached line\n")
+        built.build_from_folder(self.test_dir)
+        legacy = os.path.join(self.test_dir, "autocomplete_cache.pkl.gz")
+        with gzip.open(legacy, "wb") as f:
+            pickle.dump((list(built.sentences), dict(built.word_index)), f)
+
+        acs = AutoCompleteSystem()
+        with patch('initialize.LEGACY_CACHE_FILE', legacy):
+            initialize_autocomplete_system(acs)
+        self.assertTrue(autocomplete.is_index_file(self.cache_file))
+        self.assertEqual(acs.get_best_k_completions("legacy"), built.get_best_k_completions("legacy"))
+
+    def test_init_in_background(self):
+        """Test a cache loaded in the background answers like one loaded up front"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("Background loaded line\nAnother line\n")
+        eager = AutoCompleteSystem()
+        initialize_autocomplete_system(eager, [self.test_dir])
+
+        acs = AutoCompleteSystem()
+        initialize_autocomplete_system(acs, background=True)
+        self.assertEqual(acs.get_best_k_completions("backgrund"), eager.get_best_k_completions("backgrund"))
+        self.assertTrue(acs.wait_loaded(timeout=0))
+
+        # A failed load is raised by the queries waiting for it
+        with open(self.cache_file, 'wb') as f:
+            f.write(b"not an index")
+        broken = AutoCompleteSystem()
+        initialize_autocomplete_system(broken, background=True)
+        with self.assertRaises(RuntimeError):
+            broken.get_best_k_completions("background")
+
+    def test_init_refreshes_changed_files(self):
+        """Test a cached index only re-indexes files changed since it was saved"""
+        paths = {name: os.path.join(self.test_dir, name) for name in ("keep.txt", "edit.txt", "drop.txt")}
+        for name, path in paths.items():
+            with open(path, 'w') as f:
+                f.write(f"Original line from {name}\n")
+        initialize_autocomplete_system(AutoCompleteSystem(), [self.test_dir])
+
+        # Unchanged folder: nothing to do
+        acs = AutoCompleteSystem()
+        acs.load_cache()
+        self.assertFalse(acs.refresh())
+
+        with open(paths["edit.txt"], 'w') as f:
+            f.write("Edited line now\n")
+        os.remove(paths["drop.txt"])
+        with open(os.path.join(self.test_dir, "new.txt"), 'w') as f:
+            f.write("Brand new line\n")
+        os.utime(paths["keep.txt"], ns=(0, 0))  # Touched but not edited
+
+        acs = AutoCompleteSystem()
+        with patch('autocomplete.index_files', wraps=autocomplete.index_files) as indexed, \
+                patch('autocomplete.COMPACT_DEAD_FRACTION', 1.0):
+            initialize_autocomplete_system(acs)
+        self.assertEqual(sorted(chunk.path for chunk in indexed.call_args[0][0]), sorted([paths["edit.txt"], os.path.join(self.test_dir, "new.txt")]))
+
+        found = lambda prefix: [r.completed_sentence for r in acs.get_best_k_completions(prefix)]
+        self.assertEqual(found("edited line"), ["Edited line now"])
+        self.assertEqual(found("brand new"), ["Brand new line"])
+        self.assertEqual(found("original line"), ["Original line from keep.txt"])
+        self.assertEqual(len(acs.dead), 2)
+
+        # Tombstoned ids survive a reload and disappear when compacted
+        reloaded = AutoCompleteSystem()
+        reloaded.load_cache()
+        self.assertEqual(reloaded.dead, acs.dead)
+        reloaded.compact()
+        self.assertEqual(sorted(s for s, _, _ in reloaded.sentences),
+                         ["Brand new line", "Edited line now", "Original line from keep.txt"])
+        self.assertEqual(found("original line"), [r.completed_sentence for r in reloaded.get_best_k_completions("original line")])
+        self.assertFalse(reloaded.refresh())
+
+    def test_refresh_shared_lines(self):
+        """Test a line shared by several files lives as long as one of them does"""
+        paths = {name: os.path.join(self.test_dir, name) for name in ("a.txt", "b.txt")}
+        for path in paths.values():
+            with open(path, 'w') as f:
+                f.write("Shared footer line\n")
+                f.write(f"Own line of {os.path.basename(path)}\n")
+        initialize_autocomplete_system(AutoCompleteSystem(), [self.test_dir])
+
+        os.remove(paths["a.txt"])
+        acs = AutoCompleteSystem()
+        with patch('autocomplete.COMPACT_DEAD_FRACTION', 1.0):
+            initialize_autocomplete_system(acs)
+        footer = acs.get_best_k_completions("shared footer")
+        self.assertEqual([(r.source_text, r.offset) for r in footer], [(paths["b.txt"], 0)])
+        self.assertEqual(acs.sources(footer[0]), [(paths["b.txt"], 0)])
+        self.assertEqual(len(acs.dead), 1)
+
+        # Restoring the file revives its sentence instead of adding a copy
+        with open(paths["a.txt"], 'w') as f:
+            f.write("Own line of a.txt\n")
+        acs.refresh()
+        self.assertEqual((len(acs.sentences), acs.dead), (3, set()))
+        acs.compact()
+        self.assertEqual(len(acs.occurrences), 3)
+        self.assertEqual([r.completed_sentence for r in acs.get_best_k_completions("own line")],
+                         ["Own line of a.txt", "Own line of b.txt"])
+
+    def test_repeated_refreshes(self):
+        """Test several refreshes in one process, without reloading, match a fresh build"""
+        with open(os.path.join(self.test_dir, "big.txt"), 'w') as f:
+            f.writelines(f"Big file line {n}\n" for n in range(20))
+        small = os.path.join(self.test_dir, "small.txt")
+        with open(small, 'w') as f:
+            f.write("Small file line\n")
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(self.test_dir)
+
+        with open(small, 'a') as f:
+            f.write("Small file appended line\n")
+        acs.refresh()
+        for name in ("b.txt", "c.txt"):
+            with open(os.path.join(self.test_dir, name), 'w') as f:
+                f.write(f"Added file {name}\n")
+            acs.refresh()
+        self.assertEqual(len(acs._live_counts), len(acs.sentences))
+
+        fresh = AutoCompleteSystem()
+        fresh.build_from_folder(self.test_dir)
+        for prefix in ("small file", "added file", "big file line 1"):
+            self.assertEqual(acs.get_best_k_completions(prefix), fresh.get_best_k_completions(prefix))
+
+    def test_session_across_refresh(self):
+        """Test a typing session does not reuse sentence ids that a refresh renumbered"""
+        with open(os.path.join(self.test_dir, "keep.txt"), 'w') as f:
+            f.write("Alpha beta gamma\n")
+        gone = os.path.join(self.test_dir, "gone.txt")
+        with open(gone, 'w') as f:
+            f.writelines(f"Alpha bet number {n}\n" for n in range(10))
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(self.test_dir)
+        session = CompletionSession(acs)
+        self.assertEqual(len(session.complete("alpha b")), 5)
+
+        os.remove(gone)
+        acs.refresh()
+        self.assertEqual(len(acs.sentences), 1)  # Compacted
+        self.assertEqual(session.complete("alpha be"), acs.get_best_k_completions("alpha be"))
+        self.assertEqual(session.complete("alpha be")[0].completed_sentence, "Alpha beta gamma")
+
 
 class TestEndToEndWorkflow(unittest.TestCase):
     """Test complete system workflow"""
@@ -136,8 +396,7 @@ class TestEndToEndWorkflow(unittest.TestCase):
         """Test full initialization and query workflow"""
         acs = AutoCompleteSystem()
 
-        with patch('sys.argv', ['main.py', self.test_dir]):
-            initialize_autocomplete_system(acs)
+        initialize_autocomplete_system(acs, [self.test_dir])
 
         # Test key scenarios from spec
         results = acs.get_best_k_completions("to be")
@@ -149,6 +408,228 @@ class TestEndToEndWorkflow(unittest.TestCase):
         hello_found = any("Hello world" in r.completed_sentence for r in results)
         self.assertTrue(hello_found)
 
+    def test_parallel_build_matches_serial(self):
+        """Test a multi-process build produces the same index as a serial one"""
+        for n in range(6):
+            with open(os.path.join(self.test_dir, f"extra_{n}.txt"), 'w') as f:
+                for line in range(20):
+                    f.write(f"Extra file {n} line {line} with shared words\n")
+
+        serial = AutoCompleteSystem()
+        serial.build_from_folder(self.test_dir)
+        parallel = AutoCompleteSystem()
+        initialize_autocomplete_system(parallel, [self.test_dir, '--workers', '2'])
+
+        self.assertEqual(parallel.sentences, serial.sentences)
+        self.assertEqual(parallel.normalized.data, serial.normalized.data)
+        self.assertEqual(parallel.normalized.offsets, serial.normalized.offsets)
+        self.assertEqual(parallel.word_index, serial.word_index)
+        self.assertEqual(parallel.get_best_k_completions("extra file 3"),
+                         serial.get_best_k_completions("extra file 3"))
+
+    def test_split_files_match_serial(self):
+        """Test a large file read in byte ranges by several workers indexes like a serial read"""
+        with open(os.path.join(self.test_dir, "large.txt"), 'w', newline='') as f:
+            for line in range(300):
+                f.write(f"Large file line {line} of many\r\n" if line % 3 else f"Large line {line}\n\n")
+
+        serial = AutoCompleteSystem()
+        serial.build_from_folder(self.test_dir)
+        parallel = AutoCompleteSystem()
+        parallel.ingest.chunk_bytes = 1000
+        parallel.build_from_folder(self.test_dir, workers=2)
+
+        self.assertEqual(parallel.sentences, serial.sentences)
+        self.assertEqual(parallel.files, serial.files)
+        self.assertEqual(parallel.word_index, serial.word_index)
+        result = parallel.get_best_k_completions("large file line 299")[0]
+        self.assertEqual((result.completed_sentence, result.offset), ("Large file line 299 of many", 399))
+
+    def test_sharded_matches_unsharded(self):
+        """Test queries fanned out to shards of the folder answer exactly like one index"""
+        rng = random.Random(0)
+        words = ["shared", "words", "shard", "sharp", "shade", "extra", "line", "query", "quite", "quiet"]
+        for n in range(8):
+            with open(os.path.join(self.test_dir, f"extra_{n}.txt"), 'w') as f:
+                f.write("Common header line for every file\n")
+                for _ in range(30):
+                    f.write(" ".join(rng.choice(words) for _ in range(5)).capitalize() + "\n")
+        # Only the last shard holds the anchor "zeb", so the others must not fall back to "xebra"
+        paths = find_text_files(self.test_dir)
+        with open(paths[0], 'a') as f:
+            f.write("Xebra crossing\n")
+        with open(paths[-1], 'a') as f:
+            f.write("Zebra crossing\n")
+
+        single = AutoCompleteSystem()
+        single.build_from_folder(self.test_dir)
+        queries = ["shar", "shared words", "common header", "quiet line", "qiuet", "xhard", "zebra cross", "to be"]
+        for mode in ("local", "process", "socket"):
+            with build_sharded(self.test_dir, 3, mode) as sharded:
+                self.assertEqual(len(sharded.shards), 3)
+                for query in queries:
+                    self.assertEqual(sharded.get_best_k_completions(query), single.get_best_k_completions(query),
+                                     f"{mode}: {query}")
+                self.assertIsInstance(sharded.get_best_k_completions("shsred", budget=0), PartialCompletions)
+        self.assertEqual(sum(split_folder(self.test_dir, 3), []), paths)
+
+    def test_server_workflow(self):
+        """Test the HTTP server answers like the library and shares identical lookups"""
+        acs = AutoCompleteSystem()
+        initialize_autocomplete_system(acs, [self.test_dir])
+        server = CompletionServer(acs)
+
+        async def fetch(port, query):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET /complete?q={query} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b"\r\n\r\n")
+            return head.split(b"\r\n")[0], json.loads(body)
+
+        async def scenario():
+            listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                responses = await asyncio.gather(fetch(port, "to%20be"), fetch(port, "pzthon"))
+                shared = await asyncio.gather(*(server.complete("Hello  world") for _ in range(4)))
+            return responses, shared
+
+        (to_be, typo), shared = asyncio.run(scenario())
+        self.assertEqual(to_be[0], b"HTTP/1.1 200 OK")
+        self.assertEqual(to_be[1]["completions"], [asdict(c) for c in acs.get_best_k_completions("to be")])
+        self.assertEqual(typo[1]["completions"][0]["completed_sentence"], "Python programming language")
+        self.assertEqual(server.stats["lookups"], 3)  # The four identical ones share one
+        self.assertEqual(server.stats["coalesced"], 3)
+        self.assertTrue(all(results == acs.get_best_k_completions("hello world") for results in shared))
+
+    def test_server_budget(self):
+        """Test lookups that run out of budget answer partial results and are counted"""
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(self.test_dir)
+        server = CompletionServer(acs, budget=60)
+
+        async def scenario():
+            return [await server.route("GET", target) for target in
+                    ("/complete?q=pzthon&budget_ms=0", "/complete?q=pzthon", "/complete?q=x&budget_ms=soon")]
+
+        (status, spent), (_, full), (bad, _) = asyncio.run(scenario())
+        self.assertEqual((status, spent["partial"], spent["completions"]), (200, True, []))
+        self.assertEqual((full["partial"], full["completions"][0]["completed_sentence"]),
+                         (False, "Python programming language"))
+        self.assertEqual(bad, 400)
+        self.assertEqual((server.stats["budgeted"], server.stats["partial"]), (2, 1))
+
+    def test_budget_bounds_fallback(self):
+        """Test a typo in the anchor answers within its budget, neighbour lookups included"""
+        rng = random.Random(0)
+        words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 9)))
+                 for _ in range(3000)]
+        for n in range(20):
+            with open(os.path.join(self.test_dir, f"bulk_{n}.txt"), 'w') as f:
+                for _ in range(1000):
+                    f.write(" ".join(rng.choice(words) for _ in range(8)) + "\n")
+
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(self.test_dir)
+        stats = []
+        acs.metrics = stats.append
+
+        budget = 0.002
+        for query in ("qzx", "jq ab"):
+            start = time.perf_counter()
+            results = acs.get_best_k_completions(query, budget=budget)
+            elapsed = time.perf_counter() - start
+            self.assertTrue(stats[-1].fallback, query)
+            self.assertIsInstance(results, PartialCompletions)
+            self.assertLess(elapsed, budget + 0.01, query)
+        self.assertTrue(acs.get_best_k_completions("qzx"))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork()")
+    def test_forked_server_workflow(self):
+        """Test forked server workers answer from the shared index file"""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        server_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+        server = subprocess.Popen([sys.executable, server_py, self.test_dir, "--port", str(port), "--processes", "2"],
+                                  cwd=self.test_dir, stdout=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/complete?q=to%20be", timeout=5) as response:
+                        body = json.loads(response.read())
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            else:
+                self.fail("server did not start")
+            self.assertTrue(os.path.exists(os.path.join(self.test_dir, os.path.basename(self.original_cache))))
+            if sys.platform.startswith("linux"):
+                # Only Linux lists a process's children under /proc
+                with open(f"/proc/{server.pid}/task/{server.pid}/children") as f:
+                    self.assertEqual(len(f.read().split()), 2)
+        finally:
+            server.terminate()
+            server.wait()
+        self.assertEqual(server.returncode, 0)
+        self.assertEqual(body["completions"][0]["completed_sentence"], "To be or not to be, that is the question")
+
+    def test_external_build_memory_budget(self):
+        """Test the spilling build stays within its memory budget and matches the in-memory build"""
+        rng = random.Random(0)
+        words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 9)))
+                 for _ in range(3000)]
+        for n in range(20):
+            with open(os.path.join(self.test_dir, f"bulk_{n}.txt"), 'w') as f:
+                for _ in range(100):
+                    f.write(" ".join(rng.choice(words) for _ in range(8)) + "\n")
+
+        serial = AutoCompleteSystem()
+        serial.build_from_folder(self.test_dir)
+        serial.save_cache()
+
+        budget = 128 * 1024
+        external_path = os.path.join(self.test_dir, "external.bin")
+        tracemalloc.start()
+        try:
+            with patch('external_build.write_run', wraps=external_build.write_run) as runs:
+                build_index_file(self.test_dir, external_path, memory_budget=budget)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        # Budget for postings, plus a fixed allowance for I/O buffers
+        self.assertLess(peak, budget + 1024 * 1024)
+        self.assertGreater(runs.call_count, 10)
+        with open(self.cache_file, 'rb') as f1, open(external_path, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+        acs = AutoCompleteSystem()
+        os.remove(self.cache_file)
+        initialize_autocomplete_system(acs, [self.test_dir, '--memory-budget', '1'])
+        self.assertEqual(acs.get_best_k_completions("to be"), serial.get_best_k_completions("to be"))
+
+    def test_external_build_skips_unreadable_file(self):
+        """Test the spilling build skips a file that fails to read, like the in-memory build"""
+        unreadable = os.path.join(self.test_dir, "shakespeare.txt")
+
+        def digest(path):
+            if path == unreadable:
+                raise PermissionError(13, "Permission denied", path)
+            return real_digest(path)
+
+        real_digest = external_build.file_digest
+        external_path = os.path.join(self.test_dir, "external.bin")
+        with patch('external_build.file_digest', side_effect=digest):
+            build_index_file(self.test_dir, external_path)
+
+        acs = AutoCompleteSystem()
+        acs.load_cache(external_path)
+        self.assertEqual(sorted(acs.files), [os.path.join(self.test_dir, "programming.txt")])
+        self.assertEqual(acs.get_best_k_completions("to be"), [])
+        self.assertEqual(len(acs.get_best_k_completions("hello")), 1)
+
     def test_file_filtering(self):
         """Test only .txt files are processed"""
         # Add non-txt file
@@ -162,6 +643,25 @@ class TestEndToEndWorkflow(unittest.TestCase):
         csv_found = any("CSV" in sentence for sentence, _, _ in acs.sentences)
         self.assertFalse(csv_found, "CSV files should be ignored")
 
+    def test_compressed_files(self):
+        """Test .txt.gz, .txt.bz2 and .txt.xz files are decompressed and indexed"""
+        import bz2
+        import lzma
+        for opener, suffix in ((gzip.open, ".gz"), (bz2.open, ".bz2"), (lzma.open, ".xz")):
+            with opener(os.path.join(self.test_dir, f"packed.txt{suffix}"), 'wt') as f:
+                f.write(f"\nPacked {suffix[1:]} archive line\n")
+        with gzip.open(os.path.join(self.test_dir, "other.csv.gz"), 'wt') as f:
+            f.write("Packed csv archive line\n")
+
+        acs = AutoCompleteSystem()
+        acs.build_from_folder(self.test_dir)
+
+        results = acs.get_best_k_completions("packed")
+        self.assertEqual(sorted(r.completed_sentence for r in results),
+                         ["Packed bz2 archive line", "Packed gz archive line", "Packed xz archive line"])
+        self.assertEqual({r.offset for r in results}, {1})
+        self.assertTrue(all(r.source_text.endswith(r.completed_sentence.split()[1]) for r in results))
+
     def test_subfolder_scanning(self):
         """Test recursive folder scanning"""
         # Create subfolder with content
@@ -176,6 +676,24 @@ class TestEndToEndWorkflow(unittest.TestCase):
         nested_found = any("Nested file" in sentence for sentence, _, _ in acs.sentences)
         self.assertTrue(nested_found, "Should find files in subfolders")
 
+    def test_unreadable_file_skipped(self):
+        """Test a file that fails to read is skipped with a warning and left out of the manifest"""
+        unreadable = os.path.join(self.test_dir, "shakespeare.txt")
+
+        def digest(path):
+            if path == unreadable:
+                raise PermissionError(13, "Permission denied", path)
+            return real_digest(path)
+
+        real_digest = autocomplete.file_digest
+        acs = AutoCompleteSystem()
+        with patch('autocomplete.file_digest', side_effect=digest):
+            acs.build_from_folder(self.test_dir)
+
+        self.assertEqual(sorted(acs.files), [os.path.join(self.test_dir, "programming.txt")])
+        self.assertEqual(acs.get_best_k_completions("to be"), [])
+        self.assertEqual(len(acs.get_best_k_completions("hello")), 1)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
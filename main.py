@@ -1,18 +1,22 @@
+import sys
 from initialize import initialize_autocomplete_system
-from autocomplete import AutoCompleteSystem
+from autocomplete import AutoCompleteSystem, CompletionSession
 
 def main():
     """
     Main function for running the autocomplete CLI.
     Loads or builds the index cache, then interacts with the user to get prefixes and display suggestions.
+    An existing cache is loaded in the background, so the prompt shows at once and the first
+    query waits for the load if it is not done yet.
     """
     acs = AutoCompleteSystem()
 
-    # Initialize or load the cache
-    initialize_autocomplete_system(acs)
+    # Build the cache, or start loading it
+    initialize_autocomplete_system(acs, sys.argv[1:], background=True)
 
     print("Enter your prefix, '#' to reset buffer.")
     buffer = ""
+    session = CompletionSession(acs)
 
     # Interactive input loop
     while True:
@@ -20,13 +24,14 @@ def main():
 
         if user_in == "#":
             buffer = ""
+            session.reset()
             print("Buffer reset.")
             continue
 
         # Append user input to buffer with space if needed
         buffer += (" " if buffer and not user_in.startswith(" ") else "") + user_in
 
-        completions = acs.get_best_k_completions(buffer)
+        completions = session.complete(buffer)
 
         for i, c in enumerate(completions, 1):
             print(f"{i}. (score={c.score}) {c.completed_sentence} -- {c.source_text} (line {c.offset})")
@@ -0,0 +1,232 @@
+import os
+import gc
+import sys
+import json
+import signal
+import socket
+import asyncio
+import argparse
+from dataclasses import asdict
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from autocomplete import AutoCompleteSystem, AutoCompleteData, PartialCompletions, normalize_text
+from initialize import initialize_autocomplete_system
+
+MAX_HEADER_LINES = 100  # Requests with more header lines are rejected
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class CompletionServer:
+    """
+    Serves completions from one loaded AutoCompleteSystem to many clients
+    over HTTP/1.1 with keep-alive.
+
+    Concurrent requests for the same normalized prefix share a single lookup.
+    Lookups run in a thread pool, never on the event loop: their cost depends
+    on how many candidates the prefix has, not on whether its anchor key has
+    postings, and is not known before they run.
+
+    Lookups get 'budget' seconds, or budget_ms from the request, before they
+    answer with what they have found so far (see get_best_k_completions()).
+    Such answers are marked "partial"; stats counts them against the
+    lookups that had a budget.
+    """
+
+    def __init__(self, acs: AutoCompleteSystem, executor=None, budget: Optional[float] = None):
+        self.acs = acs
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.budget = budget
+        self.in_flight: Dict[tuple, asyncio.Future] = {}
+        self.stats = {"requests": 0, "coalesced": 0, "lookups": 0, "budgeted": 0, "partial": 0}
+
+    async def complete(self, prefix: str, budget: Optional[float] = None) -> List[AutoCompleteData]:
+        """
+        Return the top completions for 'prefix' within 'budget' seconds (the
+        server's budget by default), joining an identical lookup that is
+        already running if there is one.
+        """
+        self.stats["requests"] += 1
+        prefix_norm = normalize_text(prefix)
+        if not prefix_norm:
+            return []
+
+        key = (prefix_norm, budget if budget is not None else self.budget)
+        pending = self.in_flight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._lookup(*key))
+            self.in_flight[key] = pending
+            pending.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # A client that disconnects must not cancel the lookup for the others
+        return await asyncio.shield(pending)
+
+    async def _lookup(self, prefix_norm: str, budget: Optional[float]) -> List[AutoCompleteData]:
+        self.stats["lookups"] += 1
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self.executor, self.acs.get_best_k_completions, prefix_norm, budget)
+        if budget is not None:
+            self.stats["budgeted"] += 1
+            self.stats["partial"] += isinstance(results, PartialCompletions)
+        return results
+
+    async def route(self, method: str, target: str):
+        """
+        Dispatch one request. Returns (status, JSON-serializable body).
+        """
+        url = urlsplit(target)
+        if url.path == "/complete":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            query = parse_qs(url.query)
+            prefix = query.get("q", [""])[0]
+            budget = None
+            if "budget_ms" in query:
+                try:
+                    budget = float(query["budget_ms"][0]) / 1000
+                except ValueError:
+                    return 400, {"error": "budget_ms must be a number"}
+            completions = await self.complete(prefix, budget)
+            return 200, {"prefix": prefix, "completions": [asdict(c) for c in completions],
+                         "partial": isinstance(completions, PartialCompletions)}
+        if url.path == "/stats":
+            cache = self.acs.result_cache
+            return 200, dict(self.stats, pid=os.getpid(), cache=cache.stats() if cache is not None else None)
+        return 404, {"error": f"unknown path {url.path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve the requests of one connection until the client closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                # Request bodies are not used, but must be consumed to keep the connection in sync
+                await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    status, body = await self.route(method, target)
+                except ValueError:
+                    status, body, version = 400, {"error": "malformed request line"}, "HTTP/1.0"
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                payload = json.dumps(body).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(acs: AutoCompleteSystem, host: str = None, port: int = None, sock: socket.socket = None,
+                budget: Optional[float] = None):
+    """
+    Serve 'acs' on host:port, or on an already listening socket, until
+    cancelled, giving lookups 'budget' seconds by default.
+    """
+    server = await asyncio.start_server(CompletionServer(acs, budget=budget).handle, host, port, sock=sock)
+    if sock is None:
+        addresses = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+        print(f"Serving completions on {addresses} (GET /complete?q=<prefix>)")
+    async with server:
+        await server.serve_forever()
+
+
+def serve_forked(acs: AutoCompleteSystem, host: str, port: int, processes: int, budget: Optional[float] = None):
+    """
+    Serve from 'processes' forked workers that accept on one shared socket.
+
+    The index must be memory-mapped (see load_cache()) so every worker reads
+    the same physical pages from the page cache instead of holding a private
+    copy. What little is still built on the heap, like the deletion index, is
+    built before forking and frozen out of the garbage collector, so workers
+    do not dirty those pages just by scanning them.
+    """
+    acs.deletion_index, acs.part_index  # Build them once here rather than in every worker
+    sock = socket.create_server((host, port))
+    print(f"Serving completions on {host}:{sock.getsockname()[1]} with {processes} worker processes "
+          f"(GET /complete?q=<prefix>)")
+    gc.freeze()
+
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                asyncio.run(serve(acs, sock=sock, budget=budget))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        children.append(pid)
+    sock.close()
+
+    # Stop the workers when the parent is interrupted or terminated
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+
+
+def main():
+    """
+    Run the completion server. Arguments other than --host, --port,
+    --processes and --budget-ms are passed on to initialize_autocomplete_system().
+    """
+    parser = argparse.ArgumentParser(description="Sentence autocomplete HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of forked worker processes sharing the index (default: 1)")
+    parser.add_argument("--budget-ms", type=float, metavar="MS",
+                        help="answer lookups that take longer with the best completions found so far, "
+                             "marked partial; requests can set their own with &budget_ms=")
+    args, index_args = parser.parse_known_args(sys.argv[1:])
+    budget = args.budget_ms / 1000 if args.budget_ms is not None else None
+
+    acs = AutoCompleteSystem()
+    initialize_autocomplete_system(acs, index_args)
+    if args.processes > 1:
+        if not hasattr(os, "fork"):
+            print("Error: --processes needs a platform with os.fork()")
+            sys.exit(1)
+        # Serve from the saved index file, which the workers share, not from this process's heap
+        acs = AutoCompleteSystem()
+        acs.load_cache()
+        serve_forked(acs, args.host, args.port, args.processes, budget)
+        return
+    try:
+        asyncio.run(serve(acs, args.host, args.port, budget=budget))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Sharded serving: the files under a folder are split into consecutive runs,
+each indexed by its own AutoCompleteSystem, and every query fans out to all
+shards and merges their top completions.
+
+Shards hold consecutive runs of the files in walk order, so a sentence's id
+in the unsharded index orders like (first shard holding it, its id there).
+A shard's top k therefore holds every sentence of the overall top k whose
+first occurrence it holds, and merging the shard lists by (-score, lowered
+sentence, shard, order within the shard) gives exactly the completions and
+sources of one index over the whole folder, as freshly built. That needs
+every shard to know the keys of the others (AutoCompleteSystem.shared_keys),
+since a query only falls back to single edit neighbours of its anchor key
+when no shard holds the anchor. Shards are not refreshed: rebuild them when
+the files change.
+
+Shards run in this process (LocalShard), in a child process each
+(ProcessShard), or behind the HTTP server of server.py (RemoteShard), as
+remote nodes would; start_shard_server() runs one on a local socket.
+"""
+import asyncio
+import http.client
+import json
+import multiprocessing
+import socket
+from typing import List, Optional
+from urllib.parse import urlencode
+
+from autocomplete import (AutoCompleteSystem, AutoCompleteData, MAX_COMPLETIONS, PartialCompletions, normalize_text,
+                          split_by_size)
+from ingest import IngestOptions, find_text_files, plan_chunks
+from server import serve
+
+MODES = ("local", "process", "socket")
+
+
+def split_folder(root_folder: str, shards: int, options: IngestOptions = None) -> List[List[str]]:
+    """
+    Split the files under 'root_folder' into at most 'shards' runs of
+    consecutive files in walk order, of similar total size.
+    """
+    chunks = plan_chunks(find_text_files(root_folder, options), options)
+    return [[chunk.path for chunk in group] for group in split_by_size(chunks, shards) if group]
+
+
+def merge_completions(shard_results: List[List[AutoCompleteData]], k: int = MAX_COMPLETIONS) -> List[AutoCompleteData]:
+    """
+    Merge the ranked completions of each shard, given in shard order, into
+    the overall top 'k', keeping the first copy of a sentence found in
+    several shards.
+    """
+    hits = [(shard, c) for shard, results in enumerate(shard_results) for c in results]
+    # A stable sort keeps each shard's own order among ties, which is sentence id order
+    hits.sort(key=lambda hit: (-hit[1].score, hit[1].completed_sentence.lower(), hit[0]))
+    merged, seen = [], set()
+    for _, c in hits:
+        if c.completed_sentence not in seen:
+            seen.add(c.completed_sentence)
+            merged.append(c)
+            if len(merged) == k:
+                break
+    return merged
+
+
+def build_shard(root_folder: str, paths: List[str], positional: bool = False,
+                options: IngestOptions = None) -> AutoCompleteSystem:
+    """
+    Index 'paths', one shard of 'root_folder'.
+    """
+    acs = AutoCompleteSystem()
+    acs.ingest = options or IngestOptions()
+    acs.build_from_folder(root_folder, positional=positional, paths=paths)
+    return acs
+
+
+class LocalShard:
+    """A shard indexed in this process. Queries to it run one after another."""
+
+    def __init__(self, acs: AutoCompleteSystem):
+        self.acs = acs
+        self._results = []
+
+    def wait_ready(self) -> List[str]:
+        return list(self.acs.word_index)
+
+    def share_keys(self, keys: set):
+        self.acs.shared_keys = keys
+
+    def send(self, prefix_norm: str, budget: Optional[float] = None):
+        self._results = self.acs.get_best_k_completions(prefix_norm, budget)
+
+    def receive(self) -> List[AutoCompleteData]:
+        return self._results
+
+    def close(self):
+        pass
+
+
+def _serve_pipe(conn, root_folder: str, paths: List[str], positional: bool, options: IngestOptions):
+    """
+    Body of a ProcessShard: index the shard, swap keys with the other shards,
+    then answer prefixes read from 'conn' until it is closed or sent None.
+    """
+    acs = build_shard(root_folder, paths, positional, options)
+    try:
+        conn.send(list(acs.word_index))
+        acs.shared_keys = conn.recv()
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            results = acs.get_best_k_completions(*request)
+            conn.send((isinstance(results, PartialCompletions),
+                       [(c.completed_sentence, c.source_text, c.offset, c.score) for c in results]))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
+
+
+class ProcessShard:
+    """
+    A shard indexed and queried in a child process, so every shard of a
+    query is searched in parallel. The child starts indexing right away.
+    """
+
+    def __init__(self, root_folder: str, paths: List[str], positional: bool = False, options: IngestOptions = None):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve_pipe, daemon=True,
+                                               args=(child, root_folder, paths, positional, options))
+        self.process.start()
+        child.close()
+
+    def wait_ready(self) -> List[str]:
+        """
+        Wait until the child has indexed its files, and return its keys.
+        """
+        return self.conn.recv()
+
+    def share_keys(self, keys: set):
+        self.conn.send(keys)
+
+    def send(self, prefix_norm: str, budget: Optional[float] = None):
+        self.conn.send((prefix_norm, budget))
+
+    def receive(self) -> List[AutoCompleteData]:
+        partial, rows = self.conn.recv()
+        results = [AutoCompleteData(*c) for c in rows]
+        return PartialCompletions(results) if partial else results
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+        self.process.join()
+
+
+def _serve_socket(conn, host: str, root_folder: str, paths: List[str], positional: bool, options: IngestOptions):
+    """
+    Body of a shard server: listen on a free port of 'host' and report it on
+    'conn', index the shard and swap keys with the other shards, then serve
+    it like server.py.
+    """
+    sock = socket.create_server((host, 0))
+    conn.send(sock.getsockname()[1])
+    acs = build_shard(root_folder, paths, positional, options)
+    conn.send(list(acs.word_index))
+    acs.shared_keys = conn.recv()
+    conn.close()
+    try:
+        asyncio.run(serve(acs, sock=sock))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_shard_server(root_folder: str, paths: List[str], positional: bool = False, options: IngestOptions = None,
+                       host: str = "127.0.0.1") -> "RemoteShard":
+    """
+    Start a child process serving one shard over HTTP on a local socket, a
+    stand-in for a remote node, and return a RemoteShard connected to it
+    that stops the child when closed.
+    """
+    conn, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_socket, args=(child, host, root_folder, paths, positional, options),
+                                      daemon=True)
+    process.start()
+    child.close()
+    return RemoteShard(host, conn.recv(), process=process, ready=conn)
+
+
+class RemoteShard:
+    """
+    A shard served over HTTP by server.py. A query is sent to every shard
+    before any answer is read, so the shards search in parallel.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = None, process: multiprocessing.Process = None,
+                 ready=None):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.process = process  # Local server process to stop on close(), see start_shard_server()
+        self.ready = ready  # Pipe to a local server that swaps keys once it has indexed its files
+
+    def wait_ready(self) -> Optional[List[str]]:
+        """
+        Wait until a local server has indexed its files, and return its keys.
+        A node started elsewhere must be given the keys of the others itself.
+        """
+        return self.ready.recv() if self.ready is not None else None
+
+    def share_keys(self, keys: set):
+        if self.ready is not None:
+            self.ready.send(keys)
+            self.ready.close()
+            self.ready = None
+
+    def send(self, prefix_norm: str, budget: Optional[float] = None):
+        query = {"q": prefix_norm}
+        if budget is not None:
+            query["budget_ms"] = budget * 1000
+        self.connection.request("GET", "/complete?" + urlencode(query))
+
+    def receive(self) -> List[AutoCompleteData]:
+        response = self.connection.getresponse()
+        body = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"shard answered {response.status}: {body.get('error')}")
+        results = [AutoCompleteData(**c) for c in body["completions"]]
+        return PartialCompletions(results) if body["partial"] else results
+
+    def close(self):
+        self.connection.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+
+
+class ShardedAutoComplete:
+    """
+    Answers get_best_k_completions() like one AutoCompleteSystem over all the
+    files of its shards, which must be given in walk order (see split_folder()).
+    """
+
+    def __init__(self, shards):
+        self.shards = shards
+
+    def get_best_k_completions(self, prefix: str, budget: Optional[float] = None) -> List[AutoCompleteData]:
+        """
+        Return the top 5 best completions for the given prefix, from all
+        shards. Each shard searches within 'budget' seconds, and the merged
+        completions are PartialCompletions when any shard's are.
+        """
+        prefix_norm = normalize_text(prefix)
+        if not prefix_norm:
+            return []
+        for shard in self.shards:
+            shard.send(prefix_norm, budget)
+        shard_results = [shard.receive() for shard in self.shards]
+        merged = merge_completions(shard_results)
+        if any(isinstance(results, PartialCompletions) for results in shard_results):
+            return PartialCompletions(merged)
+        return merged
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self) -> "ShardedAutoComplete":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_sharded(root_folder: str, shards: int, mode: str = "process", positional: bool = False,
+                  options: IngestOptions = None) -> ShardedAutoComplete:
+    """
+    Split the files under 'root_folder' into 'shards' shards and index them:
+    in this process one after another ("local"), or in parallel in a child
+    process each, queried through a pipe ("process") or over HTTP ("socket").
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown shard mode {mode!r}, expected one of {', '.join(MODES)}")
+    groups = split_folder(root_folder, shards, options)
+    if mode == "local":
+        backends = [LocalShard(build_shard(root_folder, paths, positional, options)) for paths in groups]
+    elif mode == "process":
+        backends = [ProcessShard(root_folder, paths, positional, options) for paths in groups]
+    else:
+        backends = [start_shard_server(root_folder, paths, positional, options) for paths in groups]
+    sharded = ShardedAutoComplete(backends)
+    try:
+        keys = set()
+        for backend in backends:
+            keys.update(backend.wait_ready() or ())
+        for backend in backends:
+            backend.share_keys(keys)
+    except BaseException:
+        sharded.close()
+        raise
+    return sharded
@@ -1,9 +1,16 @@
+import io
 import unittest
 import tempfile
 import os
 import shutil
 import time
-from autocomplete import AutoCompleteSystem, normalize_text, single_edit_match_info
+from array import array
+from unittest.mock import patch
+from autocomplete import (AutoCompleteSystem, AutoCompleteData, normalize_text, single_edit_match_info,
+                          match_score, best_single_edit_match, TopK, CompletionSession, ResultCache, SentenceTable,
+                          key_score_caps, PartialCompletions)
+from sharding import merge_completions
+from ingest import split_file, chunk_lines, file_lines
 
 
 class TestCriticalLogic(unittest.TestCase):
@@ -29,6 +36,22 @@ class TestCriticalLogic(unittest.TestCase):
         self.assertIsNone(single_edit_match_info("abc", "xyz"))
         self.assertIsNone(single_edit_match_info("a", "abcde"))
 
+    def test_best_single_edit_match(self):
+        """Test the substring matcher reports the cheapest edit in the sentence"""
+        self.assertEqual(best_single_edit_match("to pe", "to be or not"), ("substitution", 4))
+        self.assertEqual(best_single_edit_match("tobe", "to be or not"), ("insertion", 3))
+        self.assertEqual(best_single_edit_match("too be", "to be or not"), ("deletion", 3))
+        self.assertIsNone(best_single_edit_match("xyz", "to be or not"))
+
+        # "bxst" is one substitution from both "best" (position 2) and "bxsa" (position 4)
+        self.assertEqual(best_single_edit_match("bxst", "best of bxsa"), ("substitution", 4))
+
+        # Positions follow single_edit_match_info for the matched window
+        for prefix, text in (("abc", "xxabd"), ("abcd", "zzabxcd"), ("hello", "say helo")):
+            kind, pos = best_single_edit_match(prefix, text)
+            windows = {text[s:s + L] for L in range(1, len(text) + 1) for s in range(len(text) - L + 1)}
+            self.assertIn((kind, pos), {single_edit_match_info(prefix, w) for w in windows})
+
 
 class TestScoringAccuracy(unittest.TestCase):
     """Test scoring matches project spec exactly"""
@@ -81,6 +104,78 @@ class TestIndexingSystem(unittest.TestCase):
         self.assertIn("be", self.acs.word_index)
         self.assertIn("or", self.acs.word_index)
 
+    def test_posting_lists_are_compact(self):
+        """Test posting lists are frozen into sorted arrays without duplicates"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("banana bandana\n")
+            f.write("to be or not to be\n")
+            f.write("banana split\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+        # "ana" occurs four times in the first line but is stored once per sentence
+        self.assertEqual(list(self.acs.word_index["ana"]), [0, 2])
+        self.assertEqual(list(self.acs.word_index["to"]), [1])
+        for postings in self.acs.word_index.values():
+            self.assertIsInstance(postings, array)
+            self.assertEqual(list(postings), sorted(set(postings)))
+
+    def test_sentence_table_columns(self):
+        """Test sentences are stored as columns with each source path kept once"""
+        rows = [("first line", "a.txt", 0), ("second line", "a.txt", 2), ("other", "b.txt", 0)]
+        table = SentenceTable.from_rows(rows)
+        self.assertEqual(list(table), rows)
+        self.assertEqual(table, rows)
+        self.assertEqual(len(table.paths), 2)
+        self.assertEqual(list(table.file_ids), [0, 0, 1])
+
+        more = SentenceTable.from_rows([("again", "b.txt", 5), ("new", "c.txt", 1)])
+        table.extend(more)
+        self.assertEqual(list(table.file_ids), [0, 0, 1, 1, 2])
+        self.assertEqual(table[-1], ("new", "c.txt", 1))
+
+        kept = table.select([2, 4])
+        self.assertEqual(list(kept), [rows[2], ("new", "c.txt", 1)])
+        self.assertEqual(len(kept.paths), 2)
+
+    def test_repeated_lines_stored_once(self):
+        """Test a line repeated across files is one sentence listing all its occurrences"""
+        paths = [os.path.join(self.test_dir, name) for name in ("a.txt", "b.txt")]
+        with open(paths[0], 'w') as f:
+            f.write("Copyright notice here\n")
+            f.write("first file text\n")
+            f.write("Copyright notice here\n")
+        with open(paths[1], 'w') as f:
+            f.write("second file text\n")
+            f.write("Copyright notice here\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+        self.assertEqual((len(self.acs.sentences), len(self.acs.occurrences)), (3, 5))
+        self.assertEqual(len(self.acs.word_index["cop"]), 1)
+        results = self.acs.get_best_k_completions("copyright")
+        self.assertEqual(len(results), 1)
+        sources = self.acs.sources(results[0])
+        self.assertEqual(sorted(sources), [(paths[0], 0), (paths[0], 2), (paths[1], 1)])
+        self.assertEqual(sources[0], (results[0].source_text, results[0].offset))
+
+    def test_file_chunks_keep_line_numbers(self):
+        """Test byte-range chunks read the same lines as the whole file, whatever the line endings"""
+        path = os.path.join(self.test_dir, "test.txt")
+        with open(path, 'wb') as f:
+            f.write(b"first\r\nsecond\rthird\n\n")
+            f.write(b"bad \xff byte\r\n\rlast line\n")
+
+        chunks = split_file(path, 4)
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual([c.start for c in chunks[1:]], [c.end for c in chunks[:-1]])
+        self.assertIsNone(chunks[-1].end)
+        lines = [line for chunk in chunks for line in chunk_lines(chunk)]
+        self.assertEqual(lines, list(file_lines(path)))
+        self.assertEqual(lines, [(0, "first"), (1, "second"), (2, "third"), (4, "bad \ufffd byte"), (6, "last line")])
+        with self.assertRaises(UnicodeDecodeError):
+            list(file_lines(path, "strict"))
+
     def test_fallback_mechanism(self):
         """Test fallback when no direct matches"""
         with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
@@ -93,6 +188,357 @@ class TestIndexingSystem(unittest.TestCase):
         found = any("unique" in r.completed_sentence for r in results)
         self.assertTrue(found, "Fallback should find single-edit matches")
 
+    def test_fallback_uses_deletion_index(self):
+        """Test typos in the anchor are answered without scanning every sentence"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("unique sentence here\n")
+            f.write("another line entirely\n")
+            f.write("nothing in common\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+        self.assertIn("que", self.acs.deletion_index["qe"])
+        for query in ("unque", "unxque", "inique", "xnique"):
+            candidates = list(self.acs._candidates(normalize_text(query)))
+            self.assertEqual(candidates, [0], f"'{query}' should only reach sentence 0")
+
+    def test_fallback_short_and_word_break_typos(self):
+        """Test the fallback finds 2-letter typos inside longer words and edits that add a word break"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("quick brown fox\n")
+            f.write("than that\n")
+            f.write("the seal is here\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+        found = lambda prefix: sorted(r.completed_sentence for r in self.acs.get_best_k_completions(prefix))
+        for query in ("to", "tx"):
+            self.assertIn("than that", found(query), query)
+        self.assertIn("quick brown fox", found("qe"))
+        self.assertEqual(found("lhis"), ["the seal is here"])
+        self.assertEqual(found("sealxis"), ["the seal is here"])
+
+    def test_fallback_uses_part_index(self):
+        """Test short and word-break typos are looked up by key parts, not by scanning keys or sentences"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            for word in ("majestic", "rajah", "fajita", "hajj", "pajamas"):
+                f.write(f"the {word} here\n")
+            f.write("than that\n")
+            f.write("the seal is here\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+        self.assertIn("maj", self.acs.part_index["aj "])
+        self.assertIn("hat", self.acs.part_index[" ha"])
+        self.assertIn("is", self.acs.part_index["is "])
+        # Five sentences hold "aj" exactly inside a word, so no edit match can enter the top 5
+        self.assertEqual(list(self.acs._candidates("aj")), [0, 1, 2, 3, 4])
+        self.assertEqual(list(self.acs._candidates("sealxis")), [6])
+
+        with open(os.path.join(self.test_dir, "more.txt"), 'w') as f:
+            f.write("quokka zoo\n")
+        self.acs.refresh()
+        self.assertIn("okk", self.acs.part_index["kk "])
+        self.assertEqual([r.completed_sentence for r in self.acs.get_best_k_completions("qukka")], ["quokka zoo"])
+
+    def test_shard_skips_fallback_for_shared_anchor(self):
+        """Test a shard only looks up neighbours of an anchor no shard holds"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("unique sentence here\n")
+
+        self.acs.build_from_folder(self.test_dir)
+        self.acs.shared_keys = set(self.acs.word_index) | {"xni"}
+
+        self.assertEqual(self.acs.get_best_k_completions("xnique"), [])
+        self.assertEqual(len(self.acs.get_best_k_completions("znique")), 1)
+
+
+class TestCandidateGeneration(unittest.TestCase):
+    """Test multi-key candidate filtering keeps every possible match"""
+
+    def setUp(self):
+        self.acs = AutoCompleteSystem()
+        self.test_dir = tempfile.mkdtemp()
+
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("the quick brown fox jumps\n")
+            f.write("the quick brown dog sleeps\n")
+            f.write("the lazy dog sleeps all day\n")
+            f.write("the quack brown duck\n")
+            f.write("then they quit thinking\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_multi_key_intersection(self):
+        """Test later words of the prefix narrow the candidates"""
+        candidates = self.acs._candidates(normalize_text("the quick brown"))
+        self.assertEqual(list(candidates), [0, 1, 3])
+
+    def test_candidates_keep_single_edit_matches(self):
+        """Test no sentence the verifier accepts is filtered out"""
+        for query in ("the quick brown", "the quikc brown", "the qick brown", "thequick brow"):
+            prefix_norm = normalize_text(query)
+            candidates = set(self.acs._candidates(prefix_norm))
+            anchor = prefix_norm.split()[0][:3]
+            for idx in self.acs.word_index[anchor]:
+                sentence = normalize_text(self.acs.sentences[idx][0])
+                if match_score(prefix_norm, sentence) is not None:
+                    self.assertIn(idx, candidates, f"'{query}' lost sentence {idx}")
+
+    def test_positional_exact_hits(self):
+        """Test positional postings only accept keys lined up as in the prefix"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'a') as f:
+            f.write("abcxdef ghi\n")
+            f.write("xabc defg\n")
+            f.write("abc def ghi\n")
+            f.write("abc de fgh\n")
+        plain, acs = AutoCompleteSystem(), AutoCompleteSystem()
+        plain.build_from_folder(self.test_dir)
+        acs.build_from_folder(self.test_dir, positional=True)
+        everything = list(range(len(acs.sentences)))
+
+        with patch('autocomplete.POSITION_PROBE_COST', 0):
+            self.assertEqual(acs._exact_hits("abc def", everything), {6, 7})
+            self.assertEqual(acs._exact_hits("the quick brown", everything), {0, 1})
+            self.assertEqual(acs._exact_hits("bc de", everything), None)  # Short last word
+            for query in ("the quick brown", "abc def", "abc de", "bcxdef", "the quikc", "brown do"):
+                self.assertEqual(acs.get_best_k_completions(query), plain.get_best_k_completions(query))
+
+
+class TestTopKSelection(unittest.TestCase):
+    """Test bounded top-k selection and early termination"""
+
+    def setUp(self):
+        self.acs = AutoCompleteSystem()
+        self.test_dir = tempfile.mkdtemp()
+
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            for word in ("fig", "egg", "date", "cherry", "banana", "apple"):
+                f.write(f"hello {word}\n")
+            f.write("hello apple\n")
+            f.write("help me please\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_topk_order_and_duplicates(self):
+        """Test ranking by score then text, keeping the first copy of a sentence"""
+        top = TopK(3)
+        for score, sentence, idx in ((4, "b", 0), (6, "c", 1), (4, "a", 2), (6, "c", 3), (1, "d", 4)):
+            top.push(score, sentence, idx)
+        self.assertEqual(top.ranked(), [("c", 1, 6), ("a", 2, 4), ("b", 0, 4)])
+
+    def test_merge_shard_results(self):
+        """Test shard top lists merge by score and text, then shard and shard order, keeping the first copy"""
+        first = [AutoCompleteData("b x", "a.txt", 3, 6), AutoCompleteData("B x", "a.txt", 1, 6),
+                 AutoCompleteData("c", "a.txt", 0, 2)]
+        second = [AutoCompleteData("A", "b.txt", 0, 6), AutoCompleteData("b x", "b.txt", 7, 6),
+                  AutoCompleteData("b X", "b.txt", 2, 6)]
+        merged = merge_completions([first, second], k=4)
+        self.assertEqual([(r.completed_sentence, r.source_text) for r in merged],
+                         [("A", "b.txt"), ("b x", "a.txt"), ("B x", "a.txt"), ("b X", "b.txt")])
+
+    def test_exact_hits_skip_fuzzy_matching(self):
+        """Test the fuzzy matcher is not run once exact hits fill the top 5"""
+        with patch("autocomplete.fuzzy_match_score") as fuzzy:
+            results = self.acs.get_best_k_completions("hello")
+
+        fuzzy.assert_not_called()
+        self.assertEqual([r.completed_sentence for r in results],
+                         ["hello apple", "hello banana", "hello cherry", "hello date", "hello egg"])
+        self.assertEqual(results[0].offset, 5)
+
+    def test_score_caps(self):
+        """Test keys near the start cap the score of sentences missing them"""
+        # Edits inside "abc" end by position 3, inside "bcd" by 4; later ones cost the minimum
+        self.assertEqual(key_score_caps("abcdef"), [("abc", 9), ("bcd", 10)])
+        # A deletion in a run of b's is reported at the run's last position
+        self.assertEqual(key_score_caps("abbbc"), [("abb", 8), ("bbb", 8)])
+
+    def test_capped_candidates_skipped(self):
+        """Test candidates that can only match with an early edit are skipped once late edits fill the top 5"""
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("abcxefgh early edit\n")
+            for word in ("one", "two", "three", "four", "five"):
+                f.write(f"abcdefgx {word}\n")
+        self.acs.build_from_folder(self.test_dir)
+        stats = []
+        self.acs.metrics = stats.append
+
+        results = self.acs.get_best_k_completions("abcdefgh")
+        self.assertEqual((stats[0].candidates, stats[0].fuzzy_checks), (6, 5))
+        self.assertEqual([r.score for r in results], [15] * 5)
+
+
+class TestCompletionSession(unittest.TestCase):
+    """Test incremental refinement while a prefix is typed"""
+
+    def setUp(self):
+        self.acs = AutoCompleteSystem()
+        self.test_dir = tempfile.mkdtemp()
+
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("the quick brown fox jumps\n")
+            f.write("the quick brown dog sleeps\n")
+            f.write("the quiet brown mouse\n")
+            f.write("the lazy dog sleeps all day\n")
+            f.write("then they quit thinking\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_session_matches_full_queries(self):
+        """Test every keystroke returns what a fresh query would"""
+        session = CompletionSession(self.acs)
+        for typed in ("the quick brown dog", "the qiuck brown", "then they"):
+            session.reset()
+            for n in range(1, len(typed) + 1):
+                expected = self.acs.get_best_k_completions(typed[:n])
+                self.assertEqual(session.complete(typed[:n]), expected, f"mismatch at '{typed[:n]}'")
+
+    def test_session_narrows_candidates(self):
+        """Test extensions only verify the previous survivors"""
+        session = CompletionSession(self.acs)
+        session.complete("the qui")
+        self.assertEqual(list(session._previous.survivors), [0, 1, 2, 4])
+        session.complete("the quick")
+        self.assertEqual(list(session._previous.survivors), [0, 1])
+
+        with patch.object(self.acs, "_search", wraps=self.acs._search) as search:
+            session.complete("the quick brown d")
+        self.assertEqual(list(search.call_args[0][1]), [0, 1])
+
+    def test_batch_matches_single_queries(self):
+        """Test the batch API answers each prefix like a single query, in order"""
+        prefixes = ["the quick brown dog", "the qiuck", "", "then they", "The Quick", "the q", "sleeps", "the q"]
+        expected = [self.acs.get_best_k_completions(p) for p in prefixes]
+        self.acs.result_cache = None
+        with patch.object(self.acs, "_query", wraps=self.acs._query) as query:
+            self.assertEqual(self.acs.get_best_k_completions_batch(prefixes), expected)
+        self.assertEqual(query.call_count, 6)  # Once per distinct normalized prefix
+        reused = [call[0][0] for call in query.call_args_list if call[0][2] is not None]
+        self.assertEqual(reused, ["the qiuck", "the quick", "the quick brown dog"])
+
+
+class TestResultCache(unittest.TestCase):
+    """Test caching of query results"""
+
+    def setUp(self):
+        self.acs = AutoCompleteSystem()
+        self.test_dir = tempfile.mkdtemp()
+
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("the quick brown fox jumps\n")
+            f.write("the quick brown dog sleeps\n")
+            f.write("the quiet brown mouse\n")
+
+        self.acs.build_from_folder(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_repeated_queries_hit(self):
+        """Test a repeated prefix is answered from the cache, in LRU order"""
+        self.acs.result_cache = ResultCache(max_entries=2)
+        first = self.acs.get_best_k_completions("The quick")
+        with patch.object(self.acs, "_search") as search:
+            self.assertEqual(self.acs.get_best_k_completions("the  quick!"), first)
+        search.assert_not_called()
+
+        self.acs.get_best_k_completions("brown")
+        self.acs.get_best_k_completions("the quick")
+        self.acs.get_best_k_completions("mouse")  # Evicts "brown", the least recently used
+        self.assertEqual(list(self.acs.result_cache.entries), ["the quick", "mouse"])
+        self.assertEqual(self.acs.result_cache.stats(), {"entries": 2, "ids": 3, "hits": 2, "misses": 3, "reused": 0})
+
+    def test_longer_prefix_reuses_candidates(self):
+        """Test a miss starts from the candidates of a cached shorter prefix"""
+        self.acs.get_best_k_completions("the qui")
+        with patch.object(self.acs, "_candidates", wraps=self.acs._candidates) as candidates:
+            results = self.acs.get_best_k_completions("the quick brown d")
+        self.assertEqual(list(candidates.call_args[1]["within"]), [0, 1, 2])
+        self.assertEqual(self.acs.result_cache.reused, 1)
+
+        self.acs.result_cache = None
+        self.assertEqual(self.acs.get_best_k_completions("the quick brown d"), results)
+
+    def test_cached_ids_are_bounded(self):
+        """Test survivors are kept as compact arrays and evicted beyond the id budget"""
+        self.acs.result_cache = ResultCache(max_ids=4)
+        self.acs.get_best_k_completions("the qui")  # 3 survivors
+        entry = self.acs.result_cache.entries["the qui"]
+        self.assertIsInstance(entry.survivors, array)
+        self.assertIsInstance(entry.inexact, array)
+        self.acs.get_best_k_completions("brown")  # 3 more evict "the qui"
+        self.assertEqual(list(self.acs.result_cache.entries), ["brown"])
+        self.assertEqual(self.acs.result_cache.ids, 3)
+
+    def test_rebuild_invalidates(self):
+        """Test results cached before the index changed are not returned"""
+        self.assertEqual(len(self.acs.get_best_k_completions("brown")), 3)
+        with open(os.path.join(self.test_dir, "more.txt"), 'w') as f:
+            f.write("a brown bear\n")
+        self.acs.refresh()
+        self.assertEqual(len(self.acs.get_best_k_completions("brown")), 4)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test query and build metrics"""
+
+    def setUp(self):
+        self.acs = AutoCompleteSystem()
+        self.test_dir = tempfile.mkdtemp()
+
+        with open(os.path.join(self.test_dir, "test.txt"), 'w') as f:
+            f.write("the quick brown fox jumps\n")
+            f.write("the quick brown dog sleeps\n")
+            f.write("the quiet brown mouse\n")
+
+        self.stats = []
+        self.acs.metrics = self.stats.append
+        self.acs.build_from_folder(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_query_stats(self):
+        """Test each query reports its cache use, candidates and matcher calls"""
+        build = self.stats.pop()
+        self.assertEqual((build.files, build.sentences), (1, 3))
+
+        self.acs.get_best_k_completions("the quxck")
+        self.acs.get_best_k_completions("the quxck")
+        self.acs.get_best_k_completions("qiuck")
+        miss, hit, fallback = self.stats
+        self.assertEqual((miss.cache, miss.fallback, miss.candidates, miss.exact_hits), ("miss", False, 3, 0))
+        self.assertEqual((miss.fuzzy_checks, miss.results), (3, 2))
+        self.assertEqual((hit.cache, hit.results), ("hit", 2))
+        self.assertTrue(fallback.fallback)
+        self.assertGreaterEqual(miss.total_s, miss.candidates_s + miss.verify_s)
+
+    def test_slow_query_log(self):
+        """Test queries over the threshold are logged with their stats"""
+        self.acs.metrics = None
+        self.acs.slow_query_seconds = 0.0
+        with self.assertLogs("autocomplete", "WARNING") as logs:
+            self.acs.get_best_k_completions("brown")
+        self.assertEqual(logs.records[0].stats["candidates"], 3)
+
+    def test_profile_query(self):
+        """Test profiling a query bypasses the cache and keeps its results"""
+        expected = self.acs.get_best_k_completions("the qui")
+        with patch('sys.stdout', new=io.StringIO()) as out:
+            self.assertEqual(self.acs.profile_query("the qui"), expected)
+        self.assertIn("_search", out.getvalue())
+        self.assertEqual(self.stats[-1].cache, "off")
+
 
 class TestComplexQueries(unittest.TestCase):
     """Test scenarios that could break the system"""
@@ -178,6 +624,24 @@ class TestSearchTimeLimit(unittest.TestCase):
             duration = time.perf_counter() - start
             self.assertLessEqual(duration, 5, f"Search for '{q}' took too long: {duration:.2f}s")
 
+    def test_budget_returns_partial_results(self):
+        """Test a spent budget cuts single edit matching short but keeps exact hits, and is not cached"""
+        stats = []
+        self.acs.metrics = stats.append
+
+        results = self.acs.get_best_k_completions("pzthon", budget=0)
+        self.assertIsInstance(results, PartialCompletions)
+        self.assertEqual(results, [])
+        self.assertTrue(stats[-1].partial)
+
+        results = self.acs.get_best_k_completions("pzthon")
+        self.assertNotIsInstance(results, PartialCompletions)
+        self.assertEqual(results[0].completed_sentence, "Python is awesome")
+        self.assertEqual((stats[-1].cache, stats[-1].partial), ("miss", False))
+        self.assertEqual(self.acs.get_best_k_completions("extra", budget=0)[0].completed_sentence,
+                         "Extraordinary extraordinary examples")
+        self.assertEqual(self.acs.get_best_k_completions("pzthon", budget=60), results)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file